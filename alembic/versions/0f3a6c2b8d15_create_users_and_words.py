@@ -0,0 +1,48 @@
+"""Create users and words tables
+
+Revision ID: 0f3a6c2b8d15
+Revises:
+Create Date: 2025-02-19 14:20:11.508127
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '0f3a6c2b8d15'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Схема, которую раньше создавал Base.metadata.create_all при старте
+    # бота; базы, созданные так, уже помечены следующей ревизией
+    op.create_table(
+        'users',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('telegram_id', sa.Integer(), nullable=True),
+        sa.Column('best_score', sa.Integer(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_users_id', 'users', ['id'])
+    op.create_table(
+        'words',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('left_word', sa.String(), nullable=True),
+        sa.Column('right_word', sa.String(), nullable=True),
+        sa.Column('added_date', sa.DateTime(), nullable=True),
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id'), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_words_id', 'words', ['id'])
+    op.create_index('ix_words_left_word', 'words', ['left_word'])
+    op.create_index('ix_words_right_word', 'words', ['right_word'])
+    op.create_index('ix_words_added_date', 'words', ['added_date'])
+
+
+def downgrade() -> None:
+    op.drop_table('words')
+    op.drop_table('users')
@@ -1,7 +1,7 @@
 """Add language column
 
 Revision ID: 484b6567d109
-Revises: 
+Revises: 0f3a6c2b8d15
 Create Date: 2025-02-19 14:32:54.223933
 
 """
@@ -13,7 +13,7 @@ import sqlalchemy as sa
 
 # revision identifiers, used by Alembic.
 revision: str = '484b6567d109'
-down_revision: Union[str, None] = None
+down_revision: Union[str, None] = '0f3a6c2b8d15'
 branch_labels: Union[str, Sequence[str], None] = None
 depends_on: Union[str, Sequence[str], None] = None
 
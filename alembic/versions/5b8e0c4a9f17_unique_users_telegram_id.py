@@ -0,0 +1,47 @@
+"""Unique index on users.telegram_id
+
+Revision ID: 5b8e0c4a9f17
+Revises: 9c1f2a7d3e41
+Create Date: 2026-10-18 11:03:52.917240
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+revision: str = '5b8e0c4a9f17'
+down_revision: Union[str, None] = '9c1f2a7d3e41'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Duplicates could be created concurrently before the constraint:
+    # keep the oldest user and move words of the others to it
+    op.execute("""
+        UPDATE words SET user_id = (
+            SELECT MIN(keep.id) FROM users keep
+            JOIN users dup ON dup.telegram_id = keep.telegram_id
+            WHERE dup.id = words.user_id
+        )
+        WHERE user_id IN (
+            SELECT dup.id FROM users dup
+            JOIN users keep ON keep.telegram_id = dup.telegram_id
+            WHERE keep.id < dup.id
+        )
+    """)
+    op.execute("""
+        DELETE FROM users WHERE id IN (
+            SELECT dup.id FROM users dup
+            JOIN users keep ON keep.telegram_id = dup.telegram_id
+            WHERE keep.id < dup.id
+        )
+    """)
+    op.create_index(
+        'ix_users_telegram_id', 'users', ['telegram_id'], unique=True
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_users_telegram_id', table_name='users')
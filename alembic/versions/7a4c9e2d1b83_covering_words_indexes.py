@@ -0,0 +1,49 @@
+"""Covering indexes for words, drop unused single-column ones
+
+Revision ID: 7a4c9e2d1b83
+Revises: e3d71a6b2c58
+Create Date: 2026-10-18 13:26:44.118530
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+revision: str = '7a4c9e2d1b83'
+down_revision: Union[str, None] = 'e3d71a6b2c58'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Created by Base.metadata.create_all, no query filters on them alone
+UNUSED_INDEXES = {
+    'ix_words_id': ['id'],
+    'ix_words_left_word': ['left_word'],
+    'ix_words_right_word': ['right_word'],
+    'ix_words_added_date': ['added_date'],
+}
+
+
+def upgrade() -> None:
+    # Random word choice reads only left_word: make it an index-only scan.
+    # get_all_translations is covered by the unique
+    # (user_id, left_word, right_word) index
+    op.drop_index('ix_words_user_id_random_key', table_name='words')
+    op.create_index(
+        'ix_words_user_id_random_key',
+        'words',
+        ['user_id', 'random_key'],
+        postgresql_include=['left_word']
+    )
+    for name in UNUSED_INDEXES:
+        op.execute(f"DROP INDEX IF EXISTS {name}")
+
+
+def downgrade() -> None:
+    for name, columns in UNUSED_INDEXES.items():
+        op.create_index(name, 'words', columns)
+    op.drop_index('ix_words_user_id_random_key', table_name='words')
+    op.create_index(
+        'ix_words_user_id_random_key', 'words', ['user_id', 'random_key']
+    )
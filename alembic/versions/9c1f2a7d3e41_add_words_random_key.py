@@ -0,0 +1,39 @@
+"""Add words random_key for indexed random sampling
+
+Revision ID: 9c1f2a7d3e41
+Revises: 484b6567d109
+Create Date: 2026-10-18 10:12:31.482915
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '9c1f2a7d3e41'
+down_revision: Union[str, None] = '484b6567d109'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('words', sa.Column('random_key', sa.Float(), nullable=True))
+    if op.get_bind().dialect.name == 'sqlite':
+        # random() of SQLite is a 64-bit integer, not a float in [0, 1)
+        op.execute(
+            "UPDATE words SET random_key = random() / 18446744073709551616.0 + 0.5"
+        )
+    else:
+        op.execute("UPDATE words SET random_key = random()")
+    # SQLite can't alter columns in place: batch mode recreates the table
+    with op.batch_alter_table('words') as batch:
+        batch.alter_column('random_key', nullable=False)
+    op.create_index(
+        'ix_words_user_id_random_key', 'words', ['user_id', 'random_key']
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_words_user_id_random_key', table_name='words')
+    op.drop_column('words', 'random_key')
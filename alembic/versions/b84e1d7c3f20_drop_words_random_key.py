@@ -0,0 +1,43 @@
+"""Drop words random_key, training draws from the reviews deck
+
+Revision ID: b84e1d7c3f20
+Revises: f0b39a8c4d72
+Create Date: 2026-10-18 18:41:05.623194
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = 'b84e1d7c3f20'
+down_revision: Union[str, None] = 'f0b39a8c4d72'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Слово для тренировки берется из колоды reviews, случайный ключ
+    # никто не читает, а каждая вставка обновляла его индекс
+    op.drop_index('ix_words_user_id_random_key', table_name='words')
+    with op.batch_alter_table('words') as batch:
+        batch.drop_column('random_key')
+
+
+def downgrade() -> None:
+    op.add_column('words', sa.Column('random_key', sa.Float(), nullable=True))
+    if op.get_bind().dialect.name == 'sqlite':
+        op.execute(
+            "UPDATE words SET random_key = random() / 18446744073709551616.0 + 0.5"
+        )
+    else:
+        op.execute("UPDATE words SET random_key = random()")
+    with op.batch_alter_table('words') as batch:
+        batch.alter_column('random_key', nullable=False)
+    op.create_index(
+        'ix_words_user_id_random_key',
+        'words',
+        ['user_id', 'random_key'],
+        postgresql_include=['left_word']
+    )
@@ -0,0 +1,53 @@
+"""Spaced repetition schedule: reviews table
+
+Revision ID: c2f85d0e6a19
+Revises: 7a4c9e2d1b83
+Create Date: 2026-10-18 14:12:30.641907
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = 'c2f85d0e6a19'
+down_revision: Union[str, None] = '7a4c9e2d1b83'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'reviews',
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id'), nullable=False),
+        sa.Column('left_word', sa.String(), nullable=False),
+        sa.Column('ease', sa.Float(), nullable=False),
+        sa.Column('interval_days', sa.Float(), nullable=False),
+        sa.Column('repetitions', sa.Integer(), nullable=False),
+        sa.Column('lapses', sa.Integer(), nullable=False),
+        sa.Column('due', sa.DateTime(), nullable=False),
+        sa.Column('last_review', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('user_id', 'left_word')
+    )
+    # Every existing word is new: due when it was added, oldest first
+    op.execute("""
+        INSERT INTO reviews (
+            user_id, left_word, ease, interval_days, repetitions, lapses, due
+        )
+        SELECT user_id, left_word, 2.5, 0, 0, 0, MIN(COALESCE(added_date, CURRENT_TIMESTAMP))
+        FROM words
+        WHERE user_id IS NOT NULL AND left_word IS NOT NULL
+        GROUP BY user_id, left_word
+    """)
+    op.create_index(
+        'ix_reviews_user_id_due',
+        'reviews',
+        ['user_id', 'due'],
+        postgresql_include=['left_word']
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_reviews_user_id_due', table_name='reviews')
+    op.drop_table('reviews')
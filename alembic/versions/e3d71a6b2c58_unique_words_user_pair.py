@@ -0,0 +1,41 @@
+"""Unique index on words (user_id, left_word, right_word)
+
+Revision ID: e3d71a6b2c58
+Revises: 5b8e0c4a9f17
+Create Date: 2026-10-18 12:41:07.503118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+revision: str = 'e3d71a6b2c58'
+down_revision: Union[str, None] = '5b8e0c4a9f17'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # get_or_create_word had no constraint to rely on: keep the oldest
+    # copy of every pair of a user and drop the rest
+    op.execute("""
+        DELETE FROM words WHERE id IN (
+            SELECT dup.id FROM words dup
+            JOIN words keep
+              ON keep.user_id = dup.user_id
+             AND keep.left_word = dup.left_word
+             AND keep.right_word = dup.right_word
+            WHERE keep.id < dup.id
+        )
+    """)
+    op.create_index(
+        'ix_words_user_id_left_word_right_word',
+        'words',
+        ['user_id', 'left_word', 'right_word'],
+        unique=True
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_words_user_id_left_word_right_word', table_name='words')
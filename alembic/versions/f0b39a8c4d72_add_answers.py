@@ -0,0 +1,41 @@
+"""Training answers table
+
+Revision ID: f0b39a8c4d72
+Revises: c2f85d0e6a19
+Create Date: 2026-10-18 15:02:18.270415
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = 'f0b39a8c4d72'
+down_revision: Union[str, None] = 'c2f85d0e6a19'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'answers',
+        sa.Column('event_id', sa.String(), nullable=False),
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id'), nullable=False),
+        sa.Column('left_word', sa.String(), nullable=False),
+        sa.Column('correct', sa.Boolean(), nullable=False),
+        sa.Column('clues', sa.Integer(), nullable=False),
+        sa.Column('latency_ms', sa.Integer(), nullable=True),
+        sa.Column('answered_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('event_id')
+    )
+    op.create_index(
+        'ix_answers_user_id_answered_at',
+        'answers',
+        ['user_id', 'answered_at']
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_answers_user_id_answered_at', table_name='answers')
+    op.drop_table('answers')
@@ -0,0 +1,383 @@
+import logging
+import os
+import socket
+import threading
+import time
+import redis
+
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, Optional
+from redis_backend import hash_tag, is_cluster
+from scheduler import answer_quality
+
+logger = logging.getLogger(__name__)
+
+
+# Одним запросом: обновить серию правильных ответов пользователя и
+# добавить событие ответа в stream. KEYS: серия, stream;
+# ARGV: '1' если ответ верный, maxlen, затем пары поле-значение.
+# В Redis Cluster серии лежат в слоте stream: `{answers}:streak:{user_id}`
+RECORD_ANSWER_SCRIPT = """
+local streak = 0
+if ARGV[1] == '1' then
+    streak = redis.call('INCR', KEYS[1])
+else
+    redis.call('SET', KEYS[1], 0)
+end
+redis.call('XADD', KEYS[2], 'MAXLEN', '~', ARGV[2], '*',
+           'streak', streak, unpack(ARGV, 3))
+return streak
+"""
+
+
+@dataclass
+class AnswerEvent:
+    """One training answer as it is stored in the answers table."""
+    event_id: str
+    user_id: int
+    word: str
+    correct: bool
+    clues: int
+    # SM-2 quality the word is rescheduled with (scheduler.answer_quality)
+    quality: int
+    latency_ms: Optional[int]
+    answered_at: datetime
+    streak: int
+
+    @classmethod
+    def from_stream(cls, event_id: str, fields: dict) -> 'AnswerEvent':
+        latency = fields.get('latency_ms')
+        correct = fields['correct'] == '1'
+        clues = int(fields['clues'])
+        quality = fields.get('quality')
+        return cls(
+            event_id=event_id,
+            user_id=int(fields['user_id']),
+            word=fields['word'],
+            correct=correct,
+            clues=clues,
+            # Entries of older versions have no quality
+            quality=int(quality) if quality else answer_quality(correct, clues),
+            latency_ms=int(latency) if latency else None,
+            answered_at=datetime.fromtimestamp(float(fields['answered_at'])),
+            streak=int(fields['streak'])
+        )
+
+
+class AnswerBuffer:
+    """
+    Write-behind buffer of training answers.
+
+    Answers are appended to a Redis stream together with the streak
+    update in one round trip; AnswerFlusher writes them to the database
+    and reschedules the answered words.
+    """
+
+    def __init__(self, redis_client: redis.Redis, prefix: str, maxlen: int) -> None:
+        self.redis = redis_client
+        self.cluster = is_cluster(redis_client)
+        self.stream = answers_stream(prefix, self.cluster)
+        self.prefix = prefix
+        self.maxlen = maxlen
+        self._record = redis_client.register_script(RECORD_ANSWER_SCRIPT)
+
+    def _get_streak_key(self, user_id: int) -> str:
+        return streak_key(self.prefix, user_id, self.cluster)
+
+    def _script_args(
+        self,
+        user_id: int,
+        word: str,
+        correct: bool,
+        clues: int,
+        shown_at: Optional[float],
+        gave_up: bool
+    ) -> dict:
+        now = time.time()
+        latency = round((now - shown_at) * 1000) if shown_at else ''
+        return {
+            'keys': [self._get_streak_key(user_id), self.stream],
+            'args': [
+                '1' if correct else '0', self.maxlen,
+                'user_id', user_id,
+                'word', word,
+                'correct', '1' if correct else '0',
+                'clues', clues,
+                'quality', answer_quality(correct, clues, gave_up),
+                'latency_ms', latency,
+                'answered_at', now
+            ]
+        }
+
+    def record(
+        self,
+        user_id: int,
+        word: str,
+        correct: bool,
+        clues: int,
+        shown_at: Optional[float] = None,
+        gave_up: bool = False
+    ) -> int:
+        """
+        Buffer an answer.
+
+        Returns:
+            int: current streak of correct answers of the user
+        """
+        return self._record(
+            **self._script_args(
+                user_id, word, correct, clues, shown_at, gave_up
+            )
+        )
+
+
+class AsyncAnswerBuffer(AnswerBuffer):
+    """AnswerBuffer for redis.asyncio clients."""
+
+    async def record(
+        self,
+        user_id: int,
+        word: str,
+        correct: bool,
+        clues: int,
+        shown_at: Optional[float] = None,
+        gave_up: bool = False
+    ) -> int:
+        """Buffer an answer."""
+        return await self._record(
+            **self._script_args(
+                user_id, word, correct, clues, shown_at, gave_up
+            )
+        )
+
+
+def answers_stream(prefix: str, cluster: bool = False) -> str:
+    return f"{prefix}{hash_tag('answers', cluster)}"
+
+
+def streak_key(prefix: str, user_id: int, cluster: bool = False) -> str:
+    """
+    Streak of correct answers of a user. The answer script touches it and
+    the stream, so in cluster mode it shares the stream's slot.
+    """
+    if cluster:
+        return f"{answers_stream(prefix, cluster)}:streak:{user_id}"
+    return f"{prefix}streak:{user_id}"
+
+
+class AnswerFlusher:
+    """
+    Background thread writing buffered answers to the database in batches.
+
+    Reads the stream through a consumer group and acknowledges entries
+    only after `write` returned, so delivery is at least once: `write`
+    must be idempotent. Entries left pending by a crashed process are
+    claimed after `claim_idle_ms`. `stop` drains the stream before exit.
+
+    Entries that can't be parsed, or that failed `max_deliveries` times,
+    are moved to the `<stream>:dead` stream, so they never block the
+    entries behind them.
+    """
+
+    GROUP = 'flusher'
+    DEAD_LETTERS_MAXLEN = 10000
+
+    def __init__(
+        self,
+        redis_client: redis.Redis,
+        prefix: str,
+        write: Callable[[list[AnswerEvent]], None],
+        batch_size: int,
+        block_ms: int,
+        claim_idle_ms: int,
+        max_deliveries: int
+    ) -> None:
+        self.redis = redis_client
+        self.stream = answers_stream(prefix, is_cluster(redis_client))
+        # The same hash tag as the stream: one slot in Redis Cluster
+        self.dead_letters = f"{self.stream}:dead"
+        self.write = write
+        self.batch_size = batch_size
+        self.block_ms = block_ms
+        self.claim_idle_ms = claim_idle_ms
+        self.max_deliveries = max_deliveries
+        self.consumer = f"{socket.gethostname()}-{os.getpid()}"
+        self.flushed = 0
+        self.dead_lettered = 0
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def ensure_group(self) -> None:
+        try:
+            self.redis.xgroup_create(self.stream, self.GROUP, id='0', mkstream=True)
+        except redis.ResponseError as e:
+            if 'BUSYGROUP' not in str(e):
+                raise
+
+    def _ack(self, ids: list[str]) -> None:
+        if not ids:
+            return
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.xack(self.stream, self.GROUP, *ids)
+        pipe.xdel(self.stream, *ids)
+        pipe.execute()
+
+    def _dead_letter(self, entries, reason: str) -> None:
+        """Move entries to the dead-letter stream and out of the group."""
+        pipe = self.redis.pipeline(transaction=False)
+        for event_id, fields in entries:
+            pipe.xadd(
+                self.dead_letters, {**fields, 'event_id': event_id},
+                maxlen=self.DEAD_LETTERS_MAXLEN, approximate=True
+            )
+        pipe.execute()
+        self._ack([event_id for event_id, _ in entries])
+        self.dead_lettered += len(entries)
+        logger.error(
+            "Moved %d answers to %s: %s", len(entries), self.dead_letters, reason
+        )
+
+    def _drop_exhausted(self, entries) -> list:
+        """Dead-letter redelivered entries that failed max_deliveries times."""
+        pending = self.redis.xpending_range(
+            self.stream, self.GROUP, min=entries[0][0], max=entries[-1][0],
+            count=len(entries), consumername=self.consumer
+        )
+        deliveries = {
+            item['message_id']: item['times_delivered'] for item in pending
+        }
+        exhausted = [
+            (event_id, fields) for event_id, fields in entries
+            if fields and deliveries.get(event_id, 0) > self.max_deliveries
+        ]
+        if not exhausted:
+            return entries
+        self._dead_letter(
+            exhausted, f"not written in {self.max_deliveries} attempts"
+        )
+        exhausted_ids = {event_id for event_id, _ in exhausted}
+        return [entry for entry in entries if entry[0] not in exhausted_ids]
+
+    def _write_each(self, events: list[AnswerEvent]) -> list[AnswerEvent]:
+        """Write a failed batch event by event; returns the failed ones."""
+        failed = []
+        for event in events:
+            try:
+                self.write([event])
+            except Exception:
+                failed.append(event)
+        return failed
+
+    def _flush(self, entries, redelivered: bool = False) -> int:
+        """
+        Write entries and acknowledge the written ones.
+
+        A failed batch is retried event by event, so only the failing
+        entries stay pending; the error is raised after the others are
+        acknowledged.
+        """
+        taken = len(entries)
+        if redelivered and entries:
+            entries = self._drop_exhausted(entries)
+        if not entries:
+            return taken
+
+        events, malformed = [], []
+        for event_id, fields in entries:
+            if not fields:
+                # Deleted from the stream while pending: only acknowledged
+                continue
+            try:
+                events.append(AnswerEvent.from_stream(event_id, fields))
+            except (KeyError, ValueError, OverflowError):
+                malformed.append((event_id, fields))
+        if malformed:
+            self._dead_letter(malformed, "malformed entries")
+
+        failed, error = [], None
+        if events:
+            try:
+                self.write(events)
+            except Exception as e:
+                error = e
+                failed = events if len(events) == 1 else self._write_each(events)
+        skipped = {event.event_id for event in failed}
+        skipped.update(event_id for event_id, _ in malformed)
+        self._ack([event_id for event_id, _ in entries if event_id not in skipped])
+        self.flushed += len(events) - len(failed)
+        if failed:
+            raise error
+        return taken
+
+    def claim_stale(self) -> int:
+        """Take over entries that another consumer read but never acked."""
+        claimed = 0
+        start = '0-0'
+        while True:
+            start, entries, *_ = self.redis.xautoclaim(
+                self.stream, self.GROUP, self.consumer,
+                min_idle_time=self.claim_idle_ms,
+                start_id=start, count=self.batch_size
+            )
+            claimed += self._flush(entries, redelivered=True)
+            if start in ('0-0', b'0-0'):
+                return claimed
+
+    def flush_once(self, block: bool = True, pending: bool = False) -> int:
+        """
+        Write one batch of entries: new ones or, with `pending`, the ones
+        this consumer read before but failed to write.
+
+        Returns:
+            int: number of entries taken from the stream
+        """
+        response = self.redis.xreadgroup(
+            self.GROUP, self.consumer, {self.stream: '0' if pending else '>'},
+            count=self.batch_size,
+            block=self.block_ms if block and not pending else None
+        )
+        return self._flush(
+            response[0][1] if response else [], redelivered=pending
+        )
+
+    def run(self) -> None:
+        self.ensure_group()
+        retry = True
+        last_claim = 0.0
+        while not self._stopping.is_set():
+            try:
+                if time.monotonic() - last_claim > self.claim_idle_ms / 1000:
+                    self.claim_stale()
+                    last_claim = time.monotonic()
+                if retry:
+                    while self.flush_once(pending=True):
+                        pass
+                    retry = False
+                self.flush_once()
+            except Exception:
+                # Entries stay pending and are written on the next round
+                logger.exception("Answers flush failed")
+                retry = True
+                self._stopping.wait(self.block_ms / 1000)
+
+        # Shutdown: write everything that is already buffered
+        try:
+            while self.flush_once(pending=True):
+                pass
+            while self.flush_once(block=False):
+                pass
+        except Exception:
+            logger.exception("Answers flush on shutdown failed")
+
+    def start(self) -> None:
+        self._thread = threading.Thread(
+            target=self.run, name='answer-flusher', daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Stop reading and wait until buffered answers are written."""
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
@@ -1,28 +1,92 @@
-import requests
+from typing import Optional
+from cache import LRUCache
+from config import config, TranslationConfig
+from exceptions import TranslationError
+from dictionary import OfflineDictionary
+from providers import ChainProvider, CircuitBreaker, DictionaryProvider, \
+    HttpClient, OxfordProvider, TranslationProvider
+from translation_cache import TranslationCache
+from metrics import translation_fetch_seconds
 
 
-def translation(word) -> str:
-    APP_ID = "e62cad1e"
-    APP_KEY = "lukd5sn6nl44boi9k8d8vtvleylvncdc"
+def build_provider(translation_config: TranslationConfig) -> TranslationProvider:
+    """
+    Create translation provider selected in the config.
+
+    If an offline dictionary is configured it is asked first.
+    """
+    if translation_config.provider == 'dictionary':
+        upstream = DictionaryProvider.from_file(
+            translation_config.dictionary_path
+        )
+    else:
+        upstream = build_oxford_provider(translation_config)
 
-    url = f"https://od-api-sandbox.oxforddictionaries.com/api/v2/translations/en/ru/{word.lower()}"
+    if not translation_config.offline_dictionary_path:
+        return upstream
+    offline = OfflineDictionary(
+        translation_config.offline_dictionary_path,
+        max_senses=translation_config.max_senses
+    )
+    return ChainProvider([offline, upstream])
 
-    headers = {
-        "app_id": APP_ID,
-        "app_key": APP_KEY
-    }
 
-    response = requests.get(url, headers=headers)
+def build_oxford_provider(translation_config: TranslationConfig) -> OxfordProvider:
+    client = HttpClient(
+        pool_size=translation_config.pool_size,
+        connect_timeout=translation_config.connect_timeout,
+        read_timeout=translation_config.read_timeout,
+        max_retries=translation_config.max_retries,
+        backoff=translation_config.retry_backoff,
+        breaker=CircuitBreaker(
+            failure_threshold=translation_config.breaker_failures,
+            reset_timeout=translation_config.breaker_reset_timeout
+        )
+    )
+    return OxfordProvider(
+        client,
+        api_url=translation_config.api_url,
+        app_id=translation_config.app_id,
+        app_key=translation_config.app_key
+    )
 
-    if response.status_code == 200:
-        data = response.json()
 
-        try:
-            translations = data['results'][0]['lexicalEntries'][0]['entries'][0]['senses'][0]['translations']
-            for t in translations:
-                return f"{word} → {t['text']}"
-        except (KeyError, IndexError):
-            return "Перевод не найден в ответе."
-    else:
-        return f"Ошибка {response.status_code}: {response.text}"
+# Built on the first lookup: a dictionary file or an HTTP session is not
+# needed to import the bot
+provider: Optional[TranslationProvider] = None
+
+
+def get_provider() -> TranslationProvider:
+    global provider
+    if provider is None:
+        provider = build_provider(config.translation)
+    return provider
+
+
+def fetch_translation(word: str) -> Optional[str]:
+    """Ask the configured provider, bypassing the cache."""
+    with translation_fetch_seconds.time():
+        return get_provider().translate(word)
+
+
+translation_cache = TranslationCache(
+    fetch_translation,
+    memory=LRUCache(
+        max_size=config.translation.memory_max_size,
+        ttl=config.translation.cache_ttl
+    ),
+    ttl=config.translation.cache_ttl,
+    negative_ttl=config.translation.negative_cache_ttl,
+    prefix=config.redis.prefix
+)
+
+
+def translation(word) -> str:
+    try:
+        translated = translation_cache.get(word.lower())
+    except TranslationError as e:
+        return str(e)
 
+    if translated is None:
+        return "Перевод не найден в ответе."
+    return f"{word} → {translated}"
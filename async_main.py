@@ -0,0 +1,190 @@
+import asyncio
+import os
+import redis
+import redis.asyncio
+
+from functools import cached_property, partial, wraps
+from typing import Awaitable, Callable, Optional
+from telebot.async_telebot import AsyncTeleBot
+from sqlalchemy.ext.asyncio import AsyncSession
+from database.async_db import async_session, get_async_engine
+from database.models import Answers, user_cache
+from config import config, Config
+from app import translation, translation_cache
+from state import AsyncRedisStateManager
+from redis_backend import create_redis, create_async_redis
+from answer_stats import AsyncAnswerBuffer, AnswerFlusher
+from dispatcher import AsyncCommandDispatcher
+from workers import AsyncChatDispatcher, get_update_chat_id
+from handlers import Context
+import handlers
+import metrics
+
+
+class ChatOrderedTeleBot(AsyncTeleBot):
+    """
+    AsyncTeleBot that keeps updates of one chat in order.
+
+    Updates of different chats are processed concurrently, limited by
+    `max_concurrent_updates` handlers in flight.
+    """
+
+    def __init__(self, token: str, max_concurrent_updates: int, **kwargs):
+        super().__init__(token, **kwargs)
+        self.max_concurrent_updates = max_concurrent_updates
+        self._dispatcher = None
+
+    @property
+    def dispatcher(self) -> AsyncChatDispatcher:
+        # Semaphore must be created inside the running event loop
+        if self._dispatcher is None:
+            self._dispatcher = AsyncChatDispatcher(self.max_concurrent_updates)
+        return self._dispatcher
+
+    async def process_new_updates(self, updates) -> None:
+        tasks = [
+            self.dispatcher.submit(
+                get_update_chat_id(update),
+                partial(AsyncTeleBot.process_new_updates, self, [update])
+            )
+            for update in updates
+        ]
+        if tasks:
+            await asyncio.gather(*tasks)
+
+
+class AsyncApplication:
+    """
+    Resources of the asyncio bot, created on first use.
+
+    Counterpart of main.Application: importing async_main only defines
+    the handlers, clients and the bot are built on first access, the
+    database engine on the first session.
+    """
+
+    def __init__(self, config: Config) -> None:
+        self.config = config
+
+    @cached_property
+    def redis_client(self) -> redis.asyncio.Redis:
+        client = create_async_redis(self.config.redis)
+        metrics.instrument_redis(client)
+        return client
+
+    @cached_property
+    def sync_redis_client(self) -> redis.Redis:
+        # translation() and the answers flusher run in threads with a
+        # blocking client
+        client = create_redis(self.config.redis)
+        metrics.instrument_redis(client)
+        translation_cache.redis = client
+        return client
+
+    @cached_property
+    def bot(self) -> ChatOrderedTeleBot:
+        bot = ChatOrderedTeleBot(
+            os.getenv('TELEGRAM_BOT_TOKEN'),
+            max_concurrent_updates=self.config.bot.max_concurrent_updates
+        )
+        bot.register_message_handler(
+            handle_document, content_types=['document']
+        )
+        # Text messages: commands, buttons, dialogs; other content is ignored
+        bot.register_message_handler(
+            handle_message, content_types=['text'], func=lambda message: True
+        )
+        metrics.watch_chat_dispatcher(lambda: bot.dispatcher)
+        return bot
+
+    @cached_property
+    def state_manager(self) -> AsyncRedisStateManager:
+        return AsyncRedisStateManager(self.redis_client, self.config.redis)
+
+    @cached_property
+    def answer_buffer(self) -> AsyncAnswerBuffer:
+        # Answers go to a Redis stream and are written to the database
+        # in batches by answer_flusher
+        return AsyncAnswerBuffer(
+            self.redis_client, self.config.redis.prefix,
+            self.config.answers.stream_maxlen
+        )
+
+    @cached_property
+    def answer_flusher(self) -> AnswerFlusher:
+        flusher = AnswerFlusher(
+            self.sync_redis_client,
+            self.config.redis.prefix,
+            Answers.save_batch,
+            batch_size=self.config.answers.batch_size,
+            block_ms=self.config.answers.block_ms,
+            claim_idle_ms=self.config.answers.claim_idle_ms,
+            max_deliveries=self.config.answers.max_deliveries
+        )
+        metrics.watch_answer_flusher(flusher)
+        return flusher
+
+    def context(self, session: AsyncSession) -> Context:
+        return Context(
+            state_manager=self.state_manager,
+            session=session,
+            bot=self.bot,
+            answer_buffer=self.answer_buffer,
+            # translation() is blocking, keep it off the event loop
+            translate=partial(asyncio.to_thread, translation)
+        )
+
+    def start(self) -> None:
+        """Connect the metrics and start the answers flusher."""
+        engine = get_async_engine().sync_engine
+        metrics.instrument_engine(engine)
+        metrics.instrument_pool(engine, self.config.database.max_overflow)
+        metrics.watch_translation_cache(translation_cache)
+        metrics.watch_lru_cache('user_cache', user_cache)
+        self.answer_flusher.start()
+
+    def stop(self) -> None:
+        self.answer_flusher.stop()
+
+
+application = AsyncApplication(config)
+
+
+def get_chat_state(chat_id: int) -> Awaitable[Optional[str]]:
+    return application.state_manager.get_state(chat_id)
+
+
+# Commands and buttons first, then the chat state picks the handler
+command_dispatcher = AsyncCommandDispatcher(get_chat_state)
+# Timings of handlers, Redis and SQL, see metrics.py
+command_dispatcher.add_timing_hook(metrics.observe_handler)
+
+
+def async_handler(handler: Callable) -> Callable:
+    """Coroutine handler of the message running a shared handler."""
+    @wraps(handler)
+    async def run(message):
+        # One session per message, closed when the handler returns
+        async with async_session() as session:
+            return await handler(message, application.context(session))
+    return run
+
+
+handlers.register(command_dispatcher, async_handler)
+handle_document = async_handler(handlers.handle_document)
+
+
+async def handle_message(message) -> None:
+    """Handle all messages except documents: commands, buttons, dialogs"""
+    await command_dispatcher.dispatch(message)
+
+
+if __name__ == '__main__':
+    if config.metrics.enabled:
+        metrics.start_http_server(config.metrics.host, config.metrics.port)
+    application.start()
+    try:
+        asyncio.run(application.bot.polling(non_stop=True))
+    except Exception as e:
+        print(f"Bot stopped due to error: {e}")
+    finally:
+        application.stop()
@@ -0,0 +1,332 @@
+"""
+Throughput and latency of the bot flows through the real handlers of main.py.
+
+    python -m benchmarks.bot_flows --chats 200 --rounds 5
+    python -m benchmarks.bot_flows --output base.json
+    python -m benchmarks.bot_flows --compare base.json
+    python -m benchmarks.bot_flows --commit HEAD~3
+
+Messages are synthetic updates processed by telebot exactly like polled
+ones, on the calling thread. Stand-ins:
+
+- Telegram: Bot API requests are answered by a recorder (telebot's
+  CUSTOM_REQUEST_SENDER), nothing leaves the process;
+- Redis: fakeredis, or a local server with --redis-url;
+- database: a temporary SQLite file, or an empty local Postgres database
+  with --database-url (tables are created and dropped);
+- translation provider: a local dictionary.
+
+Adding a word and translating use the Postgres-only word upsert, so these
+flows are skipped on SQLite. --commit REV runs the same benchmark on REV
+in a temporary git worktree and prints both results side by side.
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from collections import Counter
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Callable, Optional
+
+
+class TelegramRecorder:
+    """Answers Bot API requests like Telegram and counts them by method."""
+
+    def __init__(self) -> None:
+        self.calls = Counter()
+        self.message_id = 0
+
+    def __call__(self, method, url, params=None, files=None, **kwargs):
+        self.calls[url.rsplit('/', 1)[-1]] += 1
+        self.message_id += 1
+        params = params or {}
+        result = {
+            'message_id': self.message_id,
+            'date': int(time.time()),
+            'chat': {'id': int(params.get('chat_id', 0)), 'type': 'private'},
+            'text': params.get('text', '')
+        }
+        body = {'ok': True, 'result': result}
+        return SimpleNamespace(
+            status_code=200, text=json.dumps(body), json=lambda: body
+        )
+
+
+def make_update(update_id: int, chat_id: int, text: str):
+    from telebot.types import Update
+
+    message = {
+        'message_id': update_id,
+        'date': int(time.time()),
+        'chat': {'id': chat_id, 'type': 'private', 'first_name': 'Bench'},
+        'from': {'id': chat_id, 'is_bot': False, 'first_name': 'Bench'},
+        'text': text
+    }
+    if text.startswith('/'):
+        message['entities'] = [
+            {'type': 'bot_command', 'offset': 0, 'length': len(text.split()[0])}
+        ]
+    return Update.de_json({'update_id': update_id, 'message': message})
+
+
+def percentile(samples: list[float], share: float) -> float:
+    return samples[min(len(samples) - 1, int(len(samples) * share))]
+
+
+def load_bot(database_url: str, redis_url: str):
+    """Import main.py bound to the benchmark database and Redis."""
+    import fakeredis
+    import redis
+    from sqlalchemy import create_engine
+    from config import config
+
+    # Keys of a real Redis never mix with the bot's
+    config.redis.prefix = 'word_bot_bench:'
+
+    import database.db
+    engine = create_engine(database_url)
+    if hasattr(database.db, 'configure_engine'):
+        database.db.configure_engine(engine)
+    else:
+        # Commits before the application factory
+        database.db.engine = engine
+        database.db.db_session.configure(bind=engine)
+    import database.models
+    database.db.Base.metadata.create_all(engine)
+
+    os.environ.setdefault('TELEGRAM_BOT_TOKEN', '123456:benchmark')
+    import main
+    if redis_url:
+        client = redis.Redis.from_url(redis_url, decode_responses=True)
+    else:
+        client = fakeredis.FakeRedis(decode_responses=True)
+    resources = getattr(main, 'application', main)
+    resources.redis_client.connection_pool = client.connection_pool
+
+    import app
+    from providers import DictionaryProvider
+    app.provider = DictionaryProvider(
+        {f"bench{n}": f"перевод{n}" for n in range(100_000)}
+    )
+    return resources, engine, client
+
+
+def seed_words(chats: list[int], words: int) -> None:
+    from database.db import db_session
+    from database.models import Users, Words
+    from utils import ImmediateSession, run_sync
+
+    session = ImmediateSession(db_session)
+    for chat_id in chats:
+        user, _ = run_sync(
+            Users.get_or_create_user_async(session, telegram_id=chat_id)
+        )
+        pairs = [(f"word{n}", f"translation{n}") for n in range(words)]
+        run_sync(Words.bulk_insert_async(session, user.id, [pairs]))
+
+
+def current_answer(resources, chat_id: int) -> str:
+    from state import TRANSLATIONS_FIELD, decode_translations
+
+    state_manager = resources.state_manager
+    translations = decode_translations(state_manager.redis.hget(
+        state_manager._get_key(chat_id), TRANSLATIONS_FIELD
+    ))
+    return translations[0] if translations else 'unknown'
+
+
+def build_flows(resources) -> list[tuple[str, bool, Optional[str], Callable]]:
+    """(name, needs Postgres, untimed message before the flow, timed messages)"""
+    from commands import BotCommands
+
+    return [
+        ('start', False, None, lambda chat_id, n: ['/start']),
+        ('add word', True, None, lambda chat_id, n: [
+            BotCommands.ADD_WORD.button_text, f"bench{chat_id}x{n} - перевод{n}"
+        ]),
+        ('train', False, None, lambda chat_id, n: [BotCommands.TRAIN.button_text]),
+        ('answer', False, BotCommands.TRAIN.button_text,
+         lambda chat_id, n: [current_answer(resources, chat_id)]),
+        ('clue', False, BotCommands.TRAIN.button_text,
+         lambda chat_id, n: [BotCommands.CLUE.button_text]),
+        ('translate', True, None, lambda chat_id, n: [
+            BotCommands.TRANSLATE.button_text, f"bench{n}"
+        ]),
+    ]
+
+
+def run(args) -> dict:
+    import telebot
+    from telebot import apihelper
+
+    tmp = tempfile.mkdtemp()
+    database_url = args.database_url or f"sqlite:///{Path(tmp) / 'bench.sqlite3'}"
+    postgres = database_url.startswith('postgresql')
+    recorder = TelegramRecorder()
+    apihelper.CUSTOM_REQUEST_SENDER = recorder
+
+    resources, engine, redis_client = load_bot(database_url, args.redis_url)
+    from database.db import Base, db_session
+    bot = resources.bot
+    bot.threaded = False
+    # Handlers of one update on this thread, like a worker of the pool
+    process_update = getattr(bot, 'process_update', None) or (
+        lambda update: telebot.TeleBot.process_new_updates(bot, [update])
+    )
+    chats = [1_000_000 + n for n in range(args.chats)]
+    update_id = 0
+
+    def send(chat_id: int, text: str) -> None:
+        nonlocal update_id
+        update_id += 1
+        process_update(make_update(update_id, chat_id, text))
+
+    results = {}
+    try:
+        seed_words(chats, args.words)
+        for name, needs_postgres, setup, messages in build_flows(resources):
+            if needs_postgres and not postgres:
+                print(f"{name:10}: skipped, needs --database-url of Postgres")
+                continue
+            samples, errors, started = [], 0, time.perf_counter()
+            timed = 0.0
+            for n in range(args.rounds):
+                for chat_id in chats:
+                    if setup and n == 0:
+                        send(chat_id, setup)
+                    for text in messages(chat_id, n):
+                        began = time.perf_counter()
+                        try:
+                            send(chat_id, text)
+                        except Exception:
+                            errors += 1
+                        elapsed = time.perf_counter() - began
+                        timed += elapsed
+                        samples.append(elapsed * 1000)
+            samples.sort()
+            results[name] = {
+                'messages': len(samples),
+                'errors': errors,
+                'per_second': len(samples) / timed,
+                'p50_ms': percentile(samples, 0.5),
+                'p99_ms': percentile(samples, 0.99),
+                'mean_ms': statistics.fmean(samples),
+                'wall_s': time.perf_counter() - started
+            }
+    finally:
+        db_session.remove()
+        if postgres:
+            Base.metadata.drop_all(engine)
+        if args.redis_url:
+            for key in redis_client.scan_iter('word_bot_bench:*'):
+                redis_client.delete(key)
+        engine.dispose()
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    return {
+        'commit': git_commit(),
+        'database': 'postgresql' if postgres else 'sqlite',
+        'redis': 'redis' if args.redis_url else 'fakeredis',
+        'telegram_calls': dict(recorder.calls),
+        'flows': results
+    }
+
+
+def git_commit() -> str:
+    result = subprocess.run(
+        ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True
+    )
+    return result.stdout.strip() or 'unknown'
+
+
+def run_at_commit(revision: str, argv: list[str]) -> dict:
+    """Run this benchmark on another commit checked out in a worktree."""
+    with tempfile.TemporaryDirectory() as tmp:
+        worktree = Path(tmp) / 'tree'
+        subprocess.run(
+            ['git', 'worktree', 'add', '--detach', str(worktree), revision],
+            check=True, capture_output=True
+        )
+        try:
+            # Alone in its directory, so the worktree modules are imported
+            harness = Path(tmp) / 'bot_flows.py'
+            shutil.copy(__file__, harness)
+            output = Path(tmp) / 'result.json'
+            subprocess.run(
+                [sys.executable, str(harness), *argv, '--output', str(output)],
+                cwd=worktree, env={**os.environ, 'PYTHONPATH': str(worktree)},
+                check=True
+            )
+            return json.loads(output.read_text())
+        finally:
+            subprocess.run(
+                ['git', 'worktree', 'remove', '--force', str(worktree)],
+                check=True
+            )
+
+
+def print_results(result: dict) -> None:
+    print(f"{result['commit']} ({result['database']}, {result['redis']})")
+    for name, flow in result['flows'].items():
+        print(f"{name:10}: {flow['per_second']:8.0f} msg/s, "
+              f"p50 {flow['p50_ms']:6.2f} ms, p99 {flow['p99_ms']:6.2f} ms, "
+              f"errors {flow['errors']}")
+
+
+def print_comparison(base: dict, head: dict) -> None:
+    print(f"{'flow':10}  {base['commit']:>18}  {head['commit']:>18}  change")
+    for name, flow in head['flows'].items():
+        before = base['flows'].get(name)
+        if before is None:
+            print(f"{name:10}  {'-':>18}  {flow['p50_ms']:15.2f} ms")
+            continue
+        change = flow['p50_ms'] / before['p50_ms'] - 1
+        print(f"{name:10}  {before['p50_ms']:15.2f} ms  {flow['p50_ms']:15.2f} ms  "
+              f"{change:+.1%} p50, "
+              f"{flow['p99_ms'] / before['p99_ms'] - 1:+.1%} p99")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--chats', type=int, default=100)
+    parser.add_argument('--rounds', type=int, default=5)
+    parser.add_argument('--words', type=int, default=50)
+    parser.add_argument('--database-url', default='')
+    parser.add_argument('--redis-url', default='')
+    parser.add_argument('--output', help='save results as JSON')
+    parser.add_argument('--compare', help='JSON saved by an earlier run')
+    parser.add_argument('--commit', help='also run on this git revision')
+    args = parser.parse_args()
+
+    base = None
+    if args.commit:
+        argv = [
+            '--chats', str(args.chats), '--rounds', str(args.rounds),
+            '--words', str(args.words)
+        ]
+        if args.database_url:
+            argv += ['--database-url', args.database_url]
+        if args.redis_url:
+            argv += ['--redis-url', args.redis_url]
+        base = run_at_commit(args.commit, argv)
+    elif args.compare:
+        base = json.loads(Path(args.compare).read_text())
+
+    result = run(args)
+    print_results(result)
+    if args.output:
+        Path(args.output).write_text(json.dumps(result, indent=2))
+    if base is not None:
+        print()
+        print_comparison(base, result)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""
+Load test of ChatWorkerPool: thousands of chats answering and taking clues.
+
+    python -m benchmarks.chat_workers --chats 5000 --workers 8
+
+Every chat gets a word, then rounds of "clue" + "answer" updates; an
+answer reads the word and starts the next one in two round trips, like
+the bot handlers. Handlers sleep --latency-ms to stand in for the
+Telegram API call. State lives in fakeredis; at the end every chat must
+have seen its words in order with one clue each.
+"""
+import argparse
+import threading
+import time
+
+from types import SimpleNamespace
+import fakeredis
+from state import RedisStateManager
+from workers import ChatWorkerPool
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--chats', type=int, default=5000)
+    parser.add_argument('--rounds', type=int, default=3)
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--queue-size', type=int, default=100)
+    parser.add_argument('--producers', type=int, default=4)
+    parser.add_argument('--latency-ms', type=float, default=1.0)
+    args = parser.parse_args()
+
+    state_manager = RedisStateManager(
+        fakeredis.FakeRedis(decode_responses=True),
+        SimpleNamespace(prefix='bench:', ttl=3600)
+    )
+    finished = {chat_id: [] for chat_id in range(args.chats)}
+    latency = args.latency_ms / 1000
+
+    def clue(chat_id: int) -> None:
+        state_manager.take_clue(chat_id)
+        time.sleep(latency)
+
+    def answer(chat_id: int, next_word: str) -> None:
+        word = state_manager.finish_word(chat_id)
+        finished[chat_id].append((word.word, word.clues))
+        state_manager.begin_training(chat_id, next_word, [next_word])
+        time.sleep(latency)
+
+    def produce(chat_ids: range) -> None:
+        for chat_id in chat_ids:
+            pool.submit(chat_id, state_manager.begin_training,
+                        chat_id, 'word0', ['word0'], block=True)
+        for n in range(1, args.rounds + 1):
+            for chat_id in chat_ids:
+                pool.submit(chat_id, clue, chat_id, block=True)
+                pool.submit(chat_id, answer, chat_id, f"word{n}", block=True)
+
+    pool = ChatWorkerPool(args.workers, args.queue_size)
+    pool.start()
+    started = time.perf_counter()
+    producers = [
+        threading.Thread(
+            target=produce, args=(range(start, args.chats, args.producers),)
+        )
+        for start in range(args.producers)
+    ]
+    for producer in producers:
+        producer.start()
+    for producer in producers:
+        producer.join()
+    pool.shutdown()
+    elapsed = time.perf_counter() - started
+
+    expected = [(f"word{n}", 1) for n in range(args.rounds)]
+    broken = sum(words != expected for words in finished.values())
+    stats = pool.stats()
+    print(f"{stats.completed:,} updates of {args.chats:,} chats in "
+          f"{elapsed:.1f} s ({stats.completed / elapsed:,.0f} updates/s)")
+    print(f"max queue depth {stats.max_depth}/{args.queue_size}, "
+          f"max wait in queue {stats.max_wait_seconds * 1000:.0f} ms, "
+          f"producers blocked {stats.blocked_seconds:.1f} s, "
+          f"rejected {stats.rejected}, failed {stats.failed}")
+    print(f"chats with out of order state: {broken}")
+
+
+if __name__ == '__main__':
+    main()
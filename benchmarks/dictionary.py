@@ -0,0 +1,79 @@
+"""
+Offline dictionary benchmarks: index build time and lookup latency.
+
+Generates a synthetic `word<TAB>translation` file, builds the SQLite index
+with dictionary.load_tsv and measures single-word lookups.
+
+    python -m benchmarks.dictionary --rows 2000000 --lookups 100000
+"""
+import argparse
+import random
+import statistics
+import string
+import tempfile
+import time
+
+from pathlib import Path
+from dictionary import OfflineDictionary, load_tsv
+
+
+def random_word(rng: random.Random) -> str:
+    return ''.join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 10)))
+
+
+def write_tsv(path: Path, rows: int, rng: random.Random) -> list[str]:
+    words = []
+    with open(path, 'w', encoding='utf-8') as f:
+        for _ in range(rows):
+            # About 1.5 senses per word on average
+            if words and rng.random() < 0.33:
+                word = rng.choice(words[-100:])
+            else:
+                word = random_word(rng)
+                words.append(word)
+            f.write(f"{word}\t{random_word(rng)}\n")
+    return words
+
+
+def percentile(samples: list[float], share: float) -> float:
+    return samples[min(len(samples) - 1, int(len(samples) * share))]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, default=2_000_000)
+    parser.add_argument('--lookups', type=int, default=100_000)
+    args = parser.parse_args()
+    rng = random.Random(1)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tsv_path = Path(tmp) / 'words.tsv'
+        db_path = Path(tmp) / 'dictionary.sqlite3'
+        words = write_tsv(tsv_path, args.rows, rng)
+
+        started = time.perf_counter()
+        entries = load_tsv(tsv_path, db_path)
+        elapsed = time.perf_counter() - started
+        print(f"load: {args.rows} rows -> {entries} entries in {elapsed:.2f} s "
+              f"({args.rows / elapsed:,.0f} rows/s), "
+              f"index {db_path.stat().st_size / 2 ** 20:.1f} MB")
+
+        dictionary = OfflineDictionary(db_path)
+        for title, queries in (
+            ('hit', [rng.choice(words) for _ in range(args.lookups)]),
+            # Misses go through every lemmatization candidate
+            ('miss', [random_word(rng) + 'ings' for _ in range(args.lookups)]),
+        ):
+            samples = []
+            for word in queries:
+                started = time.perf_counter()
+                dictionary.senses(word)
+                samples.append((time.perf_counter() - started) * 1e6)
+            samples.sort()
+            print(f"lookup {title}: p50 {percentile(samples, 0.5):.1f} us, "
+                  f"p99 {percentile(samples, 0.99):.1f} us, "
+                  f"mean {statistics.fmean(samples):.1f} us")
+
+
+if __name__ == '__main__':
+    main()
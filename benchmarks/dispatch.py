@@ -0,0 +1,66 @@
+"""
+Command routing cost: telebot predicate chain vs CommandDispatcher table.
+
+    python -m benchmarks.dispatch --number 200000
+
+The chain is what telebot did before: one command_or_text closure per
+handler, tried in order. Extra synthetic commands are added to show how
+both scale; the message is a plain answer that matches no command.
+"""
+import argparse
+import timeit
+
+from types import SimpleNamespace
+from commands import BotCommands
+from dispatcher import CommandDispatcher
+
+
+def command_or_text(command: str, button_text: str):
+    """Previous handler filter"""
+    def wrapper(message) -> bool:
+        if message.content_type != 'text':
+            return False
+        if message.text.startswith('/'):
+            return message.text[1:] == command
+        return message.text == button_text
+    return wrapper
+
+
+def noop(message) -> None:
+    pass
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--number', type=int, default=200_000)
+    args = parser.parse_args()
+
+    message = SimpleNamespace(
+        text='cat', content_type='text', chat=SimpleNamespace(id=1)
+    )
+    for extra in (0, 50, 500):
+        commands = list(BotCommands) + [
+            SimpleNamespace(command=f"cmd{n}", button_text=f"Button {n}")
+            for n in range(extra)
+        ]
+
+        chain = [
+            command_or_text(command.command, command.button_text)
+            for command in commands
+        ]
+        dispatcher = CommandDispatcher(lambda chat_id: None)
+        for command in commands:
+            dispatcher.command(command)(noop)
+        dispatcher.state(None)(noop)
+
+        for implementation, call in (
+            ('chain', lambda: next((f for f in chain if f(message)), None)),
+            ('table', lambda: dispatcher.dispatch(message)),
+        ):
+            elapsed = timeit.timeit(call, number=args.number)
+            print(f"{len(commands):4} commands {implementation}: "
+                  f"{elapsed / args.number * 1e9:.0f} ns/message")
+
+
+if __name__ == '__main__':
+    main()
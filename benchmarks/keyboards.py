@@ -0,0 +1,37 @@
+"""
+Reply keyboard cost per message: building and serializing vs prepared.
+
+    python -m benchmarks.keyboards --number 200000
+
+"build" is what every reply paid before: a new ReplyKeyboardMarkup
+serialized by telebot. "prepared" is the registry keyboard as sent now.
+"""
+import argparse
+import timeit
+
+from telebot import apihelper
+from keyboards import build_main_keyboard, build_training_keyboard, \
+    get_main_keyboard, training_keyboard
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--number', type=int, default=200_000)
+    args = parser.parse_args()
+
+    cases = (
+        ('main', build_main_keyboard, get_main_keyboard),
+        ('training', build_training_keyboard, training_keyboard),
+    )
+    for title, build, get in cases:
+        for implementation, call in (
+            ('build', lambda: apihelper._convert_markup(build())),
+            ('prepared', lambda: apihelper._convert_markup(get())),
+        ):
+            elapsed = timeit.timeit(call, number=args.number)
+            print(f"{title:8} {implementation:8}: "
+                  f"{elapsed / args.number * 1e6:.2f} us/reply")
+
+
+if __name__ == '__main__':
+    main()
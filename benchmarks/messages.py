@@ -0,0 +1,48 @@
+"""
+Messages.get throughput: flattened catalog vs walking the nested dict.
+
+    python -m benchmarks.messages --number 1000000
+"""
+import argparse
+import timeit
+
+from messages import Messages
+
+
+def nested_get(messages: dict, language: str, key: str, **kwargs) -> str:
+    """Previous implementation of Messages.get"""
+    value = messages[language]
+    for k in key.split('.'):
+        value = value[k]
+    return value.format(**kwargs)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--number', type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    messages = Messages('en')
+    cases = (
+        ('static', 'training.correct', {}),
+        ('template', 'training.word_prompt', {'word': 'hello'}),
+    )
+    for title, key, kwargs in cases:
+        for implementation, call in (
+            ('nested', lambda: nested_get(messages.messages, 'en', key, **kwargs)),
+            ('catalog', lambda: messages.get(key, **kwargs)),
+        ):
+            elapsed = timeit.timeit(call, number=args.number)
+            print(f"{title:8} {implementation:7}: "
+                  f"{args.number / elapsed / 1e6:.2f} M gets/s, "
+                  f"{elapsed / args.number * 1e9:.0f} ns/get")
+
+    started = timeit.default_timer()
+    for _ in range(1000):
+        Messages('ru')
+    print(f"Messages('ru'): "
+          f"{(timeit.default_timer() - started) / 1000 * 1e6:.1f} us/instance")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+"""
+Cost of the metrics instrumentation against its overhead budget.
+
+    python -m benchmarks.metrics --number 100000
+
+Every instrumented operation (a handler, a Redis command, a SQL
+statement) may get at most --budget-us microseconds slower. Exits with
+status 1 when an operation is over the budget. Redis is measured on a
+client that doesn't talk to a server, so only the instrumentation is
+timed; SQL runs against in-memory SQLite, the fastest database it meets.
+"""
+import argparse
+import sys
+import timeit
+
+from types import SimpleNamespace
+import metrics
+from prometheus_client import Histogram, generate_latest
+from commands import BotCommands
+from dispatcher import CommandDispatcher
+from sqlalchemy import create_engine, text
+
+
+def handle_train(message) -> None:
+    pass
+
+
+class StubRedis:
+    """Client with redis-py's entry points and no server behind them."""
+
+    def execute_command(self, *args, **options):
+        return None
+
+    def pipeline(self, transaction: bool = True, shard_hint=None):
+        return SimpleNamespace(execute=lambda: [])
+
+    def get(self, name):
+        return self.execute_command('GET', name)
+
+
+def cost_us(call, number: int) -> float:
+    # Best of three runs hides scheduler noise
+    return min(timeit.repeat(call, number=number, repeat=3)) / number * 1e6
+
+
+def paired_cost_us(before, after, number: int, repeat: int = 7) -> tuple[float, float]:
+    """
+    Best runs of both calls, measured in turns: a slow stretch of the
+    machine hits both of them instead of showing up as overhead.
+    """
+    base, instrumented = [], []
+    for _ in range(repeat):
+        base.append(timeit.timeit(before, number=number))
+        instrumented.append(timeit.timeit(after, number=number))
+    return min(base) / number * 1e6, min(instrumented) / number * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--number', type=int, default=100_000)
+    parser.add_argument('--budget-us', type=float, default=6.0)
+    args = parser.parse_args()
+
+    message = SimpleNamespace(
+        text='/train', content_type='text', chat=SimpleNamespace(id=1)
+    )
+    plain = CommandDispatcher(lambda chat_id: None)
+    timed = CommandDispatcher(lambda chat_id: None)
+    for dispatcher in (plain, timed):
+        dispatcher.command(BotCommands.TRAIN)(handle_train)
+    timed.add_timing_hook(metrics.observe_handler)
+
+    redis_plain = StubRedis()
+    redis_timed = metrics.instrument_redis(StubRedis())
+
+    sqlite_plain = create_engine('sqlite://').connect()
+    engine = create_engine('sqlite://')
+    metrics.instrument_engine(engine)
+    sqlite_timed = engine.connect()
+    query = text('SELECT 1')
+
+    histogram = Histogram('bench_seconds', 'Benchmark', ['name'], registry=None)
+    print(f"histogram observe: "
+          f"{cost_us(lambda: histogram.labels('x').observe(0.01), args.number):.2f} us")
+
+    cases = (
+        ('handler', lambda: plain.dispatch(message), lambda: timed.dispatch(message), 1),
+        ('redis GET', lambda: redis_plain.get('key'), lambda: redis_timed.get('key'), 1),
+        ('sql SELECT', lambda: sqlite_plain.execute(query),
+         lambda: sqlite_timed.execute(query), 4),
+    )
+    over = False
+    for title, before, after, divider in cases:
+        number = max(1, args.number // divider)
+        base, instrumented = paired_cost_us(before, after, number)
+        overhead = instrumented - base
+        status = 'ok' if overhead <= args.budget_us else 'OVER BUDGET'
+        over = over or overhead > args.budget_us
+        print(f"{title:10}: {base:8.2f} us -> {instrumented:8.2f} us "
+              f"(+{overhead:.2f} us) {status}")
+
+    print(f"/metrics render: "
+          f"{cost_us(lambda: generate_latest(metrics.registry), 1000) / 1000:.2f} ms")
+    sys.exit(1 if over else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+"""
+Spaced repetition benchmarks: picking the next cards and recomputing due dates.
+
+Seeds users with words and review rows, then measures the "due soonest"
+deck query of random users and the batch recompute job.
+
+    python -m benchmarks.next_card --users 2000 --words 1000
+    python -m benchmarks.next_card --database-url postgresql://...
+
+Without --database-url a temporary SQLite file is used. A Postgres
+database given by URL must be empty: tables are created and dropped.
+"""
+import argparse
+import random
+import statistics
+import tempfile
+import time
+
+from datetime import datetime, timedelta
+from pathlib import Path
+from sqlalchemy import create_engine, insert
+from database.db import Base, db_session
+from database.models import Reviews, Users, Words
+
+
+def percentile(samples: list[float], share: float) -> float:
+    return samples[min(len(samples) - 1, int(len(samples) * share))]
+
+
+def seed(engine, users: int, words: int, rng: random.Random) -> None:
+    now = datetime.now()
+    with engine.begin() as connection:
+        connection.execute(insert(Users), [
+            {'id': user_id, 'telegram_id': user_id, 'best_score': 0}
+            for user_id in range(1, users + 1)
+        ])
+        for user_id in range(1, users + 1):
+            left_words = [f"word{n}" for n in range(words)]
+            connection.execute(insert(Words), [
+                {
+                    'user_id': user_id,
+                    'left_word': left_word,
+                    'right_word': f"translation{n}",
+                    'added_date': now
+                }
+                for n, left_word in enumerate(left_words)
+            ])
+            connection.execute(insert(Reviews), [
+                {
+                    'user_id': user_id,
+                    'left_word': left_word,
+                    'ease': 2.5,
+                    'interval_days': rng.choice((0.0, 1.0, 6.0, 15.0)),
+                    'repetitions': rng.randint(0, 4),
+                    'lapses': 0,
+                    'due': now + timedelta(hours=rng.uniform(-48, 720)),
+                    'last_review': now - timedelta(days=1)
+                }
+                for left_word in left_words
+            ])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--database-url', default='')
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--words', type=int, default=1000)
+    parser.add_argument('--deck-size', type=int, default=20)
+    parser.add_argument('--queries', type=int, default=2000)
+    args = parser.parse_args()
+    rng = random.Random(1)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = args.database_url or f"sqlite:///{Path(tmp) / 'bench.sqlite3'}"
+        engine = create_engine(url)
+        Base.metadata.create_all(engine)
+        try:
+            started = time.perf_counter()
+            seed(engine, args.users, args.words, rng)
+            print(f"seed: {args.users * args.words:,} reviews in "
+                  f"{time.perf_counter() - started:.1f} s")
+
+            samples = []
+            with engine.connect() as connection:
+                for _ in range(args.queries):
+                    user_id = rng.randint(1, args.users)
+                    started = time.perf_counter()
+                    rows = connection.execute(
+                        Reviews._training_deck_query(user_id, args.deck_size)
+                    )
+                    Reviews._deck(rows.all())
+                    samples.append((time.perf_counter() - started) * 1e3)
+            samples.sort()
+            print(f"next {args.deck_size} cards: "
+                  f"p50 {percentile(samples, 0.5):.2f} ms, "
+                  f"p99 {percentile(samples, 0.99):.2f} ms, "
+                  f"mean {statistics.fmean(samples):.2f} ms")
+
+            db_session.remove()
+            db_session.configure(bind=engine)
+            started = time.perf_counter()
+            updated = Reviews.recompute_all()
+            elapsed = time.perf_counter() - started
+            print(f"recompute: {updated:,} updated in {elapsed:.1f} s "
+                  f"({args.users * args.words / elapsed:,.0f} rows/s)")
+        finally:
+            db_session.remove()
+            Base.metadata.drop_all(engine)
+            engine.dispose()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""
+Memory used by per-chat training state: old key layout vs per-chat hash.
+
+Fills a dedicated Redis database with synthetic chats in the training
+state, once per layout, and reports `used_memory` growth.
+
+    python -m benchmarks.redis_state_memory --chats 1000000 --db 15
+
+The selected database is flushed before and after every run.
+"""
+import argparse
+import random
+
+import redis
+
+from config import config
+from state import encode_translations
+
+WORDS = [
+    'привет', 'мир', 'кот', 'собака', 'дом', 'книга', 'вода', 'солнце',
+    'здравствуйте', 'хай', 'путешествие', 'дерево'
+]
+
+
+def synthetic_chat(rng: random.Random) -> tuple[str, list[str], int]:
+    word = rng.choice(WORDS)
+    translations = rng.sample(WORDS, rng.randint(1, 3))
+    return word, translations, rng.randint(0, 3)
+
+
+def fill_legacy(client, prefix: str, chats: int, ttl: int, batch: int) -> None:
+    rng = random.Random(1)
+    pipe = client.pipeline(transaction=False)
+    for chat_id in range(chats):
+        _, translations, clue = synthetic_chat(rng)
+        key = f"{prefix}user:{chat_id}"
+        pipe.setex(key, ttl, 'training')
+        pipe.rpush(f"{key}:translations", *translations)
+        if clue:
+            pipe.set(f"{key}:clue", clue)
+        if chat_id % batch == 0:
+            pipe.execute()
+    pipe.execute()
+
+
+def fill_hash(client, prefix: str, chats: int, ttl: int, batch: int) -> None:
+    rng = random.Random(1)
+    pipe = client.pipeline(transaction=False)
+    for chat_id in range(chats):
+        word, translations, clue = synthetic_chat(rng)
+        key = f"{prefix}user:{chat_id}"
+        pipe.hset(key, mapping={
+            'state': 'training',
+            'word': word,
+            'clue': clue,
+            'translations': encode_translations(translations)
+        })
+        pipe.expire(key, ttl)
+        if chat_id % batch == 0:
+            pipe.execute()
+    pipe.execute()
+
+
+def measure(client, fill, chats: int, batch: int) -> tuple[int, int]:
+    client.flushdb()
+    before = client.info('memory')['used_memory']
+    fill(client, config.redis.prefix, chats, config.redis.ttl, batch)
+    used = client.info('memory')['used_memory'] - before
+    keys = client.dbsize()
+    client.flushdb()
+    return used, keys
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--chats', type=int, default=1_000_000)
+    parser.add_argument('--db', type=int, default=15)
+    parser.add_argument('--batch', type=int, default=10_000)
+    args = parser.parse_args()
+
+    client = redis.Redis(
+        host=config.redis.host,
+        port=config.redis.port,
+        password=config.redis.password or None,
+        db=args.db,
+        decode_responses=True
+    )
+
+    results = {
+        'separate keys': measure(client, fill_legacy, args.chats, args.batch),
+        'per-chat hash': measure(client, fill_hash, args.chats, args.batch),
+    }
+    print(f"{'layout':<15}{'keys':>12}{'used memory, MB':>18}{'bytes/chat':>12}")
+    for layout, (used, keys) in results.items():
+        print(f"{layout:<15}{keys:>12}{used / 2 ** 20:>18.1f}"
+              f"{used / args.chats:>12.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""
+Startup cost of the bot entry points, measured with `python -X importtime`.
+
+    python -m benchmarks.startup --repeat 5 --budget-ms 1000
+
+Every module is imported --repeat times, each in a fresh interpreter with
+network connections refused: importing must neither need the database
+nor Redis. Prints the median cumulative import time and the modules with
+the largest own import time. Exits with status 1 when an import fails or
+takes longer than the budget.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+from collections import defaultdict
+
+
+MODULES = ('main', 'async_main', 'webhook')
+
+# Fails the import if anything tries to connect at import time
+IMPORT = """
+import socket
+def refuse(*args, **kwargs):
+    raise ConnectionRefusedError('network is off while importing')
+socket.socket.connect = refuse
+socket.create_connection = refuse
+import {module}
+"""
+
+
+def import_times(module: str) -> dict[str, tuple[int, int]]:
+    """Module -> (own, cumulative) import time in microseconds."""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', IMPORT.format(module=module)],
+        capture_output=True, text=True,
+        env={**os.environ, 'TELEGRAM_BOT_TOKEN': '123456:startup'}
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        own, cumulative, name = line[len('import time:'):].split('|')
+        times[name.strip()] = (int(own), int(cumulative))
+    return times
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--top', type=int, default=8)
+    parser.add_argument('--budget-ms', type=float, default=1000)
+    args = parser.parse_args()
+
+    over = False
+    for module in MODULES:
+        totals, own = [], defaultdict(list)
+        try:
+            for _ in range(args.repeat):
+                times = import_times(module)
+                totals.append(times[module][1] / 1000)
+                for name, (self_us, _) in times.items():
+                    own[name].append(self_us / 1000)
+        except RuntimeError as error:
+            print(f"{module:10}: import failed: {error}")
+            over = True
+            continue
+
+        total = statistics.median(totals)
+        status = 'ok' if total <= args.budget_ms else 'OVER BUDGET'
+        over = over or total > args.budget_ms
+        print(f"{module:10}: {total:7.1f} ms (min {min(totals):.1f}) {status}")
+        slowest = sorted(
+            own.items(), key=lambda item: statistics.median(item[1]), reverse=True
+        )
+        for name, samples in slowest[:args.top]:
+            print(f"    {statistics.median(samples):6.1f} ms  {name}")
+    sys.exit(1 if over else 0)
+
+
+if __name__ == '__main__':
+    main()
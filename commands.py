@@ -0,0 +1,25 @@
+from enum import Enum
+from typing import Optional
+
+
+class BotCommands(Enum):
+    """Commands and button texts of the bot."""
+    ADD_WORD = ('add', '➕ Add word')
+    TRAIN = ('train', '🎯 Train')
+    BACK_TO_MENU = ('break', '🔙 Back to menu')
+    START = ('start', None)
+    CLUE = ('clue', '➕ Clue')
+    SWITCH_LANGUAGE = ('switch_language', 'Switch language')
+    TRANSLATE = ('translate', 'Translate')
+
+    def __init__(self, command: str, button_text: Optional[str]) -> None:
+        self.command = command
+        self.button_text = button_text
+
+
+class UserState(Enum):
+    IDLE = "idle"
+    AWAITING_WORD_PAIR = "awaiting_word_pair"
+    TRAINING = "training"
+    SWITCH_LANGUAGE = "switch_language"
+    TRANSLATE = "translate"
@@ -2,7 +2,20 @@ import os
 from dotenv import load_dotenv
 import yaml
 from dataclasses import dataclass
-from typing import Optional
+
+
+# Парсер libyaml, если PyYAML собран с ним: в разы быстрее при старте
+YamlLoader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+
+def parse_nodes(nodes: str) -> list[tuple[str, int]]:
+    """'host1:26379,host2:26379' -> [('host1', 26379), ('host2', 26379)]"""
+    parsed = []
+    for node in nodes.split(','):
+        if node.strip():
+            host, port = node.strip().rsplit(':', 1)
+            parsed.append((host, int(port)))
+    return parsed
 
 
 @dataclass
@@ -13,6 +26,13 @@ class RedisConfig:
     db: int
     ttl: int
     prefix: str
+    mode: str
+    max_connections: int
+    socket_timeout: float
+    socket_connect_timeout: float
+    health_check_interval: int
+    sentinels: list[tuple[str, int]]
+    service_name: str
 
 
 @dataclass
@@ -23,6 +43,84 @@ class DatabaseConfig:
     host: str
     port: str
     db_url: str
+    pool_size: int
+    max_overflow: int
+    pool_timeout: float
+    pool_recycle: int
+    pool_pre_ping: bool
+
+
+@dataclass
+class BotConfig:
+    max_concurrent_updates: int
+    workers: int
+    queue_size: int
+
+
+@dataclass
+class WebhookConfig:
+    host: str
+    port: int
+    path: str
+    url: str
+    secret_token: str
+    workers: int
+    queue_size: int
+
+
+@dataclass
+class TrainingConfig:
+    deck_size: int
+    deck_refill_threshold: int
+
+
+@dataclass
+class ImportConfig:
+    batch_size: int
+    max_file_size: int
+
+
+@dataclass
+class AnswersConfig:
+    stream_maxlen: int
+    batch_size: int
+    block_ms: int
+    claim_idle_ms: int
+    max_deliveries: int
+
+
+@dataclass
+class CacheConfig:
+    users_max_size: int
+    users_ttl: int
+
+
+@dataclass
+class MetricsConfig:
+    enabled: bool
+    host: str
+    port: int
+
+
+@dataclass
+class TranslationConfig:
+    provider: str
+    dictionary_path: str
+    offline_dictionary_path: str
+    max_senses: int
+    api_url: str
+    app_id: str
+    app_key: str
+    pool_size: int
+    connect_timeout: float
+    read_timeout: float
+    max_retries: int
+    retry_backoff: float
+    breaker_failures: int
+    breaker_reset_timeout: float
+    cache_ttl: int
+    negative_cache_ttl: int
+    memory_max_size: int
 
 
 class Config:
@@ -31,7 +129,7 @@ class Config:
 
         # Загрузка конфигурации из файла
         with open('configs.yaml', 'r') as file:
-            config = yaml.safe_load(file)
+            config = yaml.load(file, Loader=YamlLoader)
 
         # Конфигурация Redis
         redis_config = config['redis']
@@ -41,7 +139,24 @@ class Config:
             password=os.getenv('REDIS_PASSWORD', redis_config['password']),
             db=int(os.getenv('REDIS_DB', redis_config['db'])),
             ttl=int(os.getenv('REDIS_TTL', redis_config['ttl'])),
-            prefix=redis_config['prefix']
+            prefix=redis_config['prefix'],
+            mode=os.getenv('REDIS_MODE', redis_config.get('mode', 'standalone')),
+            max_connections=int(os.getenv(
+                'REDIS_MAX_CONNECTIONS', redis_config.get('max_connections', 50)
+            )),
+            socket_timeout=float(redis_config.get('socket_timeout', 5)),
+            socket_connect_timeout=float(
+                redis_config.get('socket_connect_timeout', 2)
+            ),
+            health_check_interval=int(
+                redis_config.get('health_check_interval', 30)
+            ),
+            sentinels=parse_nodes(os.getenv(
+                'REDIS_SENTINELS', ','.join(redis_config.get('sentinels', []))
+            )),
+            service_name=os.getenv(
+                'REDIS_SERVICE_NAME', redis_config.get('service_name', 'mymaster')
+            )
         )
 
         # Конфигурация базы данных
@@ -52,8 +167,152 @@ class Config:
             password=db_config['password'],
             host=db_config['host'],
             port=db_config['port'],
-            db_url=db_config['db_url']
+            db_url=db_config['db_url'],
+            pool_size=int(os.getenv(
+                'DATABASE_POOL_SIZE', db_config.get('pool_size', 10)
+            )),
+            max_overflow=int(os.getenv(
+                'DATABASE_MAX_OVERFLOW', db_config.get('max_overflow', 5)
+            )),
+            pool_timeout=float(db_config.get('pool_timeout', 10)),
+            pool_recycle=int(db_config.get('pool_recycle', 1800)),
+            pool_pre_ping=bool(db_config.get('pool_pre_ping', True))
+        )
+
+        # Конфигурация обработки обновлений
+        bot_config = config.get('bot', {})
+        self.bot = BotConfig(
+            max_concurrent_updates=int(os.getenv(
+                'BOT_MAX_CONCURRENT_UPDATES',
+                bot_config.get('max_concurrent_updates', 15)
+            )),
+            workers=int(os.getenv('BOT_WORKERS', bot_config.get('workers', 8))),
+            queue_size=int(bot_config.get('queue_size', 100))
+        )
+
+        # Конфигурация webhook-сервера
+        webhook_config = config.get('webhook', {})
+        self.webhook = WebhookConfig(
+            host=os.getenv('WEBHOOK_HOST', webhook_config.get('host', '0.0.0.0')),
+            port=int(os.getenv('WEBHOOK_PORT', webhook_config.get('port', 8080))),
+            path=webhook_config.get('path', '/webhook'),
+            url=os.getenv('WEBHOOK_URL', webhook_config.get('url', '')),
+            secret_token=os.getenv(
+                'WEBHOOK_SECRET_TOKEN', webhook_config.get('secret_token', '')
+            ),
+            workers=int(os.getenv(
+                'WEBHOOK_WORKERS', webhook_config.get('workers', 8)
+            )),
+            queue_size=int(webhook_config.get('queue_size', 100))
+        )
+
+        # Конфигурация тренировки
+        training_config = config.get('training', {})
+        self.training = TrainingConfig(
+            deck_size=int(training_config.get('deck_size', 20)),
+            deck_refill_threshold=int(
+                training_config.get('deck_refill_threshold', 2)
+            )
+        )
+
+        # Конфигурация массового импорта пар слов
+        import_config = config.get('import', {})
+        self.word_import = ImportConfig(
+            batch_size=int(import_config.get('batch_size', 1000)),
+            max_file_size=int(import_config.get('max_file_size', 5242880))
+        )
+
+        # Конфигурация буфера ответов на тренировке
+        answers_config = config.get('answers', {})
+        self.answers = AnswersConfig(
+            stream_maxlen=int(answers_config.get('stream_maxlen', 100000)),
+            batch_size=int(answers_config.get('batch_size', 500)),
+            block_ms=int(answers_config.get('block_ms', 1000)),
+            claim_idle_ms=int(answers_config.get('claim_idle_ms', 60000)),
+            max_deliveries=int(answers_config.get('max_deliveries', 5))
+        )
+
+        # Конфигурация кешей в памяти процесса
+        cache_config = config.get('cache', {})
+        self.cache = CacheConfig(
+            users_max_size=int(cache_config.get('users_max_size', 10000)),
+            users_ttl=int(cache_config.get('users_ttl', 600))
+        )
+
+        # Конфигурация метрик
+        metrics_config = config.get('metrics', {})
+        self.metrics = MetricsConfig(
+            enabled=bool(metrics_config.get('enabled', True)),
+            host=os.getenv('METRICS_HOST', metrics_config.get('host', '127.0.0.1')),
+            port=int(os.getenv('METRICS_PORT', metrics_config.get('port', 9100)))
+        )
+
+        # Конфигурация переводчика
+        translation_config = config.get('translation', {})
+        self.translation = TranslationConfig(
+            provider=os.getenv(
+                'TRANSLATION_PROVIDER',
+                translation_config.get('provider', 'oxford')
+            ),
+            dictionary_path=os.getenv(
+                'TRANSLATION_DICTIONARY_PATH',
+                translation_config.get('dictionary_path', '')
+            ),
+            offline_dictionary_path=os.getenv(
+                'TRANSLATION_OFFLINE_DICTIONARY_PATH',
+                translation_config.get('offline_dictionary_path', '')
+            ),
+            max_senses=int(translation_config.get('max_senses', 3)),
+            api_url=os.getenv(
+                'TRANSLATION_API_URL', translation_config.get('api_url')
+            ),
+            app_id=os.getenv(
+                'TRANSLATION_APP_ID', translation_config.get('app_id')
+            ),
+            app_key=os.getenv(
+                'TRANSLATION_APP_KEY', translation_config.get('app_key')
+            ),
+            pool_size=int(translation_config.get('pool_size', 10)),
+            connect_timeout=float(
+                translation_config.get('connect_timeout', 3.05)
+            ),
+            read_timeout=float(translation_config.get('read_timeout', 5)),
+            max_retries=int(translation_config.get('max_retries', 2)),
+            retry_backoff=float(translation_config.get('retry_backoff', 0.2)),
+            breaker_failures=int(translation_config.get('breaker_failures', 5)),
+            breaker_reset_timeout=float(
+                translation_config.get('breaker_reset_timeout', 30)
+            ),
+            cache_ttl=int(translation_config.get('cache_ttl', 604800)),
+            negative_cache_ttl=int(
+                translation_config.get('negative_cache_ttl', 3600)
+            ),
+            memory_max_size=int(
+                translation_config.get('memory_max_size', 10000)
+            )
+        )
+
+        self.check_database_pool()
+
+    def check_database_pool(self) -> None:
+        """
+        Проверить при старте, что пула базы хватает всем обработчикам:
+        иначе под нагрузкой они ждут соединение pool_timeout секунд и падают
+        """
+        connections = self.database.pool_size + self.database.max_overflow
+        # Асинхронный бот держит соединение на каждое обновление в работе,
+        # потоки синхронного бота и webhook - по одному, плюс поток ответов
+        required = max(
+            self.bot.max_concurrent_updates,
+            self.bot.workers + 1,
+            self.webhook.workers + 1
         )
+        if connections < required:
+            raise ValueError(
+                f"database.pool_size + database.max_overflow = {connections} "
+                f"connections, the bot needs at least {required}: raise them "
+                f"or lower bot.max_concurrent_updates and the workers"
+            )
 
 
 # Создаем экземпляр конфигурации при импорте
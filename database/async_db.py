@@ -0,0 +1,44 @@
+import threading
+
+from typing import Optional
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, \
+    create_async_engine
+
+from config import config
+from database.db import database_url, engine_options
+
+
+_async_engine: Optional[AsyncEngine] = None
+_async_engine_lock = threading.Lock()
+
+
+def get_async_engine() -> AsyncEngine:
+    """Async engine of the configured database, created on first use."""
+    global _async_engine
+    if _async_engine is None:
+        with _async_engine_lock:
+            if _async_engine is None:
+                _async_engine = create_async_engine(
+                    database_url(config.database).replace(
+                        'postgresql://', 'postgresql+asyncpg://', 1
+                    ),
+                    **engine_options(config.database)
+                )
+    return _async_engine
+
+
+class LazyAsyncSessionMaker(async_sessionmaker):
+    """async_sessionmaker that binds to get_async_engine() on first use."""
+
+    def __call__(self, **local_kw):
+        if self.kw.get('bind') is None:
+            self.configure(bind=get_async_engine())
+        return super().__call__(**local_kw)
+
+
+# Асинхронный аналог db_session. Сессия открывается на время обработки
+# одного обновления: `async with async_session() as session: ...`
+async_session = LazyAsyncSessionMaker(
+    autoflush=False,
+    expire_on_commit=False
+)
@@ -1,49 +1,115 @@
-import psycopg2
-import yaml
+import threading
 
+from contextlib import contextmanager
+from typing import Iterator, Optional
 from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import scoped_session, sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 
+from config import config, DatabaseConfig
 
-with open('configs.yaml', 'r') as file:
-    # Parse configs file
-    configs = yaml.safe_load(file)
-    configs = configs.get('database', {})
-    dbname = configs.get('dbname')
-    user = configs.get('user')
-    password = configs.get('password')
-    host = configs.get('host')
-    port = configs.get('port')
-    url = f"postgresql://{host}:{port}/{dbname}"
-    if user and password:
-        url = f"postgresql://{user}:{password}@{host}:{port}/{dbname}"
 
+def database_url(database_config: DatabaseConfig) -> str:
+    """URL of the Postgres database from the `database` config section."""
+    host, port = database_config.host, database_config.port
+    url = f"postgresql://{host}:{port}/{database_config.dbname}"
+    if database_config.user and database_config.password:
+        url = (f"postgresql://{database_config.user}:{database_config.password}"
+               f"@{host}:{port}/{database_config.dbname}")
+    return url
+
+
+def engine_options(database_config: DatabaseConfig) -> dict:
+    """Pool settings of the `database` config section for create_engine."""
+    return dict(
+        pool_size=database_config.pool_size,
+        max_overflow=database_config.max_overflow,
+        pool_timeout=database_config.pool_timeout,
+        pool_recycle=database_config.pool_recycle,
+        pool_pre_ping=database_config.pool_pre_ping
+    )
+
+
+_engine: Optional[Engine] = None
+_engine_lock = threading.Lock()
+
+
+def get_engine() -> Engine:
+    """
+    Engine of the configured database, created on first use.
+
+    Importing models doesn't load the database driver; the schema is
+    managed by Alembic (`alembic upgrade head`).
+    """
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = create_engine(
+                    database_url(config.database),
+                    **engine_options(config.database)
+                )
+    return _engine
+
+
+def configure_engine(engine: Engine) -> None:
+    """Use another engine, e.g. a test database, for all sessions."""
+    global _engine
+    _engine = engine
+    db_session.remove()
+    db_session.configure(bind=engine)
+
+
+class LazySessionMaker(sessionmaker):
+    """sessionmaker that binds to get_engine() when the first session opens."""
+
+    def __call__(self, **local_kw):
+        if self.kw.get('bind') is None:
+            self.configure(bind=get_engine())
+        return super().__call__(**local_kw)
 
-engine = create_engine(url)
 
 # Сущность подключения к базе, отсюда она будет импортироваться
-# всюду где она нужна
+# всюду где она нужна. Движок создается при открытии первой сессии
 db_session = scoped_session(
-    sessionmaker(
-        bind=engine,
+    LazySessionMaker(
         autocommit=False,
         autoflush=False
     )
 )
 Base = declarative_base()
 
+
+@contextmanager
+def session_scope() -> Iterator[scoped_session]:
+    """
+    Session of one unit of work, e.g. one update, on the current thread.
+
+    At the end the session is closed whatever the handler left behind:
+    an open or failed transaction is rolled back, loaded objects are
+    dropped and the connection goes back to the pool, so the next update
+    of the thread starts clean. Nothing is created if the work doesn't
+    touch the database.
+    """
+    try:
+        yield db_session
+    finally:
+        db_session.remove()
+
 if __name__ == '__main__':
     # Test connection
+    import psycopg2
+
     connection = None
 
     try:
         connection = psycopg2.connect(
-            dbname=dbname,
-            user=user,
-            password=password,
-            host=host,
-            port=port
+            dbname=config.database.dbname,
+            user=config.database.user,
+            password=config.database.password,
+            host=config.database.host,
+            port=config.database.port
         )
         with connection.cursor() as cursor:
             cursor.execute('SELECT version();')
@@ -3,11 +3,7 @@ from typing import Optional, Annotated
 from datetime import date
 from sqlalchemy.orm import Session
 
-from database.db import engine, db_session
-from database.models import Base
-
-
-Base.metadata.create_all(bind=engine)
+from database.db import db_session
 
 
 class UserBase(BaseModel):
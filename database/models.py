@@ -1,27 +1,48 @@
+
+from collections import namedtuple
 from datetime import datetime
+from typing import Iterable
 
+from cache import LRUCache
+from config import config
 from database.db import Base, db_session
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, or_
-from sqlalchemy.orm import Session
+from answer_stats import AnswerEvent
+from scheduler import DEFAULT_EASE, ReviewState, recompute, schedule
+from sqlalchemy import Column, Integer, String, DateTime, Float, Boolean, \
+    ForeignKey, Index, or_, func, select, true, false, union_all, \
+    tuple_, update, values, column
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session, aliased
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import IntegrityError
 
 
+# То, что нужно обработчикам о пользователе на каждом сообщении
+UserRef = namedtuple('UserRef', ['id', 'language'])
+
+# telegram_id -> UserRef. Кеш локален для процесса: смена языка на другой
+# реплике станет видна не позже чем через users_ttl секунд
+user_cache = LRUCache(
+    max_size=config.cache.users_max_size,
+    ttl=config.cache.users_ttl
+)
+
+
 class Users(Base):
     __tablename__ = "users"
 
     id = Column(Integer, primary_key=True, index=True)
-    telegram_id = Column(Integer)
+    telegram_id = Column(Integer, unique=True, index=True)
     best_score = Column(Integer)
     language = Column(String, default="en")  # Новый столбец
 
     @classmethod
-    def get_or_create_user(cls, telegram_id: int, best_score: int = 0):
-        # db_session импортирован из database.db
-        # (там создается инстанс подключения к базе
-        # при первом обращеннии к ней, дальше мы его всюду используем)
-        instance = db_session.query(cls).filter_by(
-            telegram_id=telegram_id
-        ).first()
+    async def get_or_create_user_async(
+        cls, session: AsyncSession, telegram_id: int, best_score: int = 0
+    ):
+        """Найти пользователя по telegram_id или создать его."""
+        query = select(cls).filter_by(telegram_id=telegram_id).limit(1)
+        instance = (await session.execute(query)).scalar_one_or_none()
         if instance:
             return instance, False
         new_user = cls(
@@ -29,19 +50,64 @@ class Users(Base):
             best_score=best_score
         )
         try:
-            db_session.add(new_user)
-            db_session.commit()
+            session.add(new_user)
+            await session.commit()
             return new_user, True
         except IntegrityError:
-            db_session.rollback()
-            return db_session.query(cls).filter_by(
-                telegram_id=telegram_id
-            ).first(), False
+            await session.rollback()
+            instance = (await session.execute(query)).scalar_one_or_none()
+            return instance, False
+
+    @classmethod
+    async def get_user_ref_async(
+        cls, session: AsyncSession, telegram_id: int
+    ) -> UserRef:
+        """
+        Получить id и язык пользователя, создав его при необходимости.
+        При попадании в кеш к базе не обращается.
+        """
+        ref = user_cache.get(telegram_id)
+        if ref is None:
+            user, _ = await cls.get_or_create_user_async(
+                session, telegram_id=telegram_id
+            )
+            ref = UserRef(user.id, user.get_language())
+            user_cache.set(telegram_id, ref)
+        return ref
 
-    def set_language(self, new_language: str):
+    async def set_language_async(
+        self, session: AsyncSession, new_language: str
+    ):
         """Меняет язык пользователя."""
         self.language = new_language
-        db_session.commit()
+        await session.commit()
+        user_cache.invalidate(self.telegram_id)
+
+    @classmethod
+    def _change_language_query(cls, telegram_id: int, language: str):
+        return update(cls).where(cls.telegram_id == telegram_id) \
+            .values(language=language).returning(cls.id)
+
+    @classmethod
+    async def change_language_async(
+        cls, session: AsyncSession, telegram_id: int, language: str
+    ) -> UserRef:
+        """
+        Сменить язык одним UPDATE и сразу обновить кеш user_cache,
+        чтобы следующее сообщение не ходило в базу
+        """
+        user_id = (await session.execute(
+            cls._change_language_query(telegram_id, language)
+        )).scalar_one_or_none()
+        await session.commit()
+        if user_id is None:
+            user, _ = await cls.get_or_create_user_async(session, telegram_id)
+            await user.set_language_async(session, language)
+            user_id = user.id
+
+        ref = UserRef(user_id, language)
+        user_cache.set(telegram_id, ref)
+        return ref
 
     def get_language(self) -> str:
         """Возвращает язык пользователя, если он есть, иначе 'en'."""
@@ -51,12 +117,21 @@ class Users(Base):
 class Words(Base):
     __tablename__ = "words"
 
-    id = Column(Integer, primary_key=True, index=True)
-    left_word = Column(String, index=True)
-    right_word = Column(String, index=True)
-    added_date = Column(DateTime, index=True, default=datetime.now())
+    id = Column(Integer, primary_key=True)
+    left_word = Column(String)
+    right_word = Column(String)
+    added_date = Column(DateTime, default=datetime.now())
     user_id = Column(Integer, ForeignKey("users.id"))
 
+    __table_args__ = (
+        # Также покрывает поиск переводов по (user_id, left_word)
+        Index(
+            'ix_words_user_id_left_word_right_word',
+            'user_id', 'left_word', 'right_word',
+            unique=True
+        ),
+    )
+
     @classmethod
     def get_word(cls, session: Session, word: str):
         return session.query(cls).filter(
@@ -67,31 +142,110 @@ class Words(Base):
         ).first()
 
     @classmethod
-    def get_or_create_word(
+    def _upsert_word_query(
         cls, left_word: str, right_word: str, user_id: int
     ):
-        instance = db_session.query(cls).filter_by(
-            left_word=left_word, right_word=right_word
-        ).first()
-
-        if instance:
-            return instance, False
+        """
+        Один запрос: INSERT ... ON CONFLICT DO NOTHING RETURNING, а если
+        пара уже есть у пользователя - существующая строка.
 
-        new_word_couple = cls(
+        Изменения CTE не видны остальной части запроса, поэтому
+        возвращается ровно одна строка с признаком created. Заодно
+        слово ставится в расписание повторений, если его там нет.
+        """
+        now = datetime.now()
+        review = insert(Reviews).values(
+            user_id=user_id, left_word=left_word, due=now
+        ).on_conflict_do_nothing().cte('review')
+        inserted = insert(cls).values(
             left_word=left_word,
             right_word=right_word,
-            added_date=datetime.now(),
+            added_date=now,
             user_id=user_id
+        ).on_conflict_do_nothing(
+            index_elements=[cls.user_id, cls.left_word, cls.right_word]
+        ).returning(*cls.__table__.c).cte('inserted')
+
+        rows = union_all(
+            select(inserted, true().label('created')),
+            select(cls.__table__, false().label('created')).where(
+                cls.user_id == user_id,
+                cls.left_word == left_word,
+                cls.right_word == right_word
+            )
+        ).subquery()
+        word = aliased(cls, rows)
+        return select(word, rows.c.created).add_cte(review).limit(1)
+
+    @classmethod
+    def _existing_word_query(
+        cls, left_word: str, right_word: str, user_id: int
+    ):
+        return select(cls).filter_by(
+            user_id=user_id, left_word=left_word, right_word=right_word
         )
+
+    @classmethod
+    async def get_or_create_word_async(
+        cls, session: AsyncSession, left_word: str, right_word: str,
+        user_id: int
+    ):
+        """Добавить пару слов пользователю, если ее еще нет (один запрос)."""
+        row = (await session.execute(
+            cls._upsert_word_query(left_word, right_word, user_id)
+        )).first()
+        await session.commit()
+
+        if row is not None:
+            return row[0], row[1]
+        instance = (await session.execute(
+            cls._existing_word_query(left_word, right_word, user_id)
+        )).scalar_one()
+        return instance, False
+
+    @classmethod
+    def _bulk_insert_query(cls, user_id: int, batch: list[tuple[str, str]]):
+        """INSERT ... ON CONFLICT DO NOTHING для всех пар из batch"""
+        now = datetime.now()
+        rows = [
+            {
+                'left_word': left_word,
+                'right_word': right_word,
+                'added_date': now,
+                'user_id': user_id
+            }
+            for left_word, right_word in batch
+        ]
+        return insert(cls).values(rows).on_conflict_do_nothing(
+            index_elements=[cls.user_id, cls.left_word, cls.right_word]
+        ).returning(cls.id)
+
+    @classmethod
+    async def bulk_insert_async(
+        cls, session: AsyncSession, user_id: int,
+        batches: Iterable[list[tuple[str, str]]]
+    ) -> tuple[int, int]:
+        """
+        Добавить пары слов пачками в одной транзакции
+
+        Returns:
+            tuple[int, int]: сколько пар добавлено и сколько уже было
+        """
+        inserted = existing = 0
         try:
-            db_session.add(new_word_couple)
-            db_session.commit()
-            return new_word_couple, True
-        except IntegrityError:
-            db_session.rollback()
-            return db_session.query(cls).filter_by(
-                left_word=left_word, right_word=right_word
-            ).first(), False
+            for batch in batches:
+                query = cls._bulk_insert_query(user_id, batch)
+                added = len((await session.execute(query)).all())
+                await session.execute(
+                    Reviews._bulk_insert_query(user_id, batch)
+                )
+                inserted += added
+                existing += len(batch) - added
+            await session.commit()
+        except Exception:
+            await session.rollback()
+            raise
+        return inserted, existing
 
     @property
     def first_part(self) -> str:
@@ -103,31 +257,230 @@ class Words(Base):
         """Получить правое слово для тренировки"""
         return self.right_word
 
+
+class Reviews(Base):
+    """Расписание повторений слова (left_word) пользователя по SM-2"""
+    __tablename__ = "reviews"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    left_word = Column(String, primary_key=True)
+    ease = Column(Float, nullable=False, default=DEFAULT_EASE)
+    interval_days = Column(Float, nullable=False, default=0.0)
+    repetitions = Column(Integer, nullable=False, default=0)
+    lapses = Column(Integer, nullable=False, default=0)
+    due = Column(DateTime, nullable=False)
+    last_review = Column(DateTime)
+
+    __table_args__ = (
+        # Следующее слово - ближайшее по due, index-only scan
+        Index(
+            'ix_reviews_user_id_due', 'user_id', 'due',
+            postgresql_include=['left_word']
+        ),
+    )
+
+    def get_review_state(self) -> ReviewState:
+        return ReviewState(
+            ease=self.ease,
+            interval=self.interval_days,
+            repetitions=self.repetitions,
+            lapses=self.lapses,
+            due=self.due,
+            last_review=self.last_review
+        )
+
+    def set_review_state(self, state: ReviewState) -> None:
+        self.ease = state.ease
+        self.interval_days = state.interval
+        self.repetitions = state.repetitions
+        self.lapses = state.lapses
+        self.due = state.due
+        self.last_review = state.last_review
+
+    @classmethod
+    def _bulk_insert_query(cls, user_id: int, batch: list[tuple[str, str]]):
+        """Поставить в расписание новые слова из batch"""
+        now = datetime.now()
+        rows = [
+            {'user_id': user_id, 'left_word': left_word, 'due': now}
+            for left_word in dict.fromkeys(left for left, _ in batch)
+        ]
+        return insert(cls).values(rows).on_conflict_do_nothing()
+
     @classmethod
-    def get_all_translations(cls, left_word: str, user_id: int) -> list[str]:
+    def _training_deck_query(cls, user_id: int, size: int):
         """
-        Получить все возможные переводы для слова
+        size ближайших по due слов пользователя со всеми переводами.
+
+        Слова выбираются по индексу (user_id, due), переводы - по
+        уникальному индексу words, все в одном запросе.
         """
-        words = db_session.query(cls.right_word).filter_by(
-            left_word=left_word, user_id=user_id
-        ).all()
-        return [word[0] for word in words]
+        due = select(cls.left_word, cls.due).where(
+            cls.user_id == user_id
+        ).order_by(cls.due).limit(size).subquery()
+
+        return select(due.c.left_word, Words.right_word).join(
+            Words,
+            (Words.user_id == user_id) & (Words.left_word == due.c.left_word)
+        ).order_by(due.c.due, Words.id)
+
+    @staticmethod
+    def _deck(rows) -> list[tuple[str, list[str]]]:
+        translations = {}
+        for left_word, right_word in rows:
+            translations.setdefault(left_word, []).append(right_word)
+        return list(translations.items())
 
     @classmethod
-    def get_random_word(cls, user_id: int):
+    async def get_training_deck_async(
+        cls, session: AsyncSession, user_id: int, size: int
+    ) -> list[tuple[str, list[str]]]:
         """
-        Получить случайную пару слов для конкретного пользователя
+        Получить колоду из size слов пользователя, которые пора повторить
+        раньше всех, вместе со всеми переводами (один запрос к базе)
         """
-        from sqlalchemy.sql.expression import func
+        rows = await session.execute(cls._training_deck_query(user_id, size))
+        return cls._deck(rows.all())
+
+    @classmethod
+    def schedule_answers(cls, events: list[AnswerEvent]) -> None:
+        """
+        Пересчитать расписание слов по ответам пачки, без commit
+
+        Повторения всех слов пачки читаются одним SELECT, ответы на одно
+        слово применяются по порядку, изменения уходят при flush
+        executemany по первичному ключу.
+        """
+        if not events:
+            return
+        keys = list(dict.fromkeys(
+            (event.user_id, event.word) for event in events
+        ))
+        reviews = {
+            (review.user_id, review.left_word): review
+            for review in db_session.execute(
+                select(cls).where(tuple_(cls.user_id, cls.left_word).in_(keys))
+            ).scalars()
+        }
+        for event in sorted(events, key=lambda event: event.answered_at):
+            review = reviews.get((event.user_id, event.word))
+            if review is None:
+                review = cls(user_id=event.user_id, left_word=event.word)
+                reviews[event.user_id, event.word] = review
+                db_session.add(review)
+                state = ReviewState()
+            else:
+                state = review.get_review_state()
+            review.set_review_state(
+                schedule(state, event.quality, event.answered_at)
+            )
+
+    @classmethod
+    def recompute_all(cls, batch_size: int = 10000) -> int:
+        """
+        Пересчитать due всех повторений под текущие параметры scheduler.
+
+        Строки читаются по первичному ключу пачками (keyset pagination),
+        каждая пачка обновляется одним executemany и коммитится отдельно,
+        чтобы не держать долгую транзакцию.
+
+        Returns:
+            int: сколько строк изменилось
+        """
+        updated = 0
+        last_key = None
+        while True:
+            query = select(cls).order_by(cls.user_id, cls.left_word) \
+                .limit(batch_size)
+            if last_key is not None:
+                query = query.where(
+                    tuple_(cls.user_id, cls.left_word) > tuple_(*last_key)
+                )
+            reviews = db_session.execute(query).scalars().all()
+            if not reviews:
+                return updated
+
+            changes = []
+            for review in reviews:
+                state = recompute(review.get_review_state())
+                if (state.ease, state.due) != (review.ease, review.due):
+                    changes.append({
+                        'user_id': review.user_id,
+                        'left_word': review.left_word,
+                        'ease': state.ease,
+                        'due': state.due
+                    })
+            last_key = (reviews[-1].user_id, reviews[-1].left_word)
+            # Объекты пачки больше не нужны, executemany по первичному ключу
+            db_session.expunge_all()
+            if changes:
+                db_session.execute(update(cls), changes)
+            db_session.commit()
+            updated += len(changes)
 
-        word = db_session.query(cls).filter_by(
-            user_id=user_id
-        ).order_by(func.random()).first()
 
-        if word:
-            # Получаем все возможные переводы для этого слова
-            word.all_translations = cls.get_all_translations(
-                word.left_word, user_id
+class Answers(Base):
+    """Ответы на тренировке, пишутся пачками из AnswerFlusher"""
+    __tablename__ = "answers"
+
+    # ID записи в Redis stream: повторная доставка не создает дублей
+    event_id = Column(String, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    left_word = Column(String, nullable=False)
+    correct = Column(Boolean, nullable=False)
+    clues = Column(Integer, nullable=False)
+    latency_ms = Column(Integer)
+    answered_at = Column(DateTime, nullable=False)
+
+    __table_args__ = (
+        Index('ix_answers_user_id_answered_at', 'user_id', 'answered_at'),
+    )
+
+    @classmethod
+    def save_batch(cls, events: list[AnswerEvent]) -> None:
+        """
+        Записать пачку ответов, пересчитать расписание слов и обновить
+        Users.best_score
+
+        Одна транзакция: многострочный INSERT ... ON CONFLICT DO NOTHING
+        RETURNING, Reviews.schedule_answers для вставленных ответов и
+        UPDATE users ... FROM (VALUES ...) с лучшей серией каждого
+        пользователя из пачки. Повторная доставка уже записанного ответа
+        ничего не вставляет и расписание второй раз не сдвигает.
+        """
+        best_streaks = {}
+        for event in events:
+            best_streaks[event.user_id] = max(
+                event.streak, best_streaks.get(event.user_id, 0)
             )
+        streaks = values(
+            column('user_id', Integer), column('streak', Integer),
+            name='streaks'
+        ).data(list(best_streaks.items()))
 
-        return word
+        try:
+            inserted = set(db_session.execute(insert(cls).values([
+                {
+                    'event_id': event.event_id,
+                    'user_id': event.user_id,
+                    'left_word': event.word,
+                    'correct': event.correct,
+                    'clues': event.clues,
+                    'latency_ms': event.latency_ms,
+                    'answered_at': event.answered_at
+                }
+                for event in events
+            ]).on_conflict_do_nothing().returning(cls.event_id)).scalars())
+            Reviews.schedule_answers([
+                event for event in events if event.event_id in inserted
+            ])
+            db_session.execute(
+                update(Users)
+                .where(Users.id == streaks.c.user_id)
+                .where(func.coalesce(Users.best_score, 0) < streaks.c.streak)
+                .values(best_score=streaks.c.streak)
+            )
+            db_session.commit()
+        except Exception:
+            db_session.rollback()
+            raise
@@ -0,0 +1,144 @@
+import csv
+import sqlite3
+import sys
+import threading
+
+from pathlib import Path
+from typing import Iterator, Optional
+from providers import TranslationProvider
+
+
+def lemma_candidates(word: str) -> Iterator[str]:
+    """
+    Possible dictionary forms of an English word form.
+
+    A small rule-based lemmatizer: plural, past tense, -ing and
+    comparative endings. The word itself comes first.
+    """
+    yield word
+    rules = (
+        ('ies', 'y'), ('ves', 'f'), ('es', ''), ('s', ''),
+        ('ied', 'y'), ('ed', 'e'), ('ed', ''),
+        ('ing', 'e'), ('ing', ''),
+        ('ier', 'y'), ('iest', 'y'), ('er', ''), ('est', ''),
+    )
+    for suffix, replacement in rules:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 2:
+            stem = word[:-len(suffix)]
+            yield stem + replacement
+            # stopped -> stop, bigger -> big
+            if not replacement and len(stem) >= 3 and stem[-1] == stem[-2]:
+                yield stem[:-1]
+
+
+def load_tsv(
+    tsv_path: Path, db_path: Path, batch_size: int = 50000
+) -> int:
+    """
+    Build the on-disk dictionary index from a `word<TAB>translation` file.
+
+    The file is streamed in batches into a staging table, then copied in
+    word order into a clustered WITHOUT ROWID table. Repeated translations
+    of a word are dropped, the rest become numbered senses in file order.
+
+    Returns:
+        int: number of stored (word, sense) entries
+    """
+    db_path = Path(db_path)
+    if db_path.exists():
+        db_path.unlink()
+
+    connection = sqlite3.connect(db_path)
+    try:
+        connection.executescript("""
+            PRAGMA journal_mode = OFF;
+            PRAGMA synchronous = OFF;
+            CREATE TEMP TABLE staging (word TEXT, translation TEXT);
+            CREATE TABLE entries (
+                word TEXT NOT NULL,
+                sense INTEGER NOT NULL,
+                translation TEXT NOT NULL,
+                PRIMARY KEY (word, sense)
+            ) WITHOUT ROWID;
+        """)
+
+        with open(tsv_path, 'r', encoding='utf-8', newline='') as f:
+            rows = csv.reader(f, delimiter='\t', quoting=csv.QUOTE_NONE)
+            batch = []
+            for row in rows:
+                if len(row) < 2 or not row[0].strip() or not row[1].strip():
+                    continue
+                batch.append((row[0].strip().lower(), row[1].strip()))
+                if len(batch) >= batch_size:
+                    connection.executemany(
+                        "INSERT INTO staging VALUES (?, ?)", batch
+                    )
+                    batch = []
+            connection.executemany("INSERT INTO staging VALUES (?, ?)", batch)
+
+        connection.execute("""
+            INSERT INTO entries (word, sense, translation)
+            SELECT word,
+                   ROW_NUMBER() OVER (PARTITION BY word ORDER BY first_seen),
+                   translation
+            FROM (
+                SELECT word, translation, MIN(rowid) AS first_seen
+                FROM staging GROUP BY word, translation
+            )
+            ORDER BY word
+        """)
+        count = connection.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        connection.commit()
+        connection.execute("VACUUM")
+        return count
+    finally:
+        connection.close()
+
+
+class OfflineDictionary(TranslationProvider):
+    """
+    Read-only lookups in a dictionary built by load_tsv.
+
+    Every thread gets its own read-only SQLite connection; lookups are
+    primary key searches in the clustered index.
+    """
+
+    LOOKUP = "SELECT translation FROM entries WHERE word = ? ORDER BY sense"
+
+    def __init__(self, db_path: Path, max_senses: int = 3) -> None:
+        self.db_path = Path(db_path)
+        if not self.db_path.exists():
+            raise FileNotFoundError(f"Dictionary {self.db_path} not found")
+        self.max_senses = max_senses
+        self._local = threading.local()
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(
+                f"file:{self.db_path}?mode=ro", uri=True
+            )
+            self._local.connection = connection
+        return connection
+
+    def senses(self, word: str) -> list[str]:
+        """All translations of the word or of its dictionary form."""
+        connection = self._connection()
+        for candidate in lemma_candidates(word.strip().lower()):
+            rows = connection.execute(self.LOOKUP, (candidate,)).fetchall()
+            if rows:
+                return [row[0] for row in rows]
+        return []
+
+    def translate(self, word: str) -> Optional[str]:
+        senses = self.senses(word)
+        return ', '.join(senses[:self.max_senses]) if senses else None
+
+
+if __name__ == '__main__':
+    # Build index: python dictionary.py load words.tsv dictionary.sqlite3
+    if len(sys.argv) != 4 or sys.argv[1] != 'load':
+        print("Usage: python dictionary.py load <words.tsv> <dictionary.sqlite3>")
+        sys.exit(1)
+
+    print(f"Stored entries: {load_tsv(Path(sys.argv[2]), Path(sys.argv[3]))}")
@@ -0,0 +1,115 @@
+import time
+
+from typing import Any, Awaitable, Callable, Optional
+
+from commands import BotCommands, UserState
+
+
+Handler = Callable[[Any], Any]
+# (handler name, seconds spent in the handler, whether it raised)
+TimingHook = Callable[[str, float, bool], None]
+
+
+def command_key(text: str) -> str:
+    """'/train@word_bot now' -> '/train', button texts are kept as is"""
+    if text.startswith('/'):
+        return text.split(maxsplit=1)[0].partition('@')[0]
+    return text
+
+
+class CommandDispatcher:
+    """
+    Routes a message to its handler with two dict lookups.
+
+    Commands and button texts are looked up first; any other message goes
+    to the handler of the chat state returned by `get_state`. States
+    without a handler go to the `unknown_state` handler.
+    """
+
+    def __init__(self, get_state: Callable[[int], Optional[str]]) -> None:
+        self.get_state = get_state
+        self._commands: dict[str, Handler] = {}
+        self._states: dict[Optional[str], Handler] = {}
+        self._unknown_state: Optional[Handler] = None
+        self._timing_hooks: list[TimingHook] = []
+
+    def command(self, command: BotCommands, *texts: str) -> Callable[[Handler], Handler]:
+        """
+        Register a handler of the command, its button and extra `texts`
+        (e.g. translated button labels).
+        """
+        keys = [f"/{command.command}", *texts]
+        if command.button_text:
+            keys.append(command.button_text)
+
+        def decorator(handler: Handler) -> Handler:
+            for key in keys:
+                if key in self._commands:
+                    raise ValueError(f"{key!r} already has a handler")
+            self._commands.update(dict.fromkeys(keys, handler))
+            return handler
+        return decorator
+
+    def state(self, *states: Optional[UserState]) -> Callable[[Handler], Handler]:
+        """Register a handler of plain messages in the states (None - no state)."""
+        def decorator(handler: Handler) -> Handler:
+            for state in states:
+                self._states[state.value if state is not None else None] = handler
+            return handler
+        return decorator
+
+    def unknown_state(self, handler: Handler) -> Handler:
+        self._unknown_state = handler
+        return handler
+
+    def add_timing_hook(self, hook: TimingHook) -> None:
+        """Call hook(handler name, seconds, failed) after every handled message."""
+        self._timing_hooks.append(hook)
+
+    def find_command(self, message) -> Optional[Handler]:
+        if message.content_type != 'text':
+            return None
+        return self._commands.get(command_key(message.text))
+
+    def find_state_handler(self, state: Optional[str]) -> Handler:
+        return self._states.get(state, self._unknown_state)
+
+    def _report(self, handler: Handler, started: float, failed: bool) -> None:
+        elapsed = time.perf_counter() - started
+        for hook in self._timing_hooks:
+            hook(handler.__name__, elapsed, failed)
+
+    def dispatch(self, message) -> Any:
+        handler = self.find_command(message) \
+            or self.find_state_handler(self.get_state(message.chat.id))
+        started = time.perf_counter()
+        failed = True
+        try:
+            result = handler(message)
+            failed = False
+            return result
+        finally:
+            if self._timing_hooks:
+                self._report(handler, started, failed)
+
+
+class AsyncCommandDispatcher(CommandDispatcher):
+    """CommandDispatcher for coroutine handlers and an async `get_state`."""
+
+    def __init__(
+        self, get_state: Callable[[int], Awaitable[Optional[str]]]
+    ) -> None:
+        super().__init__(get_state)
+
+    async def dispatch(self, message) -> Any:
+        handler = self.find_command(message) \
+            or self.find_state_handler(await self.get_state(message.chat.id))
+        started = time.perf_counter()
+        failed = True
+        try:
+            result = await handler(message)
+            failed = False
+            return result
+        finally:
+            if self._timing_hooks:
+                self._report(handler, started, failed)
@@ -1,2 +1,7 @@
 class MessageValidationError(Exception):
     pass
+
+
+class TranslationError(Exception):
+    """Translation provider failed, the result must not be cached."""
+    pass
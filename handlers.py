@@ -0,0 +1,588 @@
+"""
+Handlers of the bot, shared by the polling and the asyncio entry points.
+
+Every handler is a coroutine of the message and a Context: the state
+manager, the database session and the bot it talks to. async_main.py
+passes the asyncio clients and a session per message; main.py passes the
+blocking clients behind awaitable methods that never suspend and runs the
+handlers to completion on the worker thread (see main.run_sync).
+"""
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Optional
+from telebot.types import Message
+from sqlalchemy.ext.asyncio import AsyncSession
+from database.models import Words, Users, Reviews
+from config import config
+from messages import Messages, get_messages
+from commands import BotCommands, UserState
+from state import AsyncRedisStateManager, Card, FinishedWord
+from keyboards import get_main_keyboard, get_language_keyboard, \
+    get_cancel_keyboard, training_keyboard
+from utils import escape_markdown, validate_word_pair, \
+    mask_word
+from answer_stats import AsyncAnswerBuffer
+from importer import import_word_pairs_async, document_delimiter
+from dispatcher import CommandDispatcher, Handler
+
+
+@dataclass(frozen=True)
+class Context:
+    """Clients a handler works with."""
+    state_manager: AsyncRedisStateManager
+    session: AsyncSession
+    # AsyncTeleBot; importing it here would slow down the polling bot
+    bot: Any
+    answer_buffer: AsyncAnswerBuffer
+    # translation() is blocking: the asyncio bot runs it in a thread
+    translate: Callable[[str], Awaitable[str]]
+
+
+async def get_user_messages(message, session: AsyncSession) -> Messages:
+    """Messages in the language of the user who sent the message."""
+    user = await Users.get_user_ref_async(session, message.from_user.id)
+    return get_messages(user.language)
+
+
+async def process_new_word_pair(
+    message,
+    state_manager: AsyncRedisStateManager,
+    session: AsyncSession
+) -> tuple[bool, str]:
+    """
+    Processing a new pair of words from user.
+
+    Args:
+        message: Users message
+        state_manager: State manager
+        session: Database session
+
+    Returns:
+        tuple[bool, str]: (success og the operation, user message)
+    """
+    messages = await get_user_messages(message, session)
+    lines = message.text.strip().splitlines()
+    if len(lines) > 1:
+        return await process_word_pairs_import(
+            message, lines, None, state_manager, session
+        )
+
+    try:
+        word1, word2 = validate_word_pair(message.text)
+    except ValueError as e:
+        return False, messages.get('add_word.invalid_format', error=str(e))
+
+    user = await Users.get_user_ref_async(session, message.from_user.id)
+    word_pair, created = await Words.get_or_create_word_async(
+        session, word1, word2, user.id
+    )
+
+    if created:
+        await state_manager.clear_training_deck(user.id)
+        await state_manager.set_state(message.chat.id, UserState.IDLE)
+        return True, messages.get('add_word.saved')
+
+    return False, messages.get('add_word.exists')
+
+
+async def process_word_pairs_import(
+    message,
+    lines,
+    delimiter: Optional[str],
+    state_manager: AsyncRedisStateManager,
+    session: AsyncSession
+) -> tuple[bool, str]:
+    """
+    Import many word pairs at once: pasted lines or an uploaded document.
+
+    Returns:
+        tuple[bool, str]: (success of the operation, user message)
+    """
+    user = await Users.get_user_ref_async(session, message.from_user.id)
+    result = await import_word_pairs_async(
+        session, user.id, lines, delimiter,
+        batch_size=config.word_import.batch_size
+    )
+
+    messages = get_messages(user.language)
+    if result.inserted:
+        await state_manager.clear_training_deck(user.id)
+        await state_manager.set_state(message.chat.id, UserState.IDLE)
+    return bool(result.inserted), messages.get(
+        'add_word.imported',
+        inserted=result.inserted,
+        duplicates=result.duplicates,
+        invalid=result.invalid
+    )
+
+
+async def draw_training_card(
+    user_id: int,
+    state_manager: AsyncRedisStateManager,
+    session: AsyncSession
+) -> Optional[Card]:
+    """
+    Take the next word from the users deck in Redis.
+
+    The deck holds the words due for review soonest. It is rebuilt with
+    one query when it runs low, so most training turns don't touch the
+    database.
+
+    Args:
+        user_id: Users ID
+        state_manager: State manager
+        session: Database session
+
+    Returns:
+        Optional[Card]: (word, translations) or None if the user has no words
+    """
+    card, left = await state_manager.pop_training_card(user_id)
+    if card and left > config.training.deck_refill_threshold:
+        return card
+
+    deck = await Reviews.get_training_deck_async(
+        session, user_id, config.training.deck_size
+    )
+    if card:
+        # The drawn word is not answered yet, keep it out of the new deck
+        deck = [next_card for next_card in deck if next_card[0] != card[0]]
+    elif not deck:
+        return None
+    else:
+        card, deck = deck[0], deck[1:]
+
+    if deck:
+        await state_manager.push_training_cards(user_id, deck, replace=True)
+    else:
+        await state_manager.clear_training_deck(user_id)
+    return card
+
+
+async def start_training_session(
+    chat_id: int,
+    user_id: int,
+    state_manager: AsyncRedisStateManager,
+    session: AsyncSession,
+    messages: Messages
+) -> tuple[bool, str]:
+    """
+    Start a new training session.
+
+    Args:
+        chat_id: Chats ID
+        user_id: Users ID
+        state_manager: State manager
+        session: Database session
+        messages: Messages in the user's language
+
+    Returns:
+        tuple[bool, str]: (success, message/training status)
+    """
+    card = await draw_training_card(user_id, state_manager, session)
+
+    if not card:
+        await state_manager.set_state(chat_id, UserState.IDLE)
+        return False, messages.get('training.no_words')
+
+    word, translations = card
+    # Switch to training and save all possible translations
+    await state_manager.begin_training(
+        chat_id,
+        word,
+        [translation.lower() for translation in translations]
+    )
+
+    return True, word
+
+
+async def record_answer(
+    message,
+    finished: FinishedWord,
+    correct: bool,
+    session: AsyncSession,
+    answer_buffer: AsyncAnswerBuffer,
+    gave_up: bool = False
+) -> None:
+    """
+    Buffer the answer: AnswerFlusher writes it and reschedules the word.
+    """
+    if not finished.word:
+        return
+    user = await Users.get_user_ref_async(session, message.from_user.id)
+    await answer_buffer.record(
+        user.id, finished.word, correct, finished.clues, finished.shown_at,
+        gave_up=gave_up
+    )
+
+
+async def check_training_answer(
+    message,
+    state_manager: AsyncRedisStateManager,
+    session: AsyncSession,
+    answer_buffer: AsyncAnswerBuffer
+) -> tuple[bool, str]:
+    """
+    Test the users response in training mode.
+
+    Args:
+        message: Users message
+        state_manager: State manager
+        session: Database session
+        answer_buffer: Buffer of answers for statistics
+
+    Returns:
+        tuple[bool, str]: (success of the reply, message to the user)
+    """
+    messages = await get_user_messages(message, session)
+    # Read translations and reset the clue counter of the answered word
+    finished = await state_manager.finish_word(message.chat.id)
+    translations = finished.translations
+    if not translations:
+        await state_manager.set_state(message.chat.id, UserState.IDLE)
+        return False, messages.get('training.session_expired')
+
+    user_answer = message.text.strip().lower()
+    correct = user_answer in translations
+    await record_answer(message, finished, correct, session, answer_buffer)
+
+    if correct:
+        if len(translations) > 1:
+            other_translations = [t for t in translations if t != user_answer]
+            reply = messages.get(
+                'training.other_translations',
+                translations=escape_markdown(', '.join(other_translations))
+            )
+        else:
+            reply = messages.get('training.correct')
+        return True, reply
+    else:
+        reply = messages.get(
+            'training.wrong',
+            translations=escape_markdown(', '.join(translations))
+        )
+        return False, reply
+
+
+async def handle_switch_language(message, context: Context) -> None:
+    messages = await get_user_messages(message, context.session)
+    await context.state_manager.set_state(
+        message.chat.id, UserState.SWITCH_LANGUAGE
+    )
+    await context.bot.reply_to(
+        message,
+        messages.get('wait_language'),
+        parse_mode='MarkdownV2',
+        reply_markup=get_language_keyboard()
+    )
+
+
+async def handle_start(message, context: Context) -> None:
+    """Handle /start command."""
+    messages = await get_user_messages(message, context.session)
+    await context.state_manager.set_state(message.chat.id, UserState.IDLE)
+    await context.bot.reply_to(
+        message,
+        messages.get(
+            'welcome',
+            name=escape_markdown(message.from_user.first_name)
+        ),
+        parse_mode='MarkdownV2',
+        reply_markup=get_main_keyboard()
+    )
+
+
+async def handle_back_to_menu(message, context: Context) -> None:
+    """Handle back to menu button/command."""
+    messages = await get_user_messages(message, context.session)
+    await context.state_manager.clear_state(message.chat.id)
+    await context.bot.reply_to(
+        message,
+        messages.get('main_menu'),
+        reply_markup=get_main_keyboard()
+    )
+
+
+async def handle_add(message, context: Context) -> None:
+    """Handle add word command/button."""
+    messages = await get_user_messages(message, context.session)
+    await context.state_manager.set_state(
+        message.chat.id, UserState.AWAITING_WORD_PAIR
+    )
+    await context.bot.reply_to(
+        message,
+        messages.get('add_word.prompt'),
+        parse_mode='MarkdownV2',
+        reply_markup=get_cancel_keyboard()
+    )
+
+
+async def handle_train(message, context: Context) -> None:
+    """Handle train command/button"""
+    user = await Users.get_user_ref_async(
+        context.session, message.from_user.id
+    )
+    messages = get_messages(user.language)
+    success, new_word = await start_training_session(
+        message.chat.id,
+        user.id,
+        context.state_manager,
+        context.session,
+        messages
+    )
+
+    if success:
+        # Preparing a message with a random word and giving it to the user
+        await context.bot.send_message(
+            message.chat.id,
+            messages.get('training.word_prompt', word=escape_markdown(new_word)),
+            parse_mode='MarkdownV2',
+            reply_markup=training_keyboard()
+        )
+    else:
+        # The errors is that the user has no words.
+        await context.bot.send_message(
+            message.chat.id,
+            new_word,  # here new_word contains error message
+            parse_mode='MarkdownV2',
+            reply_markup=get_main_keyboard()
+        )
+
+
+async def handle_clue(message, context: Context) -> None:
+    messages = await get_user_messages(message, context.session)
+    # Check users status and open one more letter in one round trip
+    status, clue_counter, translations = \
+        await context.state_manager.take_clue(message.chat.id)
+
+    if status != UserState.TRAINING.value:
+        await context.bot.reply_to(
+            message,
+            messages.get('errors.clue_error'),
+            reply_markup=get_main_keyboard()
+        )
+        return
+
+    if not translations:
+        # If no translations, start a new training.
+        await handle_train(message, context)
+        return
+
+    word = translations[0]
+
+    if len(word) <= clue_counter:
+        # If all the letters are open, we show the correct answer and go to the next word
+        await context.bot.reply_to(
+            message,
+            messages.get(
+                'training.wrong',
+                translations=escape_markdown(', '.join(translations))
+            ),
+            parse_mode='MarkdownV2'
+        )
+        finished = await context.state_manager.finish_word(message.chat.id)
+        await record_answer(
+            message, finished, False, context.session, context.answer_buffer,
+            gave_up=True
+        )
+        await handle_train(message, context)
+        return
+
+    await context.bot.reply_to(
+        message,
+        messages.get(
+            'training.clue',
+            word=escape_markdown(mask_word(word, clue_counter))
+        ),
+        parse_mode='MarkdownV2',
+        reply_markup=training_keyboard()
+    )
+
+
+async def handle_translate(message, context: Context) -> None:
+    """Handle translate button click."""
+    messages = await get_user_messages(message, context.session)
+    await context.state_manager.set_state(
+        message.chat.id, UserState.TRANSLATE
+    )
+    await context.bot.reply_to(
+        message,
+        messages.get('translate.waiting_for_translate'),
+        parse_mode='MarkdownV2',
+        reply_markup=get_cancel_keyboard()
+    )
+
+
+async def handle_document(message: Message, context: Context) -> None:
+    """
+    Handle CSV/TSV/text document with word pairs
+    """
+    messages = await get_user_messages(message, context.session)
+    current_state = await context.state_manager.get_state(message.chat.id)
+    if current_state != UserState.AWAITING_WORD_PAIR.value:
+        await context.bot.reply_to(
+            message,
+            messages.get('errors.use_menu'),
+            reply_markup=get_main_keyboard()
+        )
+        return
+
+    content = None
+    # Telegram may omit file_size, then the limit is checked after download
+    if (message.document.file_size or 0) <= config.word_import.max_file_size:
+        file_info = await context.bot.get_file(message.document.file_id)
+        content = await context.bot.download_file(file_info.file_path)
+    if content is None or len(content) > config.word_import.max_file_size:
+        await context.bot.reply_to(
+            message,
+            messages.get('add_word.file_too_large'),
+            parse_mode='MarkdownV2',
+            reply_markup=get_cancel_keyboard()
+        )
+        return
+
+    try:
+        lines = content.decode('utf-8-sig').splitlines()
+    except UnicodeDecodeError:
+        await context.bot.reply_to(
+            message,
+            messages.get('add_word.invalid_file'),
+            parse_mode='MarkdownV2',
+            reply_markup=get_cancel_keyboard()
+        )
+        return
+    success, answer = await process_word_pairs_import(
+        message,
+        lines,
+        document_delimiter(message.document.file_name),
+        context.state_manager,
+        context.session
+    )
+    await context.bot.reply_to(
+        message,
+        answer,
+        parse_mode='MarkdownV2',
+        reply_markup=get_main_keyboard() if success else get_cancel_keyboard()
+    )
+
+
+async def handle_idle(message: Message, context: Context) -> None:
+    """Handle text outside of any dialog"""
+    messages = await get_user_messages(message, context.session)
+    await context.bot.reply_to(
+        message,
+        messages.get('errors.use_menu'),
+        reply_markup=get_main_keyboard()
+    )
+
+
+async def handle_unknown_state(message: Message, context: Context) -> None:
+    """Reset a state left by an older version of the bot"""
+    messages = await get_user_messages(message, context.session)
+    await context.state_manager.clear_state(message.chat.id)
+    await context.bot.reply_to(
+        message,
+        messages.get('errors.restart'),
+        parse_mode='MarkdownV2',
+        reply_markup=get_main_keyboard()
+    )
+
+
+async def handle_word_pair(message: Message, context: Context) -> None:
+    """Handle a new word pair"""
+    success, answer = await process_new_word_pair(
+        message, context.state_manager, context.session
+    )
+    await context.bot.reply_to(
+        message,
+        answer,
+        parse_mode='MarkdownV2',
+        reply_markup=get_main_keyboard() if success else get_cancel_keyboard()
+    )
+
+
+async def handle_training_answer(message: Message, context: Context) -> None:
+    """Check the answer and show the next word"""
+    success, reply = await check_training_answer(
+        message, context.state_manager, context.session, context.answer_buffer
+    )
+    await context.bot.reply_to(message, reply, parse_mode='MarkdownV2')
+
+    await handle_train(message, context)
+
+
+async def handle_language_choice(message: Message, context: Context) -> None:
+    """Switch to the chosen language"""
+    messages = await get_user_messages(message, context.session)
+    language_to_set = message.text
+    if language_to_set not in Messages.SUPPORTED_LANGUAGES:
+        await context.bot.reply_to(
+            message,
+            messages.get('errors.language_doesnt_exist'),
+            parse_mode='MarkdownV2',
+            reply_markup=get_main_keyboard()
+        )
+        return
+    await Users.change_language_async(
+        context.session, message.from_user.id, language_to_set
+    )
+    messages = get_messages(language_to_set)
+    await context.state_manager.set_state(message.chat.id, UserState.IDLE)
+    await context.bot.reply_to(
+        message,
+        messages.get("language_has_been_changed"),
+        parse_mode='MarkdownV2',
+        reply_markup=get_main_keyboard()
+    )
+
+
+async def handle_translation_request(message: Message, context: Context) -> None:
+    """Translate the word and save the pair for training"""
+    messages = await get_user_messages(message, context.session)
+    user_input = message.text.strip().lower()
+    translated_word = await context.translate(user_input)
+
+    await context.bot.reply_to(
+        message,
+        escape_markdown(translated_word),
+        parse_mode='MarkdownV2'
+    )
+
+    user = await Users.get_user_ref_async(context.session, message.chat.id)
+    word_pair, created = await Words.get_or_create_word_async(
+        context.session, user_input, translated_word, user.id
+    )
+    if created:
+        await context.state_manager.clear_training_deck(user.id)
+
+    await context.bot.send_message(
+        message.chat.id,
+        messages.get('add_word.saved') if created else messages.get('add_word.exists'),
+        parse_mode='MarkdownV2',
+        reply_markup=get_main_keyboard()
+    )
+
+    await context.state_manager.set_state(message.chat.id, UserState.IDLE)
+
+
+def register(
+    dispatcher: CommandDispatcher,
+    adapt: Callable[[Callable], Handler]
+) -> None:
+    """
+    Route commands and chat states of the dispatcher to the handlers.
+
+    `adapt` turns a handler of (message, context) into a handler of the
+    message alone, the way the entry point runs it.
+    """
+    dispatcher.command(BotCommands.SWITCH_LANGUAGE)(adapt(handle_switch_language))
+    dispatcher.command(BotCommands.START)(adapt(handle_start))
+    dispatcher.command(BotCommands.BACK_TO_MENU)(adapt(handle_back_to_menu))
+    dispatcher.command(BotCommands.ADD_WORD)(adapt(handle_add))
+    dispatcher.command(BotCommands.TRAIN)(adapt(handle_train))
+    dispatcher.command(BotCommands.CLUE)(adapt(handle_clue))
+    dispatcher.command(BotCommands.TRANSLATE)(adapt(handle_translate))
+    dispatcher.state(None, UserState.IDLE)(adapt(handle_idle))
+    dispatcher.unknown_state(adapt(handle_unknown_state))
+    dispatcher.state(UserState.AWAITING_WORD_PAIR)(adapt(handle_word_pair))
+    dispatcher.state(UserState.TRAINING)(adapt(handle_training_answer))
+    dispatcher.state(UserState.SWITCH_LANGUAGE)(adapt(handle_language_choice))
+    dispatcher.state(UserState.TRANSLATE)(adapt(handle_translation_request))
@@ -0,0 +1,132 @@
+import csv
+import sys
+
+from dataclasses import dataclass
+from itertools import islice
+from typing import Iterable, Iterator, Optional, Tuple
+from utils import validate_word_pair
+
+
+@dataclass
+class ImportResult:
+    inserted: int = 0
+    duplicates: int = 0
+    invalid: int = 0
+
+
+def parse_word_pairs(
+    lines: Iterable[str],
+    result: ImportResult,
+    delimiter: Optional[str] = None
+) -> Iterator[Tuple[str, str]]:
+    """
+    Parse word pairs from a stream of lines.
+
+    Without delimiter every line is `word1 - word2` or `word1<TAB>word2`.
+    With delimiter (',', ';' or '\\t') lines are read as CSV rows, the first
+    two columns being the pair. Empty lines are skipped, lines that can't
+    be parsed are counted in `result.invalid`.
+    """
+    if delimiter is not None:
+        for row in csv.reader(lines, delimiter=delimiter):
+            parts = [part.strip() for part in row[:2]]
+            if not any(row):
+                continue
+            if len(parts) == 2 and all(parts):
+                yield parts[0], parts[1]
+            else:
+                result.invalid += 1
+        return
+
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        if '\t' in line:
+            line = line.replace('\t', '-', 1)
+        try:
+            yield validate_word_pair(line)
+        except ValueError:
+            result.invalid += 1
+
+
+def unique_pairs(
+    pairs: Iterable[Tuple[str, str]], result: ImportResult
+) -> Iterator[Tuple[str, str]]:
+    """Drop pairs repeated inside the document."""
+    seen = set()
+    for pair in pairs:
+        if pair in seen:
+            result.duplicates += 1
+            continue
+        seen.add(pair)
+        yield pair
+
+
+def batched(items: Iterable, size: int) -> Iterator[list]:
+    iterator = iter(items)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+async def import_word_pairs_async(
+    session,
+    user_id: int,
+    lines: Iterable[str],
+    delimiter: Optional[str] = None,
+    batch_size: int = 1000
+) -> ImportResult:
+    """
+    Import a whole document of word pairs for the user.
+
+    Lines are parsed as a stream, deduplicated in memory and written in
+    batches inside one transaction.
+
+    Args:
+        session: AsyncSession, or ImmediateSession on a worker thread
+        user_id: Users ID
+        lines: document lines
+        delimiter: CSV delimiter, None for `word1 - word2` lines
+        batch_size: pairs per INSERT statement
+
+    Returns:
+        ImportResult: counts of inserted, duplicate and invalid pairs
+    """
+    from database.models import Words
+
+    result = ImportResult()
+    pairs = unique_pairs(parse_word_pairs(lines, result, delimiter), result)
+    inserted, existing = await Words.bulk_insert_async(
+        session, user_id, batched(pairs, batch_size)
+    )
+    result.inserted = inserted
+    result.duplicates += existing
+    return result
+
+
+def document_delimiter(file_name: str) -> Optional[str]:
+    """Guess CSV delimiter by document name."""
+    name = (file_name or '').lower()
+    if name.endswith('.tsv'):
+        return '\t'
+    if name.endswith('.csv'):
+        return ','
+    return None
+
+
+if __name__ == '__main__':
+    # Import a file for a user: python importer.py <telegram_id> <file>
+    if len(sys.argv) != 3:
+        print("Usage: python importer.py <telegram_id> <file>")
+        sys.exit(1)
+
+    from database.db import db_session
+    from database.models import Users
+    from utils import ImmediateSession, run_sync
+
+    session = ImmediateSession(db_session)
+    user = run_sync(Users.get_user_ref_async(session, int(sys.argv[1])))
+    with open(sys.argv[2], 'r', encoding='utf-8', newline='') as f:
+        print(run_sync(import_word_pairs_async(
+            session, user.id, f, document_delimiter(sys.argv[2])
+        )))
@@ -0,0 +1,110 @@
+from typing import Callable
+
+from telebot.types import ReplyKeyboardMarkup, KeyboardButton
+
+from commands import BotCommands
+from messages import Messages
+
+
+class PreparedKeyboard(ReplyKeyboardMarkup):
+    """
+    Reply keyboard serialized once and shared by all replies.
+
+    telebot calls to_json() on every send; after freeze() it returns the
+    cached JSON, so the keyboard can't be changed any more.
+    """
+
+    _json = None
+
+    def add(self, *args, **kwargs) -> 'PreparedKeyboard':
+        if self._json is not None:
+            raise TypeError("Prepared keyboard can't be changed")
+        return super().add(*args, **kwargs)
+
+    def freeze(self) -> 'PreparedKeyboard':
+        self._json = super().to_json()
+        return self
+
+    def to_json(self) -> str:
+        if self._json is None:
+            return super().to_json()
+        return self._json
+
+
+class KeyboardRegistry:
+    """Keyboards of the bot, each built once when registered."""
+
+    def __init__(self) -> None:
+        self._keyboards: dict[str, PreparedKeyboard] = {}
+
+    def register(
+        self, name: str
+    ) -> Callable[[Callable[[], PreparedKeyboard]], Callable[[], PreparedKeyboard]]:
+        def decorator(build: Callable[[], PreparedKeyboard]):
+            self._keyboards[name] = build().freeze()
+            return build
+        return decorator
+
+    def get(self, name: str) -> PreparedKeyboard:
+        return self._keyboards[name]
+
+
+keyboards = KeyboardRegistry()
+
+
+@keyboards.register('main')
+def build_main_keyboard() -> PreparedKeyboard:
+    """Создает основную клавиатуру с кнопками."""
+    keyboard = PreparedKeyboard(resize_keyboard=True)
+    add_button = KeyboardButton(BotCommands.ADD_WORD.button_text)
+    train_button = KeyboardButton(BotCommands.TRAIN.button_text)
+    switch_language_button = KeyboardButton(BotCommands.SWITCH_LANGUAGE.button_text)
+    translate_button = KeyboardButton(BotCommands.TRANSLATE.button_text)
+    keyboard.add(add_button, train_button, switch_language_button, translate_button)
+    return keyboard
+
+
+@keyboards.register('language')
+def build_language_keyboard() -> PreparedKeyboard:
+    """Creates a new keyboard with buttons."""
+    keyboard = PreparedKeyboard(resize_keyboard=True)
+    # Sorted: set order changes between processes
+    keyboard.add(
+        *[KeyboardButton(language) for language in sorted(Messages.SUPPORTED_LANGUAGES)]
+    )
+    return keyboard
+
+
+@keyboards.register('cancel')
+def build_cancel_keyboard() -> PreparedKeyboard:
+    """Creates a cancellation keyboard."""
+    keyboard = PreparedKeyboard(resize_keyboard=True)
+    cancel_button = KeyboardButton(BotCommands.BACK_TO_MENU.button_text)
+    keyboard.add(cancel_button)
+    return keyboard
+
+
+@keyboards.register('training')
+def build_training_keyboard() -> PreparedKeyboard:
+    """Creates a keyboard with a prompt button."""
+    keyboard = PreparedKeyboard(resize_keyboard=True)
+    clues_button = KeyboardButton(BotCommands.CLUE.button_text)
+    cancel_button = KeyboardButton(BotCommands.BACK_TO_MENU.button_text)
+    keyboard.add(cancel_button, clues_button)
+    return keyboard
+
+
+def get_main_keyboard() -> ReplyKeyboardMarkup:
+    return keyboards.get('main')
+
+
+def get_language_keyboard() -> ReplyKeyboardMarkup:
+    return keyboards.get('language')
+
+
+def get_cancel_keyboard() -> ReplyKeyboardMarkup:
+    return keyboards.get('cancel')
+
+
+def training_keyboard() -> ReplyKeyboardMarkup:
+    return keyboards.get('training')
@@ -1,7 +1,66 @@
 import json
+from functools import lru_cache
 from pathlib import Path
+from string import Formatter
 from typing import Any
 
+MESSAGES_PATH = Path(__file__).parent / 'bot_messages.json'
+
+
+@lru_cache(maxsize=None)
+def load_messages_file(path: Path) -> dict:
+    """Прочитать bot_messages.json один раз на процесс"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        raise FileNotFoundError("bot_messages.json not found")
+
+
+def flatten(messages: dict, prefix: str = '') -> dict[str, str]:
+    """{'a': {'b': 'text'}} -> {'a.b': 'text'}"""
+    flat = {}
+    for key, value in messages.items():
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{prefix}{key}."))
+        else:
+            flat[f"{prefix}{key}"] = value
+    return flat
+
+
+def compile_language(messages: dict) -> tuple[dict[str, str], dict[str, str]]:
+    """
+    Разделить сообщения языка на готовые строки и шаблоны.
+
+    Returns:
+        tuple: (ключ -> текст без подстановок, ключ -> шаблон для format)
+    """
+    static, templates = {}, {}
+    for key, template in flatten(messages).items():
+        parts = list(Formatter().parse(template))
+        if any(field is not None for _, field, _, _ in parts):
+            templates[key] = template
+        else:
+            # {{ и }} уже раскрыты парсером
+            static[key] = ''.join(literal for literal, _, _, _ in parts)
+    return static, templates
+
+
+# id(сообщения из файла) -> (сообщения, язык -> скомпилированный каталог)
+_compiled: dict[int, tuple[dict, dict]] = {}
+
+
+def compile_catalog(messages: dict) -> dict[str, tuple[dict, dict]]:
+    """Скомпилированный каталог, общий для всех экземпляров Messages"""
+    cached = _compiled.get(id(messages))
+    if cached is None or cached[0] is not messages:
+        catalog = {
+            language: compile_language(language_messages)
+            for language, language_messages in messages.items()
+        }
+        cached = _compiled[id(messages)] = (messages, catalog)
+    return cached[1]
+
 
 class Messages:
     SUPPORTED_LANGUAGES = {'en', 'ru', 'uk'}  # Добавляем список поддерживаемых языков
@@ -12,19 +71,18 @@ class Messages:
                              f"Supported languages: {', '.join(self.SUPPORTED_LANGUAGES)}")
         self.language = language
         self._load_messages()
+        self._catalog = compile_catalog(self.messages)
+        self._select_language()
 
     def _load_messages(self) -> None:
-        """Загрузка сообщений из JSON файла"""
-        path = Path(__file__).parent / 'bot_messages.json'
-        try:
-            with open(path, 'r', encoding='utf-8') as f:
-                self.messages = json.load(f)
-
-            if self.language not in self.messages:
-                raise ValueError(
-                    f"Language {self.language} not found in messages file")
-        except FileNotFoundError:
-            raise FileNotFoundError("bot_messages.json not found")
+        """Загрузка сообщений из JSON файла (файл читается один раз)"""
+        self.messages = load_messages_file(MESSAGES_PATH)
+
+    def _select_language(self) -> None:
+        if self.language not in self._catalog:
+            raise ValueError(
+                f"Language {self.language} not found in messages file")
+        self._static, self._templates = self._catalog[self.language]
 
     def get(self, key: str, **kwargs: Any) -> str:
         """
@@ -40,13 +98,10 @@ class Messages:
         Raises:
             KeyError: если ключ не найден
         """
-        keys = key.split('.')
-        value = self.messages[self.language]
-
-        for k in keys:
-            value = value[k]
-
-        return value.format(**kwargs)
+        text = self._static.get(key)
+        if text is not None:
+            return text
+        return self._templates[key].format(**kwargs)
 
     def change_language(self, language: str) -> None:
         """
@@ -62,3 +117,32 @@ class Messages:
             raise ValueError(f"Language {language} not supported. "
                              f"Supported languages: {', '.join(self.SUPPORTED_LANGUAGES)}")
         self.language = language
+        self._select_language()
+
+
+class SharedMessages(Messages):
+    """Messages of one language shared by all users, see get_messages."""
+
+    def change_language(self, language: str) -> None:
+        raise TypeError(
+            "Shared messages can't change language, use get_messages()"
+        )
+
+
+DEFAULT_LANGUAGE = 'en'
+
+# Язык -> общий экземпляр, создаются при импорте
+_shared_messages = {
+    language: SharedMessages(language)
+    for language in Messages.SUPPORTED_LANGUAGES
+}
+
+
+def get_messages(language: str) -> Messages:
+    """
+    Сообщения на языке пользователя.
+
+    Экземпляры созданы заранее и общие для всех пользователей, поэтому
+    смена языка - это поиск в словаре. Неизвестный язык - английский.
+    """
+    return _shared_messages.get(language) or _shared_messages[DEFAULT_LANGUAGE]
@@ -0,0 +1,422 @@
+"""
+Prometheus metrics of the bot.
+
+Counters and histograms of prometheus_client are updated on the hot path
+(handlers, Redis commands, SQL statements); callback metrics are read from
+existing counters only when /metrics is scraped. Everything is kept in
+`registry` and served by `start_http_server`.
+"""
+import asyncio
+import logging
+import re
+import time
+
+from functools import lru_cache
+from typing import Callable, Iterable, Optional, Sequence
+
+import prometheus_client
+from prometheus_client import CollectorRegistry, Counter, Histogram
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from prometheus_client.registry import Collector
+from sqlalchemy import exc
+
+
+logger = logging.getLogger(__name__)
+
+# Only the counters themselves, no *_created series next to every one
+prometheus_client.disable_created_metrics()
+
+# Seconds: from a Redis round trip on localhost to a slow Telegram call
+DEFAULT_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+Labels = tuple[str, ...]
+
+
+class CallbackCollector(Collector):
+    """
+    Gauge or counter read when metrics are collected.
+
+    `read` returns (label values, value) pairs, so nothing is done on the
+    hot path: the metric reads counters the code keeps anyway.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        read: Callable[[], Iterable[tuple[Labels, float]]],
+        labelnames: Sequence[str] = (),
+        type: str = 'gauge'
+    ) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.read = read
+        self.labelnames = list(labelnames)
+        self.family = CounterMetricFamily if type == 'counter' else GaugeMetricFamily
+
+    def describe(self) -> list:
+        # Names are not checked: register_callback replaces collectors
+        return []
+
+    def collect(self):
+        family = self.family(self.name, self.documentation, labels=self.labelnames)
+        try:
+            for values, value in self.read():
+                family.add_metric(list(values), value)
+        except Exception:
+            logger.exception("Collecting %s failed", self.name)
+            return
+        yield family
+
+
+registry = CollectorRegistry()
+# Callback name -> (registry, collector), to replace it on re-registration
+_callbacks: dict[str, tuple[CollectorRegistry, CallbackCollector]] = {}
+
+
+def register_callback(
+    name: str,
+    documentation: str,
+    read: Callable[[], Iterable[tuple[Labels, float]]],
+    labelnames: Sequence[str] = (),
+    type: str = 'gauge',
+    metrics: Optional[CollectorRegistry] = None
+) -> CallbackCollector:
+    """Add a CallbackCollector; one of the same name is replaced."""
+    metrics = metrics or registry
+    collector = CallbackCollector(name, documentation, read, labelnames, type)
+    previous = _callbacks.get(name)
+    if previous is not None:
+        previous_registry, previous_collector = previous
+        previous_registry.unregister(previous_collector)
+    metrics.register(collector)
+    _callbacks[name] = (metrics, collector)
+    return collector
+
+
+handler_seconds = Histogram(
+    'bot_handler_seconds', 'Time spent in message handlers', ['handler'],
+    buckets=DEFAULT_BUCKETS, registry=registry
+)
+handler_errors = Counter(
+    'bot_handler_errors_total', 'Message handlers that raised', ['handler'],
+    registry=registry
+)
+redis_seconds = Histogram(
+    'redis_command_seconds', 'Redis round trips by command', ['command'],
+    buckets=DEFAULT_BUCKETS, registry=registry
+)
+sql_seconds = Histogram(
+    'sql_statement_seconds', 'SQL statements by verb and table', ['statement'],
+    buckets=DEFAULT_BUCKETS, registry=registry
+)
+sql_errors = Counter(
+    'sql_errors_total', 'SQL statements that failed', ['statement'],
+    registry=registry
+)
+translation_fetch_seconds = Histogram(
+    'translation_fetch_seconds', 'Requests to the translation provider',
+    buckets=DEFAULT_BUCKETS, registry=registry
+)
+# From an idle connection handed out to waiting for pool_timeout
+pool_checkout_seconds = Histogram(
+    'db_pool_checkout_seconds',
+    'Time to get a connection from the pool, waits and pre-ping included',
+    buckets=(
+        0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+        0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0
+    ),
+    registry=registry
+)
+pool_timeouts = Counter(
+    'db_pool_timeouts_total', 'Checkouts that gave up waiting for a connection',
+    registry=registry
+)
+
+
+# labels() takes a lock and builds a key on every call: children of the
+# hot paths are looked up once
+_handler_children: dict = {}
+
+
+def observe_handler(name: str, seconds: float, failed: bool) -> None:
+    """Timing hook of CommandDispatcher."""
+    child = _handler_children.get(name)
+    if child is None:
+        child = _handler_children[name] = handler_seconds.labels(name)
+    child.observe(seconds)
+    if failed:
+        handler_errors.labels(name).inc()
+
+
+# ----- Redis -----
+
+# Command as passed to execute_command -> histogram child
+_redis_children: dict = {}
+
+
+def _observe_redis(command, started: float) -> None:
+    elapsed = time.perf_counter() - started
+    child = _redis_children.get(command)
+    if child is None:
+        name = command.decode() if isinstance(command, bytes) else str(command)
+        child = _redis_children[command] = redis_seconds.labels(name.upper())
+    child.observe(elapsed)
+
+
+def _instrument_pipeline(pipe, label: str):
+    execute = pipe.execute
+    if asyncio.iscoroutinefunction(execute):
+        async def execute_async(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return await execute(*args, **kwargs)
+            finally:
+                _observe_redis(label, started)
+        pipe.execute = execute_async
+    else:
+        def execute_sync(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return execute(*args, **kwargs)
+            finally:
+                _observe_redis(label, started)
+        pipe.execute = execute_sync
+    return pipe
+
+
+def instrument_redis(client):
+    """
+    Time every command and pipeline of a redis-py client, sync or asyncio.
+
+    Pipelines are one round trip and are labelled MULTI (transaction) or
+    PIPELINE; scripts show up as EVALSHA.
+    """
+    execute_command = client.execute_command
+    pipeline = client.pipeline
+
+    if asyncio.iscoroutinefunction(execute_command):
+        async def execute_command_async(*args, **options):
+            started = time.perf_counter()
+            try:
+                return await execute_command(*args, **options)
+            finally:
+                _observe_redis(args[0], started)
+        client.execute_command = execute_command_async
+    else:
+        def execute_command_sync(*args, **options):
+            started = time.perf_counter()
+            try:
+                return execute_command(*args, **options)
+            finally:
+                _observe_redis(args[0], started)
+        client.execute_command = execute_command_sync
+
+    def instrumented_pipeline(transaction: bool = True, shard_hint=None):
+        return _instrument_pipeline(
+            pipeline(transaction=transaction, shard_hint=shard_hint),
+            'MULTI' if transaction else 'PIPELINE'
+        )
+    client.pipeline = instrumented_pipeline
+    return client
+
+
+# ----- SQL -----
+
+_SQL_TABLE = re.compile(r'\b(?:FROM|INTO|UPDATE)\s+"?(\w+)', re.IGNORECASE)
+
+
+@lru_cache(maxsize=1024)
+def statement_label(statement: str) -> str:
+    """'SELECT words.id FROM words WHERE ...' -> 'SELECT words'"""
+    verb = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else ''
+    table = _SQL_TABLE.search(statement)
+    return f"{verb} {table.group(1)}" if table else verb
+
+
+@lru_cache(maxsize=1024)
+def _sql_child(statement: str):
+    # Statements come from SQLAlchemy's compiled cache: the label and the
+    # histogram child are resolved once per statement
+    return sql_seconds.labels(statement_label(statement))
+
+
+def _timed_dialect_method(method: Callable) -> Callable:
+    def timed(cursor, statement, *args):
+        started = time.perf_counter()
+        try:
+            return method(cursor, statement, *args)
+        except Exception:
+            sql_errors.labels(statement_label(statement)).inc()
+            raise
+        finally:
+            _sql_child(statement).observe(time.perf_counter() - started)
+    return timed
+
+
+def instrument_engine(engine) -> None:
+    """
+    Time every statement of a SQLAlchemy engine. For an AsyncEngine pass
+    `async_engine.sync_engine`.
+
+    Wraps the do_execute* methods of the engine's own dialect, around the
+    DBAPI call itself: dialect events would add their dispatch to every
+    statement, connection cursor events a slower execution path.
+    """
+    dialect = engine.dialect
+    for name in ('do_execute', 'do_executemany', 'do_execute_no_params'):
+        setattr(dialect, name, _timed_dialect_method(getattr(dialect, name)))
+
+
+def instrument_pool(engine, max_overflow: int) -> None:
+    """
+    Checkout wait and utilization of the engine's connection pool, to
+    size `database.pool_size` to the worker threads.
+
+    Wraps connect() of the current pool instance: after engine.dispose()
+    the new pool has to be instrumented again. Utilization is checked out
+    connections over pool size plus `max_overflow`; at 1 checkouts wait.
+    """
+    pool = engine.pool
+    connect = pool.connect
+
+    def timed_connect():
+        started = time.perf_counter()
+        try:
+            return connect()
+        except exc.TimeoutError:
+            pool_timeouts.inc()
+            raise
+        finally:
+            pool_checkout_seconds.observe(time.perf_counter() - started)
+
+    pool.connect = timed_connect
+
+    register_callback(
+        'db_pool_connections', 'Open pool connections by state',
+        lambda: [(('checked_out',), pool.checkedout()),
+                 (('idle',), pool.checkedin())],
+        ['state']
+    )
+    register_callback(
+        'db_pool_max_connections', 'Pool size plus overflow',
+        lambda: [((), pool.size() + max_overflow)]
+    )
+    register_callback(
+        'db_pool_utilization', 'Checked out share of the pool capacity',
+        lambda: [((), pool.checkedout() / (pool.size() + max_overflow))]
+    )
+
+
+# ----- Gauges over existing counters -----
+
+def watch_lru_cache(name: str, cache) -> None:
+    """Hits, misses and size of an LRUCache."""
+    register_callback(
+        f'{name}_requests_total', f'Lookups of {name} by result',
+        lambda: [(('hit',), cache.hits), (('miss',), cache.misses)],
+        ['result'], type='counter'
+    )
+    register_callback(
+        f'{name}_hit_ratio', f'Share of {name} lookups served from memory',
+        lambda: [((), cache.hit_ratio)]
+    )
+    register_callback(f'{name}_size', f'Entries in {name}', lambda: [((), len(cache))])
+
+
+def watch_translation_cache(translation_cache) -> None:
+    """Where translations come from: memory, Redis or the provider."""
+    def lookups():
+        memory = translation_cache.memory
+        return [
+            (('memory',), memory.hits),
+            (('redis',), translation_cache.redis_hits),
+            (('provider',), translation_cache.fetches),
+        ]
+
+    def hit_ratio():
+        memory = translation_cache.memory
+        total = memory.hits + memory.misses
+        hits = memory.hits + translation_cache.redis_hits
+        return [((), hits / total if total else 0.0)]
+
+    register_callback(
+        'translation_lookups_total', 'Translations by the layer that served them',
+        lookups, ['layer'], type='counter'
+    )
+    register_callback(
+        'translation_cache_hit_ratio',
+        'Share of translations served from memory or Redis', hit_ratio
+    )
+    register_callback(
+        'translation_errors_total', 'Failed provider requests',
+        lambda: [((), translation_cache.errors)], type='counter'
+    )
+
+
+def watch_worker_pool(pool) -> None:
+    """Queue depth and backpressure of ChatWorkerPool."""
+    register_callback(
+        'bot_updates_total', 'Updates by what happened to them',
+        lambda: [
+            ((status,), getattr(pool.stats(), status))
+            for status in ('submitted', 'rejected', 'completed', 'failed')
+        ],
+        ['status'], type='counter'
+    )
+    register_callback(
+        'bot_queue_depth', 'Updates waiting per worker',
+        lambda: [((str(index),), depth) for index, depth in enumerate(pool.queue_depths())],
+        ['worker']
+    )
+    register_callback(
+        'bot_queue_max_depth', 'Deepest worker queue since start',
+        lambda: [((), pool.stats().max_depth)]
+    )
+    register_callback(
+        'bot_queue_blocked_seconds_total', 'Time producers waited for a full queue',
+        lambda: [((), pool.stats().blocked_seconds)], type='counter'
+    )
+    register_callback(
+        'bot_queue_max_wait_seconds', 'Longest time an update waited in a queue',
+        lambda: [((), pool.stats().max_wait_seconds)]
+    )
+
+
+def watch_chat_dispatcher(dispatcher: Callable[[], object]) -> None:
+    """In-flight handlers of AsyncChatDispatcher (created lazily, so a getter)."""
+    register_callback(
+        'bot_updates_in_flight', 'Handlers running now',
+        lambda: [((), dispatcher().in_flight)]
+    )
+    register_callback(
+        'bot_chats_pending', 'Chats with queued or running handlers',
+        lambda: [((), dispatcher().pending_chats())]
+    )
+
+
+def watch_answer_flusher(flusher) -> None:
+    register_callback(
+        'answers_flushed_total', 'Answers written to the database',
+        lambda: [((), flusher.flushed)], type='counter'
+    )
+    register_callback(
+        'answers_dead_lettered_total',
+        'Answers moved to the dead-letter stream unwritten',
+        lambda: [((), flusher.dead_lettered)], type='counter'
+    )
+
+
+# ----- HTTP endpoint -----
+
+def start_http_server(
+    host: str, port: int, metrics: Optional[CollectorRegistry] = None
+):
+    """Serve the registry on a daemon thread; returns the HTTP server."""
+    server, _ = prometheus_client.start_http_server(
+        port, addr=host, registry=metrics or registry
+    )
+    return server
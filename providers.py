@@ -0,0 +1,206 @@
+import csv
+import random
+import threading
+import time
+
+import requests
+
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Optional
+from requests.adapters import HTTPAdapter
+from exceptions import TranslationError
+
+
+class CircuitBreaker:
+    """
+    Fails fast while a provider keeps failing.
+
+    After `failure_threshold` consecutive failures the circuit opens and
+    calls are rejected for `reset_timeout` seconds. Then one trial call is
+    let through: success closes the circuit, failure opens it again.
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self) -> bool:
+        return self.opened_at is not None
+
+    def allow(self) -> bool:
+        """Check if a call may go to the provider now."""
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if self._trial_running:
+                return False
+            if time.monotonic() - self.opened_at < self.reset_timeout:
+                return False
+            self._trial_running = True
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_running = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            self._trial_running = False
+            if self.opened_at is not None or \
+                    self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+
+class HttpClient:
+    """
+    Shared HTTP client for translation providers.
+
+    Keeps connections alive in a bounded pool, bounds every request with
+    connect/read timeouts, retries transient failures with jittered
+    exponential backoff and stops calling the host while the circuit
+    breaker is open.
+    """
+
+    RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+    def __init__(
+        self,
+        pool_size: int,
+        connect_timeout: float,
+        read_timeout: float,
+        max_retries: int,
+        backoff: float,
+        breaker: CircuitBreaker
+    ) -> None:
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.breaker = breaker
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=pool_size, pool_maxsize=pool_size
+        )
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        """
+        GET url, retrying connection errors, timeouts and 429/5xx answers.
+
+        Raises:
+            TranslationError: if the circuit is open or all attempts failed
+        """
+        if not self.breaker.allow():
+            raise TranslationError("Translation provider is unavailable")
+
+        error = None
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                # Full jitter: spread retries of concurrent callers
+                time.sleep(random.uniform(0, self.backoff * 2 ** (attempt - 1)))
+            try:
+                response = self.session.get(url, timeout=self.timeout, **kwargs)
+            except requests.RequestException as e:
+                error = TranslationError(f"Translation request failed: {e}")
+                continue
+
+            if response.status_code not in self.RETRY_STATUSES:
+                self.breaker.record_success()
+                return response
+            error = TranslationError(
+                f"Ошибка {response.status_code}: {response.text}"
+            )
+
+        self.breaker.record_failure()
+        raise error
+
+
+class TranslationProvider(ABC):
+    """Source of translations used by TranslationCache."""
+
+    @abstractmethod
+    def translate(self, word: str) -> Optional[str]:
+        """
+        Translate the word.
+
+        Returns:
+            Optional[str]: translation or None if there is none
+
+        Raises:
+            TranslationError: if the provider failed
+        """
+
+
+class OxfordProvider(TranslationProvider):
+    """Oxford Dictionaries API translations en -> ru."""
+
+    def __init__(
+        self, client: HttpClient, api_url: str, app_id: str, app_key: str
+    ) -> None:
+        self.client = client
+        self.api_url = api_url
+        self.headers = {"app_id": app_id, "app_key": app_key}
+
+    def translate(self, word: str) -> Optional[str]:
+        url = f"{self.api_url}/translations/en/ru/{word.lower()}"
+        response = self.client.get(url, headers=self.headers)
+
+        if response.status_code == 404:
+            return None
+        if response.status_code != 200:
+            raise TranslationError(
+                f"Ошибка {response.status_code}: {response.text}"
+            )
+
+        data = response.json()
+        try:
+            translations = data['results'][0]['lexicalEntries'][0]['entries'][0]['senses'][0]['translations']
+            return translations[0]['text']
+        except (KeyError, IndexError):
+            return None
+
+
+class DictionaryProvider(TranslationProvider):
+    """Translations from a local word list, for tests and offline use."""
+
+    def __init__(self, translations: dict[str, str]) -> None:
+        self.translations = {
+            word.lower(): translation
+            for word, translation in translations.items()
+        }
+
+    @classmethod
+    def from_file(cls, path: Path) -> 'DictionaryProvider':
+        """Load `word<TAB>translation` lines; the first translation wins."""
+        translations = {}
+        with open(path, 'r', encoding='utf-8', newline='') as f:
+            for row in csv.reader(f, delimiter='\t'):
+                if len(row) >= 2:
+                    translations.setdefault(row[0].strip().lower(), row[1].strip())
+        return cls(translations)
+
+    def translate(self, word: str) -> Optional[str]:
+        return self.translations.get(word.lower())
+
+
+class ChainProvider(TranslationProvider):
+    """Asks providers in order, e.g. local dictionary before the API."""
+
+    def __init__(self, providers: list[TranslationProvider]) -> None:
+        self.providers = providers
+
+    def translate(self, word: str) -> Optional[str]:
+        for provider in self.providers:
+            translated = provider.translate(word)
+            if translated is not None:
+                return translated
+        return None
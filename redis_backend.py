@@ -0,0 +1,83 @@
+import redis
+import redis.asyncio
+
+from config import RedisConfig
+
+
+STANDALONE = 'standalone'
+SENTINEL = 'sentinel'
+CLUSTER = 'cluster'
+
+
+def is_cluster(client) -> bool:
+    """Whether keys of the client are spread over Redis Cluster slots."""
+    return isinstance(client, (redis.RedisCluster, redis.asyncio.RedisCluster))
+
+
+def hash_tag(value, cluster: bool) -> str:
+    """
+    Key part that decides the cluster slot of the key.
+
+    In cluster mode the value is wrapped in `{}`, so every key built around
+    it lands in the same slot and can be used in one pipeline or script.
+    Standalone and Sentinel keys stay as they are.
+    """
+    return f"{{{value}}}" if cluster else str(value)
+
+
+def connection_options(redis_config: RedisConfig) -> dict:
+    """Options of every connection, the same for all modes."""
+    return dict(
+        password=redis_config.password or None,
+        socket_timeout=redis_config.socket_timeout,
+        socket_connect_timeout=redis_config.socket_connect_timeout,
+        health_check_interval=redis_config.health_check_interval,
+        decode_responses=True
+    )
+
+
+def _create(module, redis_config: RedisConfig):
+    options = connection_options(redis_config)
+    if redis_config.mode == CLUSTER:
+        # max_connections is per cluster node; cluster has only db 0
+        return module.RedisCluster(
+            host=redis_config.host,
+            port=redis_config.port,
+            max_connections=redis_config.max_connections,
+            **options
+        )
+    if redis_config.mode == SENTINEL:
+        sentinel = module.Sentinel(
+            redis_config.sentinels,
+            sentinel_kwargs={
+                'socket_timeout': redis_config.socket_timeout,
+                'socket_connect_timeout': redis_config.socket_connect_timeout
+            }
+        )
+        # The pool asks sentinels for the current master on reconnect
+        return sentinel.master_for(
+            redis_config.service_name,
+            db=redis_config.db,
+            max_connections=redis_config.max_connections,
+            **options
+        )
+    if redis_config.mode != STANDALONE:
+        raise ValueError(f"Unknown Redis mode: {redis_config.mode}")
+    pool = module.ConnectionPool(
+        host=redis_config.host,
+        port=redis_config.port,
+        db=redis_config.db,
+        max_connections=redis_config.max_connections,
+        **options
+    )
+    return module.Redis(connection_pool=pool)
+
+
+def create_redis(redis_config: RedisConfig) -> redis.Redis:
+    """Redis client for `redis.mode`: standalone, sentinel or cluster."""
+    return _create(redis, redis_config)
+
+
+def create_async_redis(redis_config: RedisConfig) -> redis.asyncio.Redis:
+    """The same as create_redis on top of redis.asyncio."""
+    return _create(redis.asyncio, redis_config)
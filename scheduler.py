@@ -0,0 +1,114 @@
+import sys
+
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Optional
+
+
+# Параметры SM-2
+DEFAULT_EASE = 2.5
+MIN_EASE = 1.3
+FIRST_INTERVAL = 1  # дней после первого правильного ответа
+SECOND_INTERVAL = 6  # дней после второго
+# Через сколько снова показать забытое слово
+RELEARN_DELAY = timedelta(minutes=10)
+
+
+@dataclass
+class ReviewState:
+    """Review state of one word of a user."""
+    ease: float = DEFAULT_EASE
+    interval: float = 0.0  # days
+    repetitions: int = 0
+    lapses: int = 0
+    due: Optional[datetime] = None
+    last_review: Optional[datetime] = None
+
+
+def answer_quality(correct: bool, clues: int, gave_up: bool = False) -> int:
+    """
+    SM-2 answer quality from 0 to 5.
+
+    Every clue letter lowers the quality of a correct answer, 3 being the
+    lowest passing grade. A wrong answer is 1, all letters opened is 0.
+    """
+    if gave_up:
+        return 0
+    if not correct:
+        return 1
+    return max(3, 5 - clues)
+
+
+def next_ease(ease: float, quality: int) -> float:
+    penalty = 5 - quality
+    return max(MIN_EASE, ease + 0.1 - penalty * (0.08 + penalty * 0.02))
+
+
+def due_date(state: ReviewState) -> datetime:
+    """When the word should be shown again after its last review."""
+    if not state.interval:
+        return state.last_review + RELEARN_DELAY
+    return state.last_review + timedelta(days=state.interval)
+
+
+def schedule(
+    state: ReviewState, quality: int, now: datetime
+) -> ReviewState:
+    """
+    Next review state after an answer (SM-2).
+
+    A failed answer (quality < 3) starts the word over and shows it again
+    after RELEARN_DELAY. Passing answers grow the interval: 1 day, 6 days,
+    then the previous interval times the ease.
+    """
+    ease = next_ease(state.ease, quality)
+
+    if quality < 3:
+        new_state = ReviewState(
+            ease=ease,
+            interval=0.0,
+            repetitions=0,
+            lapses=state.lapses + 1,
+            last_review=now
+        )
+    else:
+        repetitions = state.repetitions + 1
+        if repetitions == 1:
+            interval = FIRST_INTERVAL
+        elif repetitions == 2:
+            interval = SECOND_INTERVAL
+        else:
+            interval = state.interval * ease
+        new_state = ReviewState(
+            ease=ease,
+            interval=float(interval),
+            repetitions=repetitions,
+            lapses=state.lapses,
+            last_review=now
+        )
+
+    new_state.due = due_date(new_state)
+    return new_state
+
+
+def recompute(state: ReviewState) -> ReviewState:
+    """
+    Review state under the current parameters, e.g. after MIN_EASE or
+    RELEARN_DELAY changed. Words that were never reviewed keep their due.
+    """
+    if state.last_review is None:
+        return state
+    state.ease = max(MIN_EASE, state.ease)
+    state.due = due_date(state)
+    return state
+
+
+if __name__ == '__main__':
+    # Recompute due dates of all reviews: python scheduler.py recompute
+    if len(sys.argv) != 2 or sys.argv[1] != 'recompute':
+        print("Usage: python scheduler.py recompute")
+        sys.exit(1)
+
+    from database.models import Reviews
+
+    print(f"Updated reviews: {Reviews.recompute_all()}")
@@ -0,0 +1,350 @@
+import json
+import sys
+import time
+import redis
+import redis.asyncio
+
+from collections import namedtuple
+from typing import Optional
+from commands import UserState
+from redis_backend import create_redis, hash_tag, is_cluster
+
+# Слово колоды: (слово, все его переводы)
+Card = tuple[str, list[str]]
+
+# Отвеченное слово: переводы, сколько взято подсказок и когда его показали
+FinishedWord = namedtuple(
+    'FinishedWord', ['word', 'translations', 'clues', 'shown_at']
+)
+
+# Все данные чата лежат в одном хеше `user:{chat_id}` с одним TTL;
+# в Redis Cluster id обрамляется хеш-тегом: `user:{{chat_id}}`
+STATE_FIELD = 'state'
+WORD_FIELD = 'word'
+CLUE_FIELD = 'clue'
+TRANSLATIONS_FIELD = 'translations'
+SHOWN_FIELD = 'shown'
+
+# Разделитель переводов внутри поля хеша
+TRANSLATIONS_SEPARATOR = '\x1f'
+
+# Подсказка за один запрос: проверяет состояние, читает переводы
+# и увеличивает счетчик подсказок только если идет тренировка.
+# KEYS: хеш чата; ARGV: значение TRAINING, ttl
+TAKE_CLUE_SCRIPT = """
+local fields = redis.call('HMGET', KEYS[1], 'state', 'translations')
+local state, translations = fields[1], fields[2]
+if state ~= ARGV[1] or not translations or translations == '' then
+    return {state, 0, ''}
+end
+local counter = redis.call('HINCRBY', KEYS[1], 'clue', 1)
+redis.call('EXPIRE', KEYS[1], ARGV[2])
+return {state, counter, translations}
+"""
+
+
+def encode_translations(translations: list[str]) -> str:
+    return TRANSLATIONS_SEPARATOR.join(translations)
+
+
+def decode_translations(value: Optional[str]) -> list[str]:
+    return value.split(TRANSLATIONS_SEPARATOR) if value else []
+
+
+def decode_finished_word(word, translations, clues, shown_at) -> FinishedWord:
+    return FinishedWord(
+        word,
+        decode_translations(translations),
+        int(clues or 0),
+        float(shown_at) if shown_at else None
+    )
+
+
+class RedisStateManager:
+    def __init__(self, redis_client: redis.Redis, config_redis) -> None:
+        self.redis = redis_client
+        self.config = config_redis
+        self._take_clue = redis_client.register_script(TAKE_CLUE_SCRIPT)
+        # Cluster pipelines can't be MULTI/EXEC; all their commands go to
+        # one key, so they still take one round trip to one node
+        self.cluster = is_cluster(redis_client)
+        self.transaction = not self.cluster
+
+    def _get_key(self, chat_id: int) -> str:
+        return f"{self.config.prefix}user:{hash_tag(chat_id, self.cluster)}"
+
+    def _set_fields(self, pipe, chat_id: int, fields: dict) -> None:
+        key = self._get_key(chat_id)
+        pipe.hset(key, mapping=fields)
+        pipe.expire(key, self.config.ttl)
+
+    def get_state(self, chat_id: int) -> Optional[str]:
+        return self.redis.hget(self._get_key(chat_id), STATE_FIELD)
+
+    def set_state(self, chat_id: int, state: UserState) -> None:
+        pipe = self.redis.pipeline(transaction=self.transaction)
+        self._set_fields(pipe, chat_id, {STATE_FIELD: state.value})
+        pipe.execute()
+
+    def begin_training(
+        self, chat_id: int, word: str, translations: list[str]
+    ) -> None:
+        """
+        Switch chat to the training state with a new word in one round trip.
+
+        Sets the state, the word, its translations and resets the clue
+        counter atomically (MULTI/EXEC, a plain pipeline in cluster mode).
+        """
+        pipe = self.redis.pipeline(transaction=self.transaction)
+        self._set_fields(pipe, chat_id, {
+            STATE_FIELD: UserState.TRAINING.value,
+            WORD_FIELD: word,
+            CLUE_FIELD: 0,
+            TRANSLATIONS_FIELD: encode_translations(translations),
+            SHOWN_FIELD: time.time()
+        })
+        pipe.execute()
+
+    def finish_word(self, chat_id: int) -> FinishedWord:
+        """
+        Get the current word and reset its clue counter in one round trip.
+
+        Returns:
+            FinishedWord: word, its translations, clues taken for it and
+            the time it was shown
+        """
+        key = self._get_key(chat_id)
+        pipe = self.redis.pipeline(transaction=self.transaction)
+        pipe.hmget(key, WORD_FIELD, TRANSLATIONS_FIELD, CLUE_FIELD, SHOWN_FIELD)
+        pipe.hdel(key, CLUE_FIELD)
+        fields, _ = pipe.execute()
+        return decode_finished_word(*fields)
+
+    def take_clue(
+        self, chat_id: int
+    ) -> tuple[Optional[str], int, list[str]]:
+        """
+        Increase clue counter of the current word in one round trip.
+
+        Returns:
+            tuple: (state, new clue counter, translations). The counter is
+            only increased in training state with a word in progress.
+        """
+        state, counter, translations = self._take_clue(
+            keys=[self._get_key(chat_id)],
+            args=[UserState.TRAINING.value, self.config.ttl]
+        )
+        return state, counter, decode_translations(translations)
+
+    def clear_state(self, chat_id: int) -> None:
+        """Clear user state, translations and clue counter."""
+        self.redis.delete(self._get_key(chat_id))
+
+    def _get_deck_key(self, user_id: int) -> str:
+        return f"{self.config.prefix}deck:{hash_tag(user_id, self.cluster)}"
+
+    def pop_training_card(self, user_id: int) -> tuple[Optional[Card], int]:
+        """
+        Take the next word from the users training deck.
+
+        Returns:
+            tuple: (word and translations or None, words left in the deck)
+        """
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.lpop(self._get_deck_key(user_id))
+        pipe.llen(self._get_deck_key(user_id))
+        card, left = pipe.execute()
+        return (tuple(json.loads(card)) if card else None), left
+
+    def push_training_cards(
+        self, user_id: int, cards: list[Card], replace: bool = False
+    ) -> None:
+        """Append words to the users training deck or replace the deck."""
+        key = self._get_deck_key(user_id)
+        pipe = self.redis.pipeline(transaction=replace and self.transaction)
+        if replace:
+            pipe.delete(key)
+        pipe.rpush(key, *[json.dumps(card, ensure_ascii=False) for card in cards])
+        pipe.expire(key, self.config.ttl)
+        pipe.execute()
+
+    def clear_training_deck(self, user_id: int) -> None:
+        """Drop the deck, e.g. after the user added a new word pair."""
+        self.redis.delete(self._get_deck_key(user_id))
+
+    def migrate_legacy_keys(self, batch_size: int = 1000) -> int:
+        """
+        Move chats from the old layout to the per-chat hash.
+
+        The old layout kept `user:{id}` (string state),
+        `user:{id}:translations` (list) and `user:{id}:clue` (string),
+        only the first one with a TTL. Safe to run repeatedly.
+
+        Returns:
+            int: number of migrated chats
+        """
+        migrated = 0
+        pattern = f"{self.config.prefix}user:*"
+        for key in self.redis.scan_iter(match=pattern, count=batch_size):
+            if key.endswith((':translations', ':clue')):
+                continue
+            if self.redis.type(key) != 'string':
+                continue
+
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.get(key)
+            pipe.ttl(key)
+            pipe.lrange(f"{key}:translations", 0, -1)
+            pipe.get(f"{key}:clue")
+            state, ttl, translations, clue = pipe.execute()
+
+            fields = {STATE_FIELD: state}
+            if translations:
+                fields[TRANSLATIONS_FIELD] = encode_translations(translations)
+            if clue:
+                fields[CLUE_FIELD] = clue
+
+            pipe = self.redis.pipeline(transaction=self.transaction)
+            pipe.delete(key, f"{key}:translations", f"{key}:clue")
+            if state is not None:
+                pipe.hset(key, mapping=fields)
+                pipe.expire(key, ttl if ttl > 0 else self.config.ttl)
+            pipe.execute()
+            migrated += 1
+
+        # Translations and clue counters of chats whose state already expired
+        for suffix in (':translations', ':clue'):
+            orphans = list(self.redis.scan_iter(
+                match=f"{pattern}{suffix}", count=batch_size
+            ))
+            for start in range(0, len(orphans), batch_size):
+                self.redis.delete(*orphans[start:start + batch_size])
+        return migrated
+
+
+class AsyncRedisStateManager(RedisStateManager):
+    """The same state layout as RedisStateManager on top of redis.asyncio."""
+
+    def __init__(self, redis_client: redis.asyncio.Redis, config_redis) -> None:
+        super().__init__(redis_client, config_redis)
+
+    async def get_state(self, chat_id: int) -> Optional[str]:
+        return await self.redis.hget(self._get_key(chat_id), STATE_FIELD)
+
+    async def set_state(self, chat_id: int, state: UserState) -> None:
+        pipe = self.redis.pipeline(transaction=self.transaction)
+        self._set_fields(pipe, chat_id, {STATE_FIELD: state.value})
+        await pipe.execute()
+
+    async def get_translations(self, chat_id: int) -> list[str]:
+        """Get all possible translations."""
+        value = await self.redis.hget(
+            self._get_key(chat_id), TRANSLATIONS_FIELD
+        )
+        return decode_translations(value)
+
+    async def set_translations(
+        self, chat_id: int, translations: list[str]
+    ) -> None:
+        """Replace possible translations of the current word."""
+        pipe = self.redis.pipeline(transaction=self.transaction)
+        self._set_fields(pipe, chat_id, {
+            TRANSLATIONS_FIELD: encode_translations(translations)
+        })
+        await pipe.execute()
+
+    async def begin_training(
+        self, chat_id: int, word: str, translations: list[str]
+    ) -> None:
+        """Switch chat to the training state with a new word in one round trip."""
+        pipe = self.redis.pipeline(transaction=self.transaction)
+        self._set_fields(pipe, chat_id, {
+            STATE_FIELD: UserState.TRAINING.value,
+            WORD_FIELD: word,
+            CLUE_FIELD: 0,
+            TRANSLATIONS_FIELD: encode_translations(translations),
+            SHOWN_FIELD: time.time()
+        })
+        await pipe.execute()
+
+    async def finish_word(self, chat_id: int) -> FinishedWord:
+        """Get the current word and reset its clue counter in one round trip."""
+        key = self._get_key(chat_id)
+        pipe = self.redis.pipeline(transaction=self.transaction)
+        pipe.hmget(key, WORD_FIELD, TRANSLATIONS_FIELD, CLUE_FIELD, SHOWN_FIELD)
+        pipe.hdel(key, CLUE_FIELD)
+        fields, _ = await pipe.execute()
+        return decode_finished_word(*fields)
+
+    async def take_clue(
+        self, chat_id: int
+    ) -> tuple[Optional[str], int, list[str]]:
+        """Increase clue counter of the current word in one round trip."""
+        state, counter, translations = await self._take_clue(
+            keys=[self._get_key(chat_id)],
+            args=[UserState.TRAINING.value, self.config.ttl]
+        )
+        return state, counter, decode_translations(translations)
+
+    async def increase_clue_counter(self, chat_id: int) -> int:
+        """Increase prompt counter and return its new value."""
+        key = self._get_key(chat_id)
+        pipe = self.redis.pipeline(transaction=self.transaction)
+        pipe.hincrby(key, CLUE_FIELD, 1)
+        pipe.expire(key, self.config.ttl)
+        value, _ = await pipe.execute()
+        return value
+
+    async def get_clue_counter(self, chat_id: int) -> Optional[int]:
+        value = await self.redis.hget(self._get_key(chat_id), CLUE_FIELD)
+        return int(value) if value else 0
+
+    async def clear_clue_counter(self, chat_id: int) -> None:
+        await self.redis.hdel(self._get_key(chat_id), CLUE_FIELD)
+
+    async def clear_state(self, chat_id: int) -> None:
+        """Clear user state, translations and clue counter."""
+        await self.redis.delete(self._get_key(chat_id))
+
+    async def pop_training_card(
+        self, user_id: int
+    ) -> tuple[Optional[Card], int]:
+        """Take the next word from the users training deck."""
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.lpop(self._get_deck_key(user_id))
+        pipe.llen(self._get_deck_key(user_id))
+        card, left = await pipe.execute()
+        return (tuple(json.loads(card)) if card else None), left
+
+    async def push_training_cards(
+        self, user_id: int, cards: list[Card], replace: bool = False
+    ) -> None:
+        """Append words to the users training deck or replace the deck."""
+        key = self._get_deck_key(user_id)
+        pipe = self.redis.pipeline(transaction=replace and self.transaction)
+        if replace:
+            pipe.delete(key)
+        pipe.rpush(key, *[json.dumps(card, ensure_ascii=False) for card in cards])
+        pipe.expire(key, self.config.ttl)
+        await pipe.execute()
+
+    async def clear_training_deck(self, user_id: int) -> None:
+        """Drop the deck, e.g. after the user added a new word pair."""
+        await self.redis.delete(self._get_deck_key(user_id))
+
+
+if __name__ == '__main__':
+    # Migrate existing chats: python state.py migrate
+    from config import config
+
+    if sys.argv[1:] != ['migrate']:
+        print("Usage: python state.py migrate")
+        sys.exit(1)
+
+    if config.redis.mode == 'cluster':
+        print("The old layout was never used with Redis Cluster")
+        sys.exit(1)
+
+    client = create_redis(config.redis)
+    count = RedisStateManager(client, config.redis).migrate_legacy_keys()
+    print(f"Migrated chats: {count}")
@@ -1,7 +1,10 @@
 # tests/conftest.py
 import pytest
 import json
+import fakeredis
 from pathlib import Path
+from sqlalchemy import create_engine
+from config import Config
 from messages import Messages
 
 
@@ -42,3 +45,35 @@ def messages(test_messages_file, monkeypatch):
 
     monkeypatch.setattr(Messages, '_load_messages', mock_load_messages)
     return Messages('en')
+
+
+@pytest.fixture
+def config():
+    """Configuration from configs.yaml and the environment"""
+    return Config()
+
+
+@pytest.fixture
+def redis_client():
+    """In-memory Redis, empty in every test"""
+    return fakeredis.FakeRedis(decode_responses=True)
+
+
+@pytest.fixture
+def db_session(tmp_path):
+    """Session of an empty SQLite database, used by the models too"""
+    import database.db
+    from database.models import Base, user_cache
+
+    previous = database.db._engine
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.sqlite3'}")
+    Base.metadata.create_all(engine)
+    database.db.configure_engine(engine)
+    user_cache.clear()
+    yield database.db.db_session
+
+    database.db.db_session.remove()
+    user_cache.clear()
+    engine.dispose()
+    database.db._engine = previous
+    database.db.db_session.configure(bind=previous)
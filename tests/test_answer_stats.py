@@ -0,0 +1,139 @@
+import time
+
+import pytest
+from answer_stats import AnswerBuffer, AnswerFlusher
+
+PREFIX = 'test:'
+
+
+def make_flusher(redis_client, write):
+    flusher = AnswerFlusher(
+        redis_client, PREFIX, write,
+        batch_size=2, block_ms=10, claim_idle_ms=60000, max_deliveries=3
+    )
+    flusher.ensure_group()
+    return flusher
+
+
+def test_record_counts_streak(redis_client):
+    """Test streak grows with correct answers and resets on a wrong one"""
+    buffer = AnswerBuffer(redis_client, PREFIX, maxlen=1000)
+    assert buffer.record(1, 'cat', True, 0) == 1
+    assert buffer.record(1, 'dog', True, 1) == 2
+    assert buffer.record(2, 'sun', True, 0) == 1
+    assert buffer.record(1, 'cat', False, 0) == 0
+    assert redis_client.xlen(buffer.stream) == 4
+
+
+def test_flush_writes_batches_and_acks(redis_client):
+    """Test events are written in batches and removed from the stream"""
+    buffer = AnswerBuffer(redis_client, PREFIX, maxlen=1000)
+    written = []
+    flusher = make_flusher(redis_client, written.append)
+
+    buffer.record(1, 'cat', True, 2, shown_at=time.time() - 1.5)
+    buffer.record(1, 'dog', False, 0)
+    buffer.record(1, 'sun', True, 0)
+
+    assert flusher.flush_once(block=False) == 2
+    assert flusher.flush_once(block=False) == 1
+    assert flusher.flush_once(block=False) == 0
+
+    assert [len(batch) for batch in written] == [2, 1]
+    first = written[0][0]
+    assert (first.user_id, first.word, first.correct, first.clues) == (1, 'cat', True, 2)
+    assert 1400 < first.latency_ms < 5000
+    assert written[0][1].latency_ms is None
+    assert [event.streak for event in written[0] + written[1]] == [1, 0, 1]
+    assert redis_client.xlen(buffer.stream) == 0
+
+
+def test_failed_write_is_redelivered(redis_client):
+    """Test at-least-once: a failed batch stays pending and is written later"""
+    buffer = AnswerBuffer(redis_client, PREFIX, maxlen=1000)
+    written = []
+
+    def write(events):
+        if not written:
+            written.append(None)
+            raise RuntimeError("database is down")
+        written.append(events)
+
+    flusher = make_flusher(redis_client, write)
+    buffer.record(1, 'cat', True, 0)
+
+    with pytest.raises(RuntimeError):
+        flusher.flush_once(block=False)
+    assert flusher.flush_once(block=False) == 0
+    assert flusher.flush_once(pending=True) == 1
+    assert written[1][0].word == 'cat'
+
+
+def test_stop_drains_buffer(redis_client):
+    """Test answers buffered before shutdown are written"""
+    buffer = AnswerBuffer(redis_client, PREFIX, maxlen=1000)
+    written = []
+    flusher = make_flusher(redis_client, written.extend)
+    for word in ('cat', 'dog', 'sun'):
+        buffer.record(1, word, True, 0)
+
+    flusher.start()
+    flusher.stop(timeout=5)
+
+    assert [event.word for event in written] == ['cat', 'dog', 'sun']
+
+
+def test_failing_entry_is_dead_lettered(redis_client):
+    """Test an entry that always fails stops blocking the others"""
+    buffer = AnswerBuffer(redis_client, PREFIX, maxlen=1000)
+    written = []
+
+    def write(events):
+        if any(event.word == 'bad' for event in events):
+            raise RuntimeError('constraint violation')
+        written.extend(event.word for event in events)
+
+    flusher = make_flusher(redis_client, write)
+    for word in ('bad', 'cat', 'dog'):
+        buffer.record(1, word, True, 0)
+
+    # The rest of a failed batch is written one by one
+    with pytest.raises(RuntimeError):
+        flusher.flush_once(block=False)
+    assert written == ['cat']
+    for _ in range(flusher.max_deliveries - 1):
+        with pytest.raises(RuntimeError):
+            flusher.flush_once(pending=True)
+
+    assert flusher.flush_once(pending=True) == 1
+    assert flusher.flush_once(block=False) == 1
+    assert written == ['cat', 'dog']
+    assert redis_client.xlen(flusher.stream) == 0
+    [(_, dead)] = redis_client.xrange(flusher.dead_letters)
+    assert dead['word'] == 'bad'
+    assert flusher.dead_lettered == 1
+
+
+def test_malformed_entry_is_dead_lettered(redis_client):
+    """Test an entry that can't be parsed is moved aside at once"""
+    written = []
+    flusher = make_flusher(redis_client, written.extend)
+    redis_client.xadd(flusher.stream, {'user_id': 'oops'})
+
+    assert flusher.flush_once(block=False) == 1
+    assert written == []
+    assert redis_client.xlen(flusher.dead_letters) == 1
+    assert redis_client.xpending(flusher.stream, flusher.GROUP)['pending'] == 0
+
+
+def test_events_carry_answer_quality(redis_client):
+    """Test the flusher gets the SM-2 quality the word is rescheduled with"""
+    buffer = AnswerBuffer(redis_client, PREFIX, maxlen=1000)
+    written = []
+    flusher = make_flusher(redis_client, written.extend)
+
+    buffer.record(1, 'cat', True, 1)
+    buffer.record(1, 'dog', False, 3, gave_up=True)
+    flusher.flush_once(block=False)
+
+    assert [event.quality for event in written] == [4, 0]
@@ -1,8 +1,11 @@
 # tests/test_bot.py
+import asyncio
 import pytest
-from unittest.mock import Mock, patch
-from main import validate_word_pair, process_new_word_pair, \
-    start_training_session
+from unittest.mock import AsyncMock, Mock, patch
+from database.models import UserRef
+from messages import get_messages
+from utils import validate_word_pair
+from handlers import process_new_word_pair, start_training_session
 
 
 @pytest.fixture
@@ -16,7 +19,7 @@ def mock_message():
 
 @pytest.fixture
 def mock_state_manager():
-    return Mock()
+    return AsyncMock()
 
 
 def test_validate_word_pair_valid():
@@ -37,38 +40,52 @@ def test_validate_word_pair_empty():
         validate_word_pair(" - ")
 
 
-@patch('editbot.Users')
-def test_process_new_word_pair_success(mock_users, mock_message,
+@patch('handlers.Words')
+@patch('handlers.Users')
+def test_process_new_word_pair_success(mock_users, mock_words, mock_message,
                                        mock_state_manager):
     """Test successful word pair processing"""
-    mock_user = Mock()
-    mock_users.get_or_create_user.return_value = (mock_user, True)
-
-    success, message = process_new_word_pair(mock_message, mock_state_manager)
+    mock_users.get_user_ref_async = AsyncMock(return_value=UserRef(1, 'en'))
+    mock_words.get_or_create_word_async = AsyncMock(
+        return_value=(Mock(), True)
+    )
+
+    success, message = asyncio.run(
+        process_new_word_pair(mock_message, mock_state_manager, Mock())
+    )
     assert success is True
     assert "saved" in message.lower()
+    mock_words.get_or_create_word_async.assert_awaited_once()
+    mock_state_manager.clear_training_deck.assert_awaited_once_with(1)
 
 
-@patch('editbot.Words')
-def test_start_training_session_no_words(mock_words):
+@patch('handlers.Reviews')
+def test_start_training_session_no_words(mock_reviews):
     """Test training session start with no words"""
-    mock_words.get_random_word.return_value = None
+    mock_reviews.get_training_deck_async = AsyncMock(return_value=[])
+    state_manager = AsyncMock()
+    state_manager.pop_training_card.return_value = (None, 0)
 
-    success, message = start_training_session(123, 456, Mock())
+    success, message = asyncio.run(start_training_session(
+        123, 456, state_manager, Mock(), get_messages('en')
+    ))
     assert success is False
     assert "no words" in message.lower()
 
 
-@patch('editbot.Words')
-def test_start_training_session_success(mock_words):
+@patch('handlers.Reviews')
+def test_start_training_session_success(mock_reviews):
     """Test successful training session start"""
-    mock_word = Mock()
-    mock_word.first_part = "test"
-    mock_word.all_translations = ["тест"]
-    mock_words.get_random_word.return_value = mock_word
+    mock_reviews.get_training_deck_async = AsyncMock(
+        return_value=[("test", ["Тест"])]
+    )
+    state_manager = AsyncMock()
+    state_manager.pop_training_card.return_value = (None, 0)
 
-    mock_state_manager = Mock()
-    success, word = start_training_session(123, 456, mock_state_manager)
+    success, word = asyncio.run(start_training_session(
+        123, 456, state_manager, Mock(), get_messages('en')
+    ))
 
     assert success is True
     assert word == "test"
+    state_manager.begin_training.assert_awaited_once_with(123, "test", ["тест"])
@@ -0,0 +1,48 @@
+import pytest
+from unittest.mock import patch
+from cache import LRUCache
+
+
+def test_get_missing_key():
+    """Test miss on empty cache"""
+    cache = LRUCache(max_size=2, ttl=60)
+    assert cache.get('missing') is None
+    assert cache.misses == 1
+
+
+def test_set_and_get():
+    """Test hit after set"""
+    cache = LRUCache(max_size=2, ttl=60)
+    cache.set(1, ('value',))
+    assert cache.get(1) == ('value',)
+    assert cache.hits == 1
+    assert cache.hit_ratio == 1.0
+
+
+def test_least_recently_used_is_evicted():
+    """Test eviction order"""
+    cache = LRUCache(max_size=2, ttl=60)
+    cache.set(1, 'a')
+    cache.set(2, 'b')
+    cache.get(1)
+    cache.set(3, 'c')
+    assert cache.get(2) is None
+    assert cache.get(1) == 'a'
+    assert len(cache) == 2
+
+
+def test_entry_expires():
+    """Test TTL expiration"""
+    cache = LRUCache(max_size=2, ttl=10)
+    with patch('cache.time.monotonic', return_value=100):
+        cache.set(1, 'a')
+    with patch('cache.time.monotonic', return_value=111):
+        assert cache.get(1) is None
+
+
+def test_invalidate():
+    """Test invalidation"""
+    cache = LRUCache(max_size=2, ttl=60)
+    cache.set(1, 'a')
+    cache.invalidate(1)
+    assert cache.get(1) is None
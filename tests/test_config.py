@@ -27,3 +27,31 @@ def test_config_environment_override(monkeypatch):
     config = Config()
     assert config.redis.host == 'test_host'
     assert config.redis.port == 6380
+
+
+def test_database_pool_environment_override(monkeypatch):
+    """Test pool size is taken from the environment"""
+    monkeypatch.setenv('DATABASE_POOL_SIZE', '20')
+    monkeypatch.setenv('DATABASE_MAX_OVERFLOW', '0')
+
+    config = Config()
+    assert config.database.pool_size == 20
+    assert config.database.max_overflow == 0
+    assert config.database.pool_pre_ping is True
+
+
+def test_database_pool_must_cover_concurrent_updates(monkeypatch):
+    """Test a pool smaller than the handlers in flight fails on start"""
+    monkeypatch.setenv('DATABASE_POOL_SIZE', '10')
+    monkeypatch.setenv('DATABASE_MAX_OVERFLOW', '5')
+    monkeypatch.setenv('BOT_MAX_CONCURRENT_UPDATES', '15')
+    assert Config().bot.max_concurrent_updates == 15
+
+    monkeypatch.setenv('BOT_MAX_CONCURRENT_UPDATES', '100')
+    with pytest.raises(ValueError, match='at least 100'):
+        Config()
+
+    monkeypatch.setenv('BOT_MAX_CONCURRENT_UPDATES', '15')
+    monkeypatch.setenv('BOT_WORKERS', '16')
+    with pytest.raises(ValueError, match='at least 17'):
+        Config()
@@ -0,0 +1,64 @@
+import pytest
+from unittest.mock import Mock
+from dictionary import OfflineDictionary, lemma_candidates, load_tsv
+from providers import ChainProvider
+
+
+@pytest.fixture
+def dictionary(tmp_path):
+    """Build a small offline dictionary"""
+    tsv_path = tmp_path / 'words.tsv'
+    tsv_path.write_text(
+        "cat\tкот\n"
+        "Cat\tкошка\n"
+        "cat\tкот\n"
+        "run\tбежать\n"
+        "run\tуправлять\n"
+        "city\tгород\n"
+        "broken line\n",
+        encoding='utf-8'
+    )
+    db_path = tmp_path / 'dictionary.sqlite3'
+    assert load_tsv(tsv_path, db_path) == 5
+    return OfflineDictionary(db_path, max_senses=1)
+
+
+def test_senses_in_file_order(dictionary):
+    """Test all senses are returned without duplicates"""
+    assert dictionary.senses('cat') == ['кот', 'кошка']
+
+
+def test_lemmatization_fallback(dictionary):
+    """Test word forms fall back to dictionary form"""
+    assert dictionary.senses('cats') == ['кот', 'кошка']
+    assert dictionary.senses('running') == ['бежать', 'управлять']
+    assert dictionary.senses('cities') == ['город']
+
+
+def test_unknown_word(dictionary):
+    """Test missing words"""
+    assert dictionary.senses('dog') == []
+    assert dictionary.translate('dog') is None
+
+
+def test_translate_limits_senses(dictionary):
+    """Test translate joins at most max_senses senses"""
+    assert dictionary.translate('Run') == 'бежать'
+
+
+def test_lemma_candidates():
+    """Test candidates start with the word itself"""
+    candidates = list(lemma_candidates('stopped'))
+    assert candidates[0] == 'stopped'
+    assert 'stop' in candidates
+
+
+def test_chain_provider_falls_through(dictionary):
+    """Test upstream is only asked for words missing offline"""
+    upstream = Mock()
+    upstream.translate.return_value = 'собака'
+    chain = ChainProvider([dictionary, upstream])
+
+    assert chain.translate('cat') == 'кот'
+    upstream.translate.assert_not_called()
+    assert chain.translate('dog') == 'собака'
@@ -0,0 +1,92 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from commands import BotCommands, UserState
+from dispatcher import AsyncCommandDispatcher, CommandDispatcher
+
+
+def make_message(text, chat_id=1, content_type='text'):
+    return SimpleNamespace(
+        text=text, content_type=content_type, chat=SimpleNamespace(id=chat_id)
+    )
+
+
+@pytest.fixture
+def dispatcher():
+    states = {1: None, 2: UserState.TRAINING.value, 3: 'removed_state'}
+    dispatcher = CommandDispatcher(states.get)
+
+    dispatcher.command(BotCommands.TRAIN)(lambda message: 'train')
+    dispatcher.command(BotCommands.START)(lambda message: 'start')
+    dispatcher.state(None, UserState.IDLE)(lambda message: 'idle')
+    dispatcher.state(UserState.TRAINING)(lambda message: 'answer')
+    dispatcher.unknown_state(lambda message: 'unknown')
+    return dispatcher
+
+
+def test_commands_and_buttons(dispatcher):
+    """Test commands, their buttons and bot mentions go to one handler"""
+    assert dispatcher.dispatch(make_message('/train')) == 'train'
+    assert dispatcher.dispatch(make_message(BotCommands.TRAIN.button_text)) == 'train'
+    assert dispatcher.dispatch(make_message('/start@word_bot payload')) == 'start'
+    # Commands win over the state
+    assert dispatcher.dispatch(make_message('/train', chat_id=2)) == 'train'
+
+
+def test_state_handlers(dispatcher):
+    """Test other messages go to the handler of the chat state"""
+    assert dispatcher.dispatch(make_message('hello', chat_id=1)) == 'idle'
+    assert dispatcher.dispatch(make_message('train', chat_id=2)) == 'answer'
+    assert dispatcher.dispatch(make_message('hello', chat_id=3)) == 'unknown'
+    assert dispatcher.dispatch(make_message(None, chat_id=2, content_type='photo')) == 'answer'
+
+
+def test_duplicate_command_is_rejected(dispatcher):
+    """Test two handlers can't share a command or button text"""
+    with pytest.raises(ValueError):
+        dispatcher.command(BotCommands.CLUE, BotCommands.TRAIN.button_text)(
+            lambda message: 'clue'
+        )
+    assert dispatcher.dispatch(make_message('/clue')) == 'idle'
+
+
+def test_timing_hooks(dispatcher):
+    """Test hooks get the handler name and time, also when it fails"""
+    timings = []
+    dispatcher.add_timing_hook(
+        lambda name, seconds, failed: timings.append((name, seconds, failed))
+    )
+
+    def handle_clue(message):
+        raise RuntimeError("telegram is down")
+
+    dispatcher.command(BotCommands.CLUE)(handle_clue)
+    with pytest.raises(RuntimeError):
+        dispatcher.dispatch(make_message('/clue'))
+
+    dispatcher.dispatch(make_message('/train'))
+
+    assert [(name, failed) for name, _, failed in timings] == [
+        ('handle_clue', True), ('<lambda>', False)
+    ]
+    assert all(seconds >= 0 for _, seconds, _ in timings)
+
+
+def test_async_dispatcher():
+    """Test coroutine handlers and an async state lookup"""
+    async def get_state(chat_id):
+        return UserState.TRAINING.value
+
+    async def handle_train(message):
+        return 'train'
+
+    async def handle_answer(message):
+        return 'answer'
+
+    dispatcher = AsyncCommandDispatcher(get_state)
+    dispatcher.command(BotCommands.TRAIN)(handle_train)
+    dispatcher.state(UserState.TRAINING)(handle_answer)
+
+    assert asyncio.run(dispatcher.dispatch(make_message('/train'))) == 'train'
+    assert asyncio.run(dispatcher.dispatch(make_message('cat'))) == 'answer'
@@ -0,0 +1,94 @@
+# tests/test_handlers.py
+import asyncio
+import pytest
+import fakeredis
+from unittest.mock import AsyncMock, MagicMock
+from telebot.types import Message
+from commands import UserState
+from database.models import Reviews, UserRef, Users, Words, user_cache
+from messages import get_messages
+from state import AsyncRedisStateManager, RedisStateManager
+from utils import Immediate, ImmediateSession, run_sync
+
+
+def text_message(text: str, chat_id: int = 1) -> Message:
+    return Message.de_json({
+        'message_id': 1, 'date': 0, 'text': text,
+        'chat': {'id': chat_id, 'type': 'private'},
+        'from': {'id': chat_id, 'is_bot': False, 'first_name': 'Test'}
+    })
+
+
+@pytest.fixture
+def sync_application(db_session, redis_client, config, monkeypatch):
+    """main.Application with fakeredis and a recording bot"""
+    import main
+
+    application = main.Application(config)
+    application.__dict__.update(
+        redis_client=redis_client,
+        bot=MagicMock(),
+        state_manager=RedisStateManager(redis_client, config.redis)
+    )
+    monkeypatch.setattr(main, 'application', application)
+    return application
+
+
+def test_run_sync_rejects_suspending_handler():
+    """Test a handler awaiting a real asyncio operation fails loudly"""
+    assert run_sync(Immediate([3, 1, 2]).index(2)) == 2
+    with pytest.raises(RuntimeError):
+        run_sync(asyncio.sleep(0.01))
+
+
+def test_sync_training_round(sync_application, db_session):
+    """Test the polling bot trains a word through the shared handlers"""
+    import main
+
+    session = ImmediateSession(db_session)
+    user, _ = run_sync(Users.get_or_create_user_async(session, telegram_id=1))
+    run_sync(Words.bulk_insert_async(session, user.id, [[('cat', 'кот')]]))
+    bot = sync_application.bot
+
+    main.handle_message(text_message('/train'))
+    assert bot.send_message.call_args.args[1] == \
+        get_messages('en').get('training.word_prompt', word='cat')
+
+    main.handle_message(text_message('кот'))
+    assert bot.reply_to.call_args.args[1] == \
+        get_messages('en').get('training.correct')
+    assert sync_application.state_manager.get_state(1) == \
+        UserState.TRAINING.value
+
+    # The word is rescheduled by the answers flusher, not by the handler
+    review = db_session.get(Reviews, (user.id, 'cat'))
+    assert review.get_review_state().repetitions == 0
+    [(_, fields)] = sync_application.redis_client.xrange(
+        sync_application.answer_buffer.stream
+    )
+    assert (fields['word'], fields['quality']) == ('cat', '5')
+
+
+def test_async_start(config, monkeypatch):
+    """Test the asyncio bot runs the same /start handler"""
+    import async_main
+
+    application = async_main.AsyncApplication(config)
+    state_manager = AsyncRedisStateManager(
+        fakeredis.aioredis.FakeRedis(decode_responses=True), config.redis
+    )
+    application.__dict__.update(bot=AsyncMock(), state_manager=state_manager)
+    monkeypatch.setattr(async_main, 'application', application)
+    # A cached user needs no database
+    user_cache.set(2, UserRef(2, 'en'))
+
+    async def scenario():
+        await async_main.handle_message(text_message('/start', chat_id=2))
+        return await state_manager.get_state(2)
+
+    try:
+        assert asyncio.run(scenario()) == UserState.IDLE.value
+    finally:
+        user_cache.invalidate(2)
+    assert application.bot.reply_to.call_args.args[1] == \
+        get_messages('en').get('welcome', name='Test')
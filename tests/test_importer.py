@@ -0,0 +1,119 @@
+from sqlalchemy.dialects import postgresql
+from database.models import Words
+from importer import ImportResult, batched, document_delimiter, \
+    parse_word_pairs, unique_pairs
+
+
+def test_parse_dash_and_tab_lines():
+    """Test plain text lines in both formats"""
+    result = ImportResult()
+    lines = ['cat - кот', '', 'dog\tсобака', 'broken line', ' - ']
+    pairs = list(parse_word_pairs(lines, result))
+    assert pairs == [('cat', 'кот'), ('dog', 'собака')]
+    assert result.invalid == 2
+
+
+def test_parse_csv_rows():
+    """Test CSV with quoted values and extra columns"""
+    result = ImportResult()
+    lines = ['cat,кот,noun', '"ice cream","мороженое"', 'dog,', ',', 'single']
+    pairs = list(parse_word_pairs(lines, result, delimiter=','))
+    assert pairs == [('cat', 'кот'), ('ice cream', 'мороженое')]
+    assert result.invalid == 2
+
+
+def test_duplicates_inside_document():
+    """Test in-memory deduplication"""
+    result = ImportResult()
+    pairs = [('cat', 'кот'), ('dog', 'собака'), ('cat', 'кот')]
+    assert list(unique_pairs(pairs, result)) == pairs[:2]
+    assert result.duplicates == 1
+
+
+def test_batched():
+    """Test splitting a stream into batches"""
+    assert list(batched(range(5), 2)) == [[0, 1], [2, 3], [4]]
+    assert list(batched([], 2)) == []
+
+
+def test_document_delimiter():
+    """Test delimiter guessed by file name"""
+    assert document_delimiter('words.CSV') == ','
+    assert document_delimiter('words.tsv') == '\t'
+    assert document_delimiter('words.txt') is None
+    assert document_delimiter(None) is None
+
+
+def test_bulk_insert_query():
+    """Test one multi-row INSERT ... ON CONFLICT DO NOTHING per batch"""
+    batch = [('cat', 'кот'), ('dog', 'собака')]
+    query = Words._bulk_insert_query(1, batch)
+    compiled = query.compile(dialect=postgresql.dialect())
+    assert 'ON CONFLICT (user_id, left_word, right_word) DO NOTHING' in str(compiled)
+    assert 'RETURNING words.id' in str(compiled)
+    assert compiled.params['left_word_m1'] == 'dog'
+
+
+def test_document_in_other_encoding_is_rejected(
+    db_session, redis_client, config, monkeypatch
+):
+    """Test a cp1251 document gets a reply instead of an error"""
+    from unittest.mock import MagicMock
+    from telebot.types import Message
+    import main
+    from commands import UserState
+    from messages import get_messages
+    from state import RedisStateManager
+
+    application = main.Application(config)
+    bot = MagicMock()
+    bot.download_file.return_value = 'кот;cat\n'.encode('cp1251')
+    state_manager = RedisStateManager(redis_client, config.redis)
+    application.__dict__.update(bot=bot, state_manager=state_manager)
+    monkeypatch.setattr(main, 'application', application)
+    state_manager.set_state(1, UserState.AWAITING_WORD_PAIR)
+
+    main.handle_document(Message.de_json({
+        'message_id': 1, 'date': 0,
+        'chat': {'id': 1, 'type': 'private'},
+        'from': {'id': 1, 'is_bot': False, 'first_name': 'Test'},
+        'document': {'file_id': 'a', 'file_unique_id': 'b',
+                     'file_name': 'words.csv', 'file_size': 8}
+    }))
+
+    reply = bot.reply_to.call_args.args[1]
+    assert reply == get_messages('en').get('add_word.invalid_file')
+
+
+def test_document_without_size_is_checked_after_download(
+    db_session, redis_client, config, monkeypatch
+):
+    """Test a document without file_size still respects the size limit"""
+    from unittest.mock import MagicMock
+    from telebot.types import Message
+    import handlers
+    import main
+    from commands import UserState
+    from messages import get_messages
+    from state import RedisStateManager
+
+    application = main.Application(config)
+    bot = MagicMock()
+    bot.download_file.return_value = 'cat - кот\n'.encode('utf-8') * 10
+    state_manager = RedisStateManager(redis_client, config.redis)
+    application.__dict__.update(bot=bot, state_manager=state_manager)
+    monkeypatch.setattr(main, 'application', application)
+    monkeypatch.setattr(handlers.config.word_import, 'max_file_size', 64)
+    state_manager.set_state(1, UserState.AWAITING_WORD_PAIR)
+
+    main.handle_document(Message.de_json({
+        'message_id': 1, 'date': 0,
+        'chat': {'id': 1, 'type': 'private'},
+        'from': {'id': 1, 'is_bot': False, 'first_name': 'Test'},
+        'document': {'file_id': 'a', 'file_unique_id': 'b',
+                     'file_name': 'words.txt'}
+    }))
+
+    reply = bot.reply_to.call_args.args[1]
+    assert reply == get_messages('en').get('add_word.file_too_large')
+    assert db_session.query(Words).count() == 0
@@ -0,0 +1,24 @@
+import json
+
+import pytest
+from commands import BotCommands
+from keyboards import build_main_keyboard, get_language_keyboard, \
+    get_main_keyboard
+
+
+def test_keyboard_is_prepared_once():
+    """Test replies share one keyboard with the JSON built on the fly before"""
+    keyboard = get_main_keyboard()
+    assert get_main_keyboard() is keyboard
+    assert keyboard.to_json() is keyboard.to_json()
+    markup = json.loads(keyboard.to_json())
+    assert markup == json.loads(build_main_keyboard().to_json())
+    assert {'text': BotCommands.TRAIN.button_text} in markup['keyboard'][0]
+
+
+def test_prepared_keyboard_is_read_only():
+    """Test a shared keyboard can't be changed by a handler"""
+    with pytest.raises(TypeError):
+        get_language_keyboard().add('de')
+    with pytest.raises(TypeError):
+        get_language_keyboard().row('de')
@@ -1,6 +1,6 @@
 # tests/test_messages.py
 import pytest
-from messages import Messages
+from messages import Messages, get_messages
 
 
 def test_get_simple_message(messages):
@@ -56,3 +56,30 @@ def test_nested_key_not_found(messages):
     """Test accessing non-existent nested key"""
     with pytest.raises(KeyError):
         messages.get('add_word.invalid.key')
+
+
+def test_static_message_is_not_formatted(messages):
+    """Test template without placeholders is returned as is, braces unescaped"""
+    messages._static['braces'] = 'a {b}'
+    assert messages.get('braces', b='ignored') == 'a {b}'
+
+    from messages import compile_language
+    static, templates = compile_language({'a': {'b': 'x {{y}}'}, 'c': '{n}'})
+    assert static == {'a.b': 'x {y}'}
+    assert templates == {'c': '{n}'}
+
+
+def test_catalog_is_shared():
+    """Test the messages file is read and compiled once per process"""
+    english, russian = Messages('en'), Messages('ru')
+    assert english._catalog is russian._catalog
+    assert english.get('add_word.prompt') != russian.get('add_word.prompt')
+
+
+def test_get_messages_is_shared_per_language():
+    """Test users with the same language share one read-only instance"""
+    assert get_messages('ru') is get_messages('ru')
+    assert get_messages('ru').get('main_menu') == Messages('ru').get('main_menu')
+    assert get_messages('unknown') is get_messages('en')
+    with pytest.raises(TypeError):
+        get_messages('en').change_language('ru')
@@ -0,0 +1,126 @@
+import urllib.request
+
+import fakeredis
+import metrics
+import pytest
+from metrics import register_callback, statement_label
+from prometheus_client import CollectorRegistry, generate_latest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import TimeoutError
+from sqlalchemy.pool import QueuePool
+
+
+def sample(name, **labels) -> float:
+    return metrics.registry.get_sample_value(name, labels) or 0
+
+
+def test_callback_metrics():
+    """Test callback gauges and counters are read on collection"""
+    registry = CollectorRegistry()
+    depth = [3]
+    register_callback(
+        'test_depth', 'Depth', lambda: [(('0',), depth[0])], ['worker'],
+        metrics=registry
+    )
+    register_callback(
+        'test_updates_total', 'Updates', lambda: [((), 7)], type='counter',
+        metrics=registry
+    )
+
+    assert registry.get_sample_value('test_depth', {'worker': '0'}) == 3
+    assert registry.get_sample_value('test_updates_total') == 7
+    depth[0] = 5
+    assert registry.get_sample_value('test_depth', {'worker': '0'}) == 5
+
+
+def test_callback_is_replaced_and_errors_are_isolated():
+    """Test re-registering a name replaces it, a failing read is skipped"""
+    registry = CollectorRegistry()
+    register_callback('test_size', 'Size', lambda: [((), 1)], metrics=registry)
+    register_callback('test_size', 'Size', lambda: [((), 2)], metrics=registry)
+    register_callback('test_broken', 'Broken', lambda: 1 / 0, metrics=registry)
+
+    lines = generate_latest(registry).decode().splitlines()
+    assert 'test_size 2.0' in lines
+    assert not any(line.startswith('test_broken') for line in lines)
+
+
+def test_statement_label():
+    """Test SQL statements are grouped by verb and table"""
+    assert statement_label('SELECT words.id FROM words WHERE 1') == 'SELECT words'
+    assert statement_label('INSERT INTO "answers" (a) VALUES (1)') == 'INSERT answers'
+    assert statement_label('UPDATE users SET best_score=1') == 'UPDATE users'
+    assert statement_label('BEGIN') == 'BEGIN'
+
+
+def test_instrument_redis():
+    """Test commands, pipelines and scripts are timed"""
+    client = metrics.instrument_redis(fakeredis.FakeRedis())
+    count = 'redis_command_seconds_count'
+    before = sample(count, command='SET'), sample(count, command='MULTI')
+
+    client.set('key', 1)
+    pipe = client.pipeline()
+    pipe.incr('key')
+    pipe.get('key')
+    assert pipe.execute() == [2, b'2']
+    assert client.register_script("return 1")() == 1
+
+    assert sample(count, command='SET') == before[0] + 1
+    assert sample(count, command='MULTI') == before[1] + 1
+    assert sample(count, command='EVALSHA') >= 1
+
+
+def test_instrument_engine():
+    """Test statements are timed and failures counted"""
+    engine = create_engine('sqlite://')
+    metrics.instrument_engine(engine)
+    with engine.connect() as connection:
+        connection.execute(text('CREATE TABLE words (id INTEGER)'))
+        connection.execute(text('SELECT id FROM words'))
+        try:
+            connection.execute(text('SELECT id FROM missing'))
+        except Exception:
+            pass
+
+    assert sample('sql_statement_seconds_count', statement='SELECT words') >= 1
+    assert sample('sql_errors_total', statement='SELECT missing') >= 1
+
+
+def test_instrument_pool(tmp_path):
+    """Test pool checkouts are timed and utilization is reported"""
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'pool.sqlite3'}", poolclass=QueuePool,
+        pool_size=2, max_overflow=0, pool_timeout=0.05
+    )
+    metrics.instrument_pool(engine, max_overflow=0)
+    checkouts = sample('db_pool_checkout_seconds_count')
+    timeouts = sample('db_pool_timeouts_total')
+
+    first, second = engine.connect(), engine.connect()
+    assert sample('db_pool_utilization') == 1.0
+    with pytest.raises(TimeoutError):
+        engine.connect()
+    first.close()
+    second.close()
+
+    assert sample('db_pool_checkout_seconds_count') == checkouts + 3
+    assert sample('db_pool_timeouts_total') == timeouts + 1
+    assert sample('db_pool_connections', state='idle') == 2
+    assert sample('db_pool_utilization') == 0.0
+    engine.dispose()
+
+
+def test_metrics_endpoint():
+    """Test /metrics serves the registry"""
+    registry = CollectorRegistry()
+    register_callback('up', 'Bot is running', lambda: [((), 1)], metrics=registry)
+    server = metrics.start_http_server('127.0.0.1', 0, registry)
+    try:
+        port = server.server_address[1]
+        with urllib.request.urlopen(f'http://127.0.0.1:{port}/metrics') as response:
+            assert response.status == 200
+            assert 'up 1.0' in response.read().decode().splitlines()
+    finally:
+        server.shutdown()
+        server.server_close()
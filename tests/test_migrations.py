@@ -0,0 +1,75 @@
+# tests/test_migrations.py
+from pathlib import Path
+
+from alembic import command
+from alembic.autogenerate import compare_metadata
+from alembic.config import Config
+from alembic.migration import MigrationContext
+from sqlalchemy import create_engine, text
+from database.models import Base
+
+ROOT = Path(__file__).parent.parent
+
+
+def alembic_config(url: str) -> Config:
+    # Without alembic.ini: its logging setup would disable the loggers
+    # of the modules other tests check
+    config = Config()
+    config.set_main_option('script_location', str(ROOT / 'alembic'))
+    config.set_main_option('sqlalchemy.url', url)
+    return config
+
+
+def test_upgrade_head_creates_schema_of_models(tmp_path):
+    """Test `alembic upgrade head` sets up an empty database"""
+    url = f"sqlite:///{tmp_path / 'bot.sqlite3'}"
+    command.upgrade(alembic_config(url), 'head')
+
+    engine = create_engine(url)
+    with engine.connect() as connection:
+        context = MigrationContext.configure(connection)
+        assert compare_metadata(context, Base.metadata) == []
+    engine.dispose()
+
+
+def test_upgrade_merges_duplicates(tmp_path):
+    """Test unique index migrations keep the oldest user and word pair"""
+    url = f"sqlite:///{tmp_path / 'bot.sqlite3'}"
+    config = alembic_config(url)
+    command.upgrade(config, '9c1f2a7d3e41')
+
+    engine = create_engine(url)
+    with engine.begin() as connection:
+        connection.execute(text(
+            "INSERT INTO users (id, telegram_id) VALUES (1, 10), (2, 10), (3, 30)"
+        ))
+        connection.execute(text("""
+            INSERT INTO words (id, left_word, right_word, user_id, random_key)
+            VALUES (1, 'cat', 'кот', 1, 0.1), (2, 'cat', 'кот', 2, 0.2),
+                   (3, 'dog', 'пёс', 2, 0.3), (4, 'sun', 'солнце', 3, 0.4)
+        """))
+    command.upgrade(config, 'head')
+
+    with engine.connect() as connection:
+        users = connection.execute(text("SELECT id FROM users ORDER BY id"))
+        words = connection.execute(text(
+            "SELECT id, user_id FROM words ORDER BY id"
+        ))
+        assert [row.id for row in users] == [1, 3]
+        assert [tuple(row) for row in words] == [(1, 1), (3, 1), (4, 3)]
+    engine.dispose()
+
+
+def test_downgrade_restores_random_key(tmp_path):
+    """Test the random_key migration can be rolled back and applied again"""
+    url = f"sqlite:///{tmp_path / 'bot.sqlite3'}"
+    config = alembic_config(url)
+    command.upgrade(config, 'head')
+    command.downgrade(config, 'f0b39a8c4d72')
+    command.upgrade(config, 'head')
+
+    engine = create_engine(url)
+    with engine.connect() as connection:
+        context = MigrationContext.configure(connection)
+        assert compare_metadata(context, Base.metadata) == []
+    engine.dispose()
@@ -1,6 +1,8 @@
 # tests/test_models.py
 import pytest
-from database.models import Users, Words
+from database.models import Reviews, Users, Words, user_cache
+from answer_stats import AnswerEvent
+from utils import ImmediateSession, run_sync
 from datetime import datetime, timedelta
 from datetime import datetime
 
@@ -41,57 +43,6 @@ def test_word_creation_and_relations(db_session):
     assert fetched_word.user_id == user.id
 
 
-def test_get_random_word(db_session):
-    """Test get_random_word method"""
-    # Create user
-    user = Users(telegram_id=123456, best_score=0)
-    db_session.add(user)
-    db_session.commit()
-
-    # Add multiple words
-    words = [
-        ("hello", "привет"),
-        ("world", "мир"),
-        ("cat", "кот")
-    ]
-    for left, right in words:
-        word = Words(
-            left_word=left,
-            right_word=right,
-            user_id=user.id,
-            added_date=datetime.now()
-        )
-        db_session.add(word)
-    db_session.commit()
-
-    # Test random word
-    random_word = Words.get_random_word(user.id)
-    assert random_word is not None
-    assert (random_word.left_word, random_word.right_word) in words
-
-
-def test_get_all_translations(db_session):
-    """Test getting all translations for a word"""
-    user = Users(telegram_id=123456, best_score=0)
-    db_session.add(user)
-    db_session.commit()
-
-    # Add multiple translations for the same word
-    translations = ["привет", "здравствуйте", "хай"]
-    for translation in translations:
-        word = Words(
-            left_word="hello",
-            right_word=translation,
-            user_id=user.id,
-            added_date=datetime.now()
-        )
-        db_session.add(word)
-    db_session.commit()
-
-    result = Words.get_all_translations("hello", user.id)
-    assert set(result) == set(translations)
-
-
 def test_user_score_update(db_session):
     """Test updating user's best score"""
     user = Users(telegram_id=123456, best_score=0)
@@ -122,4 +73,80 @@ def test_word_added_date(db_session):
     db_session.commit()
 
     fetched_word = db_session.query(Words).first()
-    assert abs(fetched_word.added_date - now) < timedelta(seconds=1)
\ No newline at end of file
+    assert abs(fetched_word.added_date - now) < timedelta(seconds=1)
+
+def test_get_user_ref_is_cached(db_session):
+    """Test user reference is served from cache after the first lookup"""
+    session = ImmediateSession(db_session)
+    user_cache.clear()
+    ref = run_sync(Users.get_user_ref_async(session, 123456))
+    hits = user_cache.hits
+
+    assert run_sync(Users.get_user_ref_async(session, 123456)) == ref
+    assert user_cache.hits == hits + 1
+    assert ref.language == "en"
+
+
+def test_set_language_invalidates_user_ref(db_session):
+    """Test language change is visible through the cache"""
+    session = ImmediateSession(db_session)
+    user_cache.clear()
+    run_sync(Users.get_user_ref_async(session, 123456))
+    user, _ = run_sync(
+        Users.get_or_create_user_async(session, telegram_id=123456)
+    )
+    run_sync(user.set_language_async(session, "ru"))
+
+    assert run_sync(Users.get_user_ref_async(session, 123456)).language == "ru"
+
+
+def test_change_language_updates_user_ref(db_session):
+    """Test language change is written through to the cache"""
+    session = ImmediateSession(db_session)
+    user_cache.clear()
+    ref = run_sync(Users.get_user_ref_async(session, 123456))
+    hits = user_cache.hits
+
+    assert run_sync(Users.change_language_async(session, 123456, "uk")) == \
+        ref._replace(language="uk")
+    assert run_sync(Users.get_user_ref_async(session, 123456)).language == "uk"
+    assert user_cache.hits == hits + 1
+
+
+def test_get_or_create_word_is_one_statement():
+    """Test upsert of a word pair scoped to the user"""
+    from sqlalchemy.dialects import postgresql
+
+    query = Words._upsert_word_query('cat', 'кот', 1)
+    sql = str(query.compile(dialect=postgresql.dialect()))
+    assert sql.count('INSERT INTO words') == 1
+    assert 'ON CONFLICT (user_id, left_word, right_word) DO NOTHING' in sql
+    assert 'words.user_id = ' in sql
+
+
+def test_schedule_answers_applies_answers_in_order(db_session):
+    """Test a batch reschedules every answered word in one pass"""
+    user = Users(telegram_id=123456, best_score=0)
+    db_session.add(user)
+    db_session.commit()
+    now = datetime.now()
+    db_session.add(Reviews(user_id=user.id, left_word='cat', due=now))
+    db_session.commit()
+
+    def answer(word: str, quality: int, minutes: int) -> AnswerEvent:
+        return AnswerEvent(
+            event_id=f"{word}-{minutes}", user_id=user.id, word=word,
+            correct=quality >= 3, clues=0, quality=quality, latency_ms=None,
+            answered_at=now + timedelta(minutes=minutes), streak=0
+        )
+
+    Reviews.schedule_answers([
+        answer('cat', 5, 2), answer('cat', 5, 1), answer('dog', 1, 1)
+    ])
+    db_session.commit()
+
+    cat = db_session.get(Reviews, (user.id, 'cat')).get_review_state()
+    assert (cat.repetitions, cat.interval) == (2, 6.0)
+    assert cat.last_review == now + timedelta(minutes=2)
+    dog = db_session.get(Reviews, (user.id, 'dog')).get_review_state()
+    assert (dog.repetitions, dog.lapses) == (0, 1)
@@ -0,0 +1,100 @@
+import pytest
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+from exceptions import TranslationError
+from providers import CircuitBreaker, DictionaryProvider, HttpClient
+
+
+class FlakyHandler(BaseHTTPRequestHandler):
+    """Answers with queued statuses, then 200"""
+    statuses = []
+    calls = 0
+
+    def do_GET(self):
+        FlakyHandler.calls += 1
+        status = FlakyHandler.statuses.pop(0) if FlakyHandler.statuses else 200
+        self.send_response(status)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def flaky_url():
+    FlakyHandler.statuses = []
+    FlakyHandler.calls = 0
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FlakyHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/"
+    server.shutdown()
+    server.server_close()
+
+
+def make_client(max_retries=2, failure_threshold=3):
+    return HttpClient(
+        pool_size=2, connect_timeout=1, read_timeout=1,
+        max_retries=max_retries, backoff=0.001,
+        breaker=CircuitBreaker(failure_threshold, reset_timeout=60)
+    )
+
+
+def test_transient_errors_are_retried(flaky_url):
+    """Test 5xx answers are retried until success"""
+    FlakyHandler.statuses = [503, 502]
+    assert make_client().get(flaky_url).status_code == 200
+    assert FlakyHandler.calls == 3
+
+
+def test_retries_are_bounded(flaky_url):
+    """Test client gives up after max_retries"""
+    FlakyHandler.statuses = [500] * 10
+    with pytest.raises(TranslationError):
+        make_client(max_retries=1).get(flaky_url)
+    assert FlakyHandler.calls == 2
+
+
+def test_client_errors_are_not_retried(flaky_url):
+    """Test 404 is returned right away"""
+    FlakyHandler.statuses = [404]
+    assert make_client().get(flaky_url).status_code == 404
+    assert FlakyHandler.calls == 1
+
+
+def test_open_circuit_fails_fast(flaky_url):
+    """Test provider is not called while the circuit is open"""
+    client = make_client(max_retries=0, failure_threshold=2)
+    FlakyHandler.statuses = [500, 500]
+    for _ in range(2):
+        with pytest.raises(TranslationError):
+            client.get(flaky_url)
+
+    with pytest.raises(TranslationError):
+        client.get(flaky_url)
+    assert FlakyHandler.calls == 2
+
+
+def test_circuit_closes_after_successful_trial():
+    """Test half-open trial call closes the circuit"""
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10)
+    with patch('providers.time.monotonic', return_value=100):
+        breaker.record_failure()
+        assert not breaker.allow()
+    with patch('providers.time.monotonic', return_value=111):
+        assert breaker.allow()
+        # Only one trial call at a time
+        assert not breaker.allow()
+        breaker.record_success()
+    assert not breaker.is_open
+
+
+def test_dictionary_provider_from_file(tmp_path):
+    """Test local dictionary backend"""
+    path = tmp_path / 'dictionary.tsv'
+    path.write_text("hello\tпривет\nhello\tздравствуйте\ncat\tкот\n", encoding='utf-8')
+    provider = DictionaryProvider.from_file(path)
+
+    assert provider.translate('Hello') == 'привет'
+    assert provider.translate('dog') is None
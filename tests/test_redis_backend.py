@@ -0,0 +1,200 @@
+# tests/test_redis_backend.py
+"""
+Redis clients for standalone, Sentinel and Cluster modes.
+
+Cluster and Sentinel tests start local redis-server processes and are
+skipped when redis-server is not on PATH.
+"""
+import asyncio
+import shutil
+import socket
+import subprocess
+import time
+from dataclasses import replace
+
+import pytest
+import redis
+from redis.cluster import key_slot
+from answer_stats import AnswerBuffer, AnswerFlusher, answers_stream, streak_key
+from commands import UserState
+from config import config
+from redis_backend import create_async_redis, create_redis, hash_tag, is_cluster
+from state import AsyncRedisStateManager, RedisStateManager
+
+REDIS_SERVER = shutil.which('redis-server')
+# Data servers keep nothing on disk; a sentinel rejects these options
+IN_MEMORY = ('--save', '', '--appendonly', 'no')
+
+needs_redis_server = pytest.mark.skipif(
+    not REDIS_SERVER, reason="redis-server is not installed"
+)
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(tmp_path, port: int, *args: str) -> subprocess.Popen:
+    process = subprocess.Popen(
+        [REDIS_SERVER, *args, '--port', str(port), '--bind', '127.0.0.1',
+         '--dir', str(tmp_path)],
+        stdout=subprocess.DEVNULL
+    )
+    client = redis.Redis(port=port)
+    for _ in range(100):
+        try:
+            client.ping()
+            return process
+        except redis.ConnectionError:
+            time.sleep(0.05)
+    process.terminate()
+    raise RuntimeError(f"redis-server on port {port} did not start")
+
+
+def wait_for(check) -> None:
+    for _ in range(100):
+        if check():
+            return
+        time.sleep(0.05)
+    raise RuntimeError("timed out")
+
+
+@pytest.fixture
+def cluster_config(tmp_path):
+    """One-node cluster holding all 16384 slots"""
+    port = free_port()
+    process = start_server(
+        tmp_path, port, *IN_MEMORY, '--cluster-enabled', 'yes',
+        '--cluster-config-file', str(tmp_path / 'nodes.conf')
+    )
+    node = redis.Redis(port=port, decode_responses=True)
+    node.execute_command('CLUSTER ADDSLOTS', *range(16384))
+    wait_for(lambda: node.cluster('info')['cluster_state'] == 'ok')
+    yield replace(config.redis, mode='cluster', host='127.0.0.1', port=port)
+    process.terminate()
+    process.wait()
+
+
+@pytest.fixture
+def sentinel_config(tmp_path):
+    """A master watched by one sentinel"""
+    master_port, sentinel_port = free_port(), free_port()
+    master = start_server(tmp_path, master_port, *IN_MEMORY)
+    (tmp_path / 'sentinel.conf').write_text(
+        f"sentinel monitor mymaster 127.0.0.1 {master_port} 1\n"
+    )
+    sentinel = start_server(
+        tmp_path, sentinel_port, str(tmp_path / 'sentinel.conf'), '--sentinel'
+    )
+    yield replace(
+        config.redis, mode='sentinel',
+        sentinels=[('127.0.0.1', sentinel_port)], service_name='mymaster'
+    )
+    for process in (sentinel, master):
+        process.terminate()
+        process.wait()
+
+
+def test_standalone_client_pool_from_config():
+    """Test the pool limits and timeouts are taken from the config"""
+    redis_config = replace(
+        config.redis, max_connections=7, socket_timeout=1.5,
+        socket_connect_timeout=0.5, health_check_interval=10
+    )
+    for client in (create_redis(redis_config), create_async_redis(redis_config)):
+        pool = client.connection_pool
+        assert pool.max_connections == 7
+        assert pool.connection_kwargs['socket_timeout'] == 1.5
+        assert pool.connection_kwargs['socket_connect_timeout'] == 0.5
+        assert pool.connection_kwargs['health_check_interval'] == 10
+        assert pool.connection_kwargs['decode_responses'] is True
+        assert not is_cluster(client)
+
+
+def test_unknown_mode_is_rejected():
+    """Test a typo in redis.mode fails instead of silently using standalone"""
+    with pytest.raises(ValueError):
+        create_redis(replace(config.redis, mode='clustre'))
+
+
+def test_keys_are_tagged_only_in_cluster_mode():
+    """Test standalone keys keep their names, cluster keys share slots"""
+    assert hash_tag(42, cluster=False) == '42'
+    assert answers_stream('bot:') == 'bot:answers'
+    assert streak_key('bot:', 42) == 'bot:streak:42'
+
+    stream = answers_stream('bot:', cluster=True)
+    assert stream == 'bot:{answers}'
+    # Keys of one answer script call must be in one slot
+    assert key_slot(streak_key('bot:', 42, cluster=True).encode()) == \
+        key_slot(stream.encode())
+    assert key_slot(f"bot:user:{hash_tag(42, True)}".encode()) == \
+        key_slot(b'42')
+
+
+@needs_redis_server
+def test_state_manager_on_cluster(cluster_config):
+    """Test chat state, clues and the deck work through a cluster client"""
+    client = create_redis(cluster_config)
+    state = RedisStateManager(client, cluster_config)
+    assert is_cluster(client)
+    assert state._get_key(5).endswith('user:{5}')
+
+    state.begin_training(5, 'cat', ['кот', 'кошка'])
+    assert state.get_state(5) == UserState.TRAINING.value
+    assert state.take_clue(5) == (UserState.TRAINING.value, 1, ['кот', 'кошка'])
+    finished = state.finish_word(5)
+    assert (finished.word, finished.clues) == ('cat', 1)
+
+    state.push_training_cards(7, [('dog', ['собака'])], replace=True)
+    assert state.pop_training_card(7) == (('dog', ['собака']), 0)
+    state.clear_state(5)
+    assert state.get_state(5) is None
+
+
+@needs_redis_server
+def test_answers_on_cluster(cluster_config):
+    """Test the answer script and the flusher work through a cluster client"""
+    client = create_redis(cluster_config)
+    buffer = AnswerBuffer(client, cluster_config.prefix, maxlen=1000)
+    written = []
+    flusher = AnswerFlusher(
+        client, cluster_config.prefix, written.extend,
+        batch_size=10, block_ms=10, claim_idle_ms=60000,
+        max_deliveries=5
+    )
+    flusher.ensure_group()
+
+    assert buffer.record(1, 'cat', True, 0) == 1
+    assert buffer.record(1, 'dog', True, 0) == 2
+    assert flusher.flush_once(block=False) == 2
+    assert [event.streak for event in written] == [1, 2]
+
+
+@needs_redis_server
+def test_async_state_manager_on_cluster(cluster_config):
+    """Test the asyncio state manager through an asyncio cluster client"""
+    async def scenario():
+        client = create_async_redis(cluster_config)
+        state = AsyncRedisStateManager(client, cluster_config)
+        await state.begin_training(6, 'sun', ['солнце'])
+        finished = await state.finish_word(6)
+        await state.clear_state(6)
+        await client.aclose()
+        return finished.word, finished.translations
+
+    assert asyncio.run(scenario()) == ('sun', ['солнце'])
+
+
+@needs_redis_server
+def test_state_manager_through_sentinel(sentinel_config):
+    """Test the client asks the sentinel for the master"""
+    client = create_redis(sentinel_config)
+    state = RedisStateManager(client, sentinel_config)
+
+    state.set_state(3, UserState.AWAITING_WORD_PAIR)
+    assert state.get_state(3) == UserState.AWAITING_WORD_PAIR.value
+    assert client.info('replication')['role'] == 'master'
+    state.clear_state(3)
@@ -0,0 +1,58 @@
+from datetime import datetime, timedelta
+from scheduler import MIN_EASE, RELEARN_DELAY, ReviewState, answer_quality, \
+    recompute, schedule
+
+NOW = datetime(2024, 1, 1, 12, 0)
+
+
+def test_answer_quality():
+    """Test clues lower the grade of a correct answer"""
+    assert answer_quality(True, 0) == 5
+    assert answer_quality(True, 1) == 4
+    assert answer_quality(True, 5) == 3
+    assert answer_quality(False, 0) == 1
+    assert answer_quality(False, 3, gave_up=True) == 0
+
+
+def test_intervals_grow():
+    """Test 1 day, 6 days, then interval times ease"""
+    state = schedule(ReviewState(), 5, NOW)
+    assert state.interval == 1
+    assert state.due == NOW + timedelta(days=1)
+
+    state = schedule(state, 5, NOW)
+    assert state.interval == 6
+
+    ease = state.ease
+    state = schedule(state, 4, NOW)
+    assert state.interval == 6 * ease
+    assert state.repetitions == 3
+
+
+def test_failed_answer_starts_over():
+    """Test lapse resets repetitions and shows the word again soon"""
+    state = ReviewState(ease=2.5, interval=15, repetitions=4)
+    state = schedule(state, 1, NOW)
+    assert state.repetitions == 0
+    assert state.lapses == 1
+    assert state.due == NOW + RELEARN_DELAY
+    assert state.ease < 2.5
+
+
+def test_ease_has_lower_bound():
+    """Test ease never drops below MIN_EASE"""
+    state = ReviewState()
+    for _ in range(10):
+        state = schedule(state, 0, NOW)
+    assert state.ease == MIN_EASE
+
+
+def test_recompute_keeps_new_words():
+    """Test recompute only touches reviewed words"""
+    new_word = ReviewState(due=NOW)
+    assert recompute(new_word).due == NOW
+
+    reviewed = ReviewState(ease=1.0, interval=2, last_review=NOW, due=NOW)
+    reviewed = recompute(reviewed)
+    assert reviewed.ease == MIN_EASE
+    assert reviewed.due == NOW + timedelta(days=2)
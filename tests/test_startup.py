@@ -0,0 +1,74 @@
+import subprocess
+import sys
+from pathlib import Path
+from config import config
+
+ROOT = Path(__file__).parent.parent
+
+# Runs in a fresh interpreter, so modules imported by other tests don't count
+IMPORT_CHECK = """
+import socket
+def refuse(*args, **kwargs):
+    raise ConnectionRefusedError('network is off while importing')
+socket.socket.connect = refuse
+import {module}, database.db, database.async_db
+assert database.db._engine is None
+assert database.async_db._async_engine is None
+assert list({module}.application.__dict__) == ['config']
+"""
+
+
+def check_import(module: str) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, '-c', IMPORT_CHECK.format(module=module)],
+        cwd=ROOT, capture_output=True, text=True
+    )
+
+
+def test_main_import_has_no_side_effects():
+    """Test importing main connects nowhere and builds no resources"""
+    result = check_import('main')
+    assert result.returncode == 0, result.stderr
+
+
+def test_async_main_import_has_no_side_effects():
+    """Test importing async_main connects nowhere and builds no resources"""
+    result = check_import('async_main')
+    assert result.returncode == 0, result.stderr
+
+
+def test_application_builds_bot_on_first_use(monkeypatch):
+    """Test the bot is created with its handlers when first asked for"""
+    import main
+
+    monkeypatch.setenv('TELEGRAM_BOT_TOKEN', '123456:test')
+    application = main.Application(config)
+    bot = application.bot
+
+    assert application.bot is bot
+    assert bot.token == '123456:test'
+    assert [handler['function'] for handler in bot.message_handlers] == [
+        main.handle_document, main.handle_message
+    ]
+    assert application.state_manager.redis is application.redis_client
+
+
+def test_message_handler_ignores_non_text_content(monkeypatch):
+    """Test stickers and photos never reach the text dialogs"""
+    import main
+    from telebot.types import Message
+
+    monkeypatch.setenv('TELEGRAM_BOT_TOKEN', '123456:test')
+    bot = main.Application(config).bot
+    handler = bot.message_handlers[1]
+    chat = {'id': 1, 'type': 'private'}
+    sticker = Message.de_json({
+        'message_id': 1, 'date': 0, 'chat': chat,
+        'sticker': {'file_id': 'a', 'file_unique_id': 'b', 'type': 'regular',
+                    'width': 512, 'height': 512, 'is_animated': False,
+                    'is_video': False}
+    })
+    text = Message.de_json({'message_id': 2, 'date': 0, 'chat': chat, 'text': 'cat'})
+
+    assert not bot._test_message_handler(handler, sticker)
+    assert bot._test_message_handler(handler, text)
@@ -1,6 +1,10 @@
 # tests/test_state.py
+import asyncio
+import fakeredis
 import pytest
-from main import RedisStateManager, UserState
+from commands import UserState
+from state import AsyncRedisStateManager, RedisStateManager, CLUE_FIELD, \
+    TRANSLATIONS_FIELD, decode_translations
 
 
 def test_state_manager_initialization(redis_client, config):
@@ -36,20 +40,93 @@ def test_state_management_flow(redis_client, config):
     assert state_manager.get_state(chat_id) is None
 
 
-def test_translations_management(redis_client, config):
+def test_translations_management(config):
     """Test translations management"""
-    state_manager = RedisStateManager(redis_client, config.redis)
+    state_manager = AsyncRedisStateManager(
+        fakeredis.aioredis.FakeRedis(decode_responses=True), config.redis
+    )
     chat_id = 123456
     translations = ["hello", "hi", "hey"]
 
-    # Set translations
-    key = f"{state_manager._get_key(chat_id)}:translations"
-    redis_client.rpush(key, *translations)
+    async def scenario():
+        # Set translations
+        await state_manager.set_translations(chat_id, translations)
 
-    # Verify translations
-    stored_translations = state_manager.get_translations(chat_id)
-    assert stored_translations == translations
+        # Verify translations
+        stored_translations = await state_manager.get_translations(chat_id)
+        assert stored_translations == translations
 
-    # Clear and verify
-    state_manager.clear_state(chat_id)
-    assert state_manager.get_translations(chat_id) == []
+        # Clear and verify
+        await state_manager.clear_state(chat_id)
+        assert await state_manager.get_translations(chat_id) == []
+
+    asyncio.run(scenario())
+
+
+def test_training_deck_flow(redis_client, config):
+    """Test training deck push, pop and invalidation"""
+    state_manager = RedisStateManager(redis_client, config.redis)
+    user_id = 42
+    cards = [("hello", ["привет", "хай"]), ("cat", ["кот"])]
+
+    assert state_manager.pop_training_card(user_id) == (None, 0)
+
+    state_manager.push_training_cards(user_id, cards)
+    assert state_manager.pop_training_card(user_id) == (cards[0], 1)
+
+    state_manager.clear_training_deck(user_id)
+    assert state_manager.pop_training_card(user_id) == (None, 0)
+
+
+def test_begin_training_and_clues(redis_client, config):
+    """Test training transitions done in one round trip each"""
+    state_manager = RedisStateManager(redis_client, config.redis)
+    chat_id = 123456
+
+    # Clues are not counted outside of training
+    assert state_manager.take_clue(chat_id) == (None, 0, [])
+
+    state_manager.begin_training(chat_id, "hello", ["привет", "хай"])
+    assert state_manager.get_state(chat_id) == UserState.TRAINING.value
+    assert state_manager.take_clue(chat_id) == (
+        UserState.TRAINING.value, 1, ["привет", "хай"]
+    )
+    assert state_manager.take_clue(chat_id)[1] == 2
+
+    finished = state_manager.finish_word(chat_id)
+    assert finished[:3] == ("hello", ["привет", "хай"], 2)
+    assert finished.shown_at is not None
+    assert redis_client.hget(state_manager._get_key(chat_id), CLUE_FIELD) \
+        is None
+
+
+def test_chat_state_is_one_hash_with_ttl(redis_client, config):
+    """Test all chat data lives in one expiring hash"""
+    state_manager = RedisStateManager(redis_client, config.redis)
+    chat_id = 123456
+    key = state_manager._get_key(chat_id)
+
+    state_manager.begin_training(chat_id, "hello", ["привет", "хай"])
+    state_manager.take_clue(chat_id)
+
+    assert redis_client.keys(f"{key}*") == [key]
+    assert redis_client.hgetall(key)["word"] == "hello"
+    assert 0 < redis_client.ttl(key) <= config.redis.ttl
+
+
+def test_migrate_legacy_keys(redis_client, config):
+    """Test chats in the old layout are moved to the hash"""
+    state_manager = RedisStateManager(redis_client, config.redis)
+    key = state_manager._get_key(1)
+    redis_client.setex(key, 100, UserState.TRAINING.value)
+    redis_client.rpush(f"{key}:translations", "hello", "hi")
+    redis_client.set(f"{key}:clue", 2)
+    # Leftovers of an expired chat
+    redis_client.rpush(f"{state_manager._get_key(2)}:translations", "cat")
+
+    assert state_manager.migrate_legacy_keys() == 1
+    assert state_manager.get_state(1) == UserState.TRAINING.value
+    assert decode_translations(redis_client.hget(key, TRANSLATIONS_FIELD)) == \
+        ["hello", "hi"]
+    assert redis_client.hget(key, CLUE_FIELD) == "2"
+    assert redis_client.keys(f"{config.redis.prefix}user:*") == [key]
@@ -0,0 +1,166 @@
+import json
+import pytest
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import Mock
+import app
+from cache import LRUCache
+from providers import CircuitBreaker, HttpClient, OxfordProvider
+from translation_cache import TranslationCache
+
+DICTIONARY = {'hello': 'привет'}
+
+
+class StubApiHandler(BaseHTTPRequestHandler):
+    """Local stand-in for the Oxford translations endpoint"""
+    requests = []
+    status = None
+    delay = 0
+
+    def do_GET(self):
+        word = self.path.rsplit('/', 1)[-1]
+        StubApiHandler.requests.append(word)
+        time.sleep(StubApiHandler.delay)
+
+        if StubApiHandler.status:
+            self.send_response(StubApiHandler.status)
+            self.end_headers()
+            return
+
+        if word not in DICTIONARY:
+            self.send_response(404)
+            self.end_headers()
+            return
+
+        body = json.dumps({'results': [{'lexicalEntries': [{'entries': [
+            {'senses': [{'translations': [{'text': DICTIONARY[word]}]}]}
+        ]}]}]}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def stub_api(monkeypatch):
+    """Run stub API and point a fresh translation cache to it"""
+    StubApiHandler.requests = []
+    StubApiHandler.status = None
+    StubApiHandler.delay = 0
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubApiHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    monkeypatch.setattr(app, 'provider', OxfordProvider(
+        HttpClient(
+            pool_size=2, connect_timeout=1, read_timeout=1, max_retries=0,
+            backoff=0, breaker=CircuitBreaker(failure_threshold=100, reset_timeout=1)
+        ),
+        api_url=f"http://127.0.0.1:{server.server_address[1]}",
+        app_id='id', app_key='key'
+    ))
+    cache = TranslationCache(
+        app.fetch_translation, memory=LRUCache(max_size=100, ttl=60),
+        ttl=60, negative_ttl=10, prefix='test:'
+    )
+    monkeypatch.setattr(app, 'translation_cache', cache)
+    yield cache
+    server.shutdown()
+    server.server_close()
+
+
+def test_translation_found(stub_api):
+    """Test translation is fetched from the provider"""
+    assert app.translation('Hello') == 'Hello → привет'
+
+
+def test_translation_is_cached(stub_api):
+    """Test repeated lookups don't reach the provider"""
+    for _ in range(3):
+        app.translation('hello')
+    assert StubApiHandler.requests == ['hello']
+
+
+def test_missing_translation_is_cached(stub_api):
+    """Test words without translation are cached too"""
+    assert app.translation('qwerty') == "Перевод не найден в ответе."
+    app.translation('qwerty')
+    assert StubApiHandler.requests == ['qwerty']
+
+
+def test_provider_error_is_not_cached(stub_api):
+    """Test failed lookups are retried"""
+    StubApiHandler.status = 500
+    assert app.translation('hello').startswith('Ошибка 500')
+    StubApiHandler.status = None
+    assert app.translation('hello') == 'hello → привет'
+    assert StubApiHandler.requests == ['hello', 'hello']
+
+
+def test_concurrent_lookups_share_one_request(stub_api):
+    """Test concurrent lookups of one word are collapsed"""
+    StubApiHandler.delay = 0.2
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(app.translation('hello')))
+        for _ in range(5)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == ['hello → привет'] * 5
+    assert StubApiHandler.requests == ['hello']
+
+
+def test_redis_layer():
+    """Test Redis is used between memory and provider"""
+    redis_client = Mock()
+    redis_client.get.return_value = 'кот'
+    fetch = Mock()
+    cache = TranslationCache(
+        fetch, memory=LRUCache(max_size=10, ttl=60),
+        ttl=60, negative_ttl=10, prefix='test:', redis_client=redis_client
+    )
+
+    assert cache.get('cat') == 'кот'
+    assert cache.get('cat') == 'кот'
+    redis_client.get.assert_called_once_with('test:translation:cat')
+    fetch.assert_not_called()
+
+
+def test_negative_result_stored_with_short_ttl():
+    """Test negative results use negative TTL in Redis"""
+    redis_client = Mock()
+    redis_client.get.return_value = None
+    cache = TranslationCache(
+        Mock(return_value=None), memory=LRUCache(max_size=10, ttl=60),
+        ttl=60, negative_ttl=10, prefix='test:', redis_client=redis_client
+    )
+
+    assert cache.get('qwerty') is None
+    redis_client.set.assert_called_once_with('test:translation:qwerty', '', ex=10)
+
+
+def test_redis_errors_fall_back_to_provider():
+    """Test an unavailable Redis doesn't fail the lookup"""
+    from redis import ConnectionError
+
+    redis_client = Mock()
+    redis_client.get.side_effect = ConnectionError('Redis is down')
+    redis_client.set.side_effect = ConnectionError('Redis is down')
+    fetch = Mock(return_value='кот')
+    cache = TranslationCache(
+        fetch, memory=LRUCache(max_size=10, ttl=60),
+        ttl=60, negative_ttl=10, prefix='test:', redis_client=redis_client
+    )
+
+    assert cache.get('cat') == 'кот'
+    assert cache.get('cat') == 'кот'
+    fetch.assert_called_once_with('cat')
+    assert cache.errors == 0
@@ -0,0 +1,106 @@
+import pytest
+import threading
+import urllib.error
+import urllib.request
+from pathlib import Path
+from unittest.mock import Mock
+from config import WebhookConfig
+from webhook import make_server, SECRET_HEADER
+from workers import ChatWorkerPool
+
+UPDATE_PAYLOAD = (Path(__file__).parent / 'data' / 'update_start.json').read_bytes()
+
+
+@pytest.fixture
+def webhook_config():
+    return WebhookConfig(
+        host='127.0.0.1', port=0, path='/webhook', url='',
+        secret_token='secret', workers=2, queue_size=10
+    )
+
+
+@pytest.fixture
+def server(webhook_config):
+    """Start webhook server on a random port with a recording processor"""
+    processed = []
+    done = threading.Event()
+
+    def process_update(update):
+        processed.append(update)
+        done.set()
+
+    pool = ChatWorkerPool(webhook_config.workers, webhook_config.queue_size)
+    pool.start()
+    server = make_server(webhook_config, pool, process_update)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server, processed, done
+    server.shutdown()
+    server.server_close()
+    pool.shutdown()
+
+
+def post(server, body, secret='secret', path='/webhook'):
+    request = urllib.request.Request(
+        f"http://127.0.0.1:{server.server_address[1]}{path}",
+        data=body,
+        headers={SECRET_HEADER: secret, 'Content-Type': 'application/json'}
+    )
+    try:
+        with urllib.request.urlopen(request) as response:
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+
+
+def test_recorded_update_is_processed(server):
+    """Test recorded update payload reaches the processor"""
+    http_server, processed, done = server
+    assert post(http_server, UPDATE_PAYLOAD) == 200
+    assert done.wait(timeout=5)
+    assert processed[0].message.text == '/start'
+    assert processed[0].message.chat.id == 123456
+
+
+def test_wrong_secret_is_rejected(server):
+    """Test update with wrong secret token is rejected"""
+    http_server, processed, _ = server
+    assert post(http_server, UPDATE_PAYLOAD, secret='wrong') == 403
+    assert processed == []
+
+
+def test_invalid_json_is_rejected(server):
+    """Test malformed body is rejected"""
+    http_server, _, _ = server
+    assert post(http_server, b'not json') == 400
+
+
+def test_unknown_path(server):
+    """Test POST to other path returns 404"""
+    http_server, _, _ = server
+    assert post(http_server, UPDATE_PAYLOAD, path='/other') == 404
+
+
+def test_full_queue_returns_503(webhook_config):
+    """Test backpressure when the worker queue is full"""
+    pool = Mock()
+    pool.submit.return_value = False
+    http_server = make_server(webhook_config, pool, Mock())
+    thread = threading.Thread(target=http_server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        assert post(http_server, UPDATE_PAYLOAD) == 503
+    finally:
+        http_server.shutdown()
+        http_server.server_close()
+
+
+def test_pool_keeps_chat_order():
+    """Test updates of one chat are processed in order"""
+    processed = []
+    pool = ChatWorkerPool(workers=4, queue_size=100)
+    pool.start()
+    for index in range(50):
+        assert pool.submit(7, processed.append, index)
+    pool.shutdown()
+    assert processed == list(range(50))
@@ -0,0 +1,160 @@
+import asyncio
+import pytest
+from unittest.mock import Mock
+from workers import AsyncChatDispatcher, get_update_chat_id
+
+
+def test_get_update_chat_id_message():
+    """Test chat id is taken from message updates"""
+    update = Mock(message=Mock(), edited_message=None)
+    update.message.chat.id = 42
+    assert get_update_chat_id(update) == 42
+
+
+def test_get_update_chat_id_missing():
+    """Test updates without chat have no chat id"""
+    update = Mock(
+        message=None, edited_message=None, channel_post=None,
+        edited_channel_post=None, callback_query=None
+    )
+    assert get_update_chat_id(update) is None
+
+
+def test_dispatcher_keeps_chat_order():
+    """Test handlers of one chat run in submission order"""
+    processed = []
+
+    async def handler(chat_id, index):
+        # Later handlers sleep less, so only the queue keeps them in order
+        await asyncio.sleep(0.01 * (5 - index))
+        processed.append((chat_id, index))
+
+    async def run():
+        dispatcher = AsyncChatDispatcher(max_in_flight=10)
+        tasks = [
+            dispatcher.submit(chat_id, lambda c=chat_id, i=i: handler(c, i))
+            for i in range(5) for chat_id in (1, 2)
+        ]
+        await asyncio.gather(*tasks)
+        assert dispatcher.pending_chats() == 0
+
+    asyncio.run(run())
+    for chat_id in (1, 2):
+        assert [i for c, i in processed if c == chat_id] == list(range(5))
+
+
+def test_dispatcher_limits_in_flight():
+    """Test no more than max_in_flight handlers run at once"""
+    peak = 0
+
+    async def run():
+        nonlocal peak
+        dispatcher = AsyncChatDispatcher(max_in_flight=3)
+
+        async def handler():
+            nonlocal peak
+            peak = max(peak, dispatcher.in_flight)
+            await asyncio.sleep(0.01)
+
+        await asyncio.gather(*[
+            dispatcher.submit(chat_id, handler) for chat_id in range(20)
+        ])
+
+    asyncio.run(run())
+    assert peak == 3
+
+
+def test_dispatcher_survives_handler_error():
+    """Test a failing handler doesn't block the chat queue"""
+    processed = []
+
+    async def failing():
+        raise RuntimeError("boom")
+
+    async def ok():
+        processed.append(True)
+
+    async def run():
+        dispatcher = AsyncChatDispatcher(max_in_flight=1)
+        await asyncio.gather(
+            dispatcher.submit(1, failing), dispatcher.submit(1, ok)
+        )
+
+    asyncio.run(run())
+    assert processed == [True]
+
+
+def test_pool_keeps_chat_state_consistent_under_load():
+    """Test thousand chats of answers and clues never race over Redis state"""
+    import threading
+    from types import SimpleNamespace
+
+    import fakeredis
+    from state import RedisStateManager
+    from workers import ChatWorkerPool
+
+    chats, rounds = 1000, 3
+    state_manager = RedisStateManager(
+        fakeredis.FakeRedis(decode_responses=True),
+        SimpleNamespace(prefix='test:', ttl=60)
+    )
+    finished = {chat_id: [] for chat_id in range(chats)}
+
+    def answer(chat_id, next_word):
+        # Two round trips: a clue of another update in between would be lost
+        word = state_manager.finish_word(chat_id)
+        finished[chat_id].append((word.word, word.clues))
+        state_manager.begin_training(chat_id, next_word, [next_word.upper()])
+
+    pool = ChatWorkerPool(workers=8, queue_size=20)
+    pool.start()
+
+    def produce(chat_ids):
+        for chat_id in chat_ids:
+            pool.submit(chat_id, state_manager.begin_training,
+                        chat_id, 'word0', ['WORD0'], block=True)
+        for n in range(1, rounds + 1):
+            for chat_id in chat_ids:
+                pool.submit(chat_id, state_manager.take_clue, chat_id, block=True)
+                pool.submit(chat_id, answer, chat_id, f"word{n}", block=True)
+
+    producers = [
+        threading.Thread(target=produce, args=(range(start, chats, 4),))
+        for start in range(4)
+    ]
+    for producer in producers:
+        producer.start()
+    for producer in producers:
+        producer.join()
+    pool.shutdown()
+
+    expected = [(f"word{n}", 1) for n in range(rounds)]
+    assert all(words == expected for words in finished.values())
+
+    stats = pool.stats()
+    assert stats.submitted == stats.completed == chats * (1 + 2 * rounds)
+    assert stats.rejected == stats.failed == stats.queued == 0
+    assert stats.max_depth <= 20
+
+
+def test_pool_counts_rejected_updates():
+    """Test a full queue drops the update and counts it"""
+    import threading
+    from workers import ChatWorkerPool
+
+    release = threading.Event()
+    pool = ChatWorkerPool(workers=1, queue_size=1)
+    pool.start()
+    assert pool.submit(1, release.wait)
+    # The worker may not have taken the first task yet
+    while pool.queue_depths() != [0]:
+        pass
+    assert pool.submit(1, int)
+    assert not pool.submit(1, int)
+    assert not pool.submit(1, int, block=True, timeout=0.01)
+    release.set()
+    pool.shutdown()
+
+    stats = pool.stats()
+    assert (stats.submitted, stats.rejected, stats.completed) == (2, 2, 2)
+    assert stats.blocked_seconds >= 0.01
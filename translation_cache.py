@@ -0,0 +1,119 @@
+import logging
+import threading
+
+from typing import Callable, Optional
+from redis import RedisError
+from cache import LRUCache
+
+
+logger = logging.getLogger(__name__)
+
+
+# Отметка "перевод не найден" в памяти и в Redis
+NOT_FOUND = ''
+
+
+class _Flight:
+    """Lookup of one word that other threads can wait for."""
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Optional[str] = None
+        self.error: Optional[Exception] = None
+
+
+class TranslationCache:
+    """
+    Layered cache in front of a translation provider.
+
+    Lookup order: in-process LRU, Redis, provider. Found translations are
+    kept for `ttl` seconds, words without translation for `negative_ttl`.
+    Provider errors are not cached. Redis errors are logged and the lookup
+    goes on as if Redis had no entry. Concurrent lookups of the same word
+    wait for a single provider request. Redis hits, provider requests and
+    their errors are counted for monitoring (memory hits are in `memory`).
+    """
+
+    def __init__(
+        self,
+        fetch: Callable[[str], Optional[str]],
+        memory: LRUCache,
+        ttl: int,
+        negative_ttl: int,
+        prefix: str,
+        redis_client=None
+    ) -> None:
+        self.fetch = fetch
+        self.memory = memory
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.prefix = prefix
+        self.redis = redis_client
+        self.redis_hits = 0
+        self.fetches = 0
+        self.errors = 0
+        self._flights: dict[str, _Flight] = {}
+        self._lock = threading.Lock()
+
+    def _get_key(self, word: str) -> str:
+        return f"{self.prefix}translation:{word}"
+
+    def get(self, word: str) -> Optional[str]:
+        """
+        Get translation of the word.
+
+        Returns:
+            Optional[str]: translation or None if the provider has none
+
+        Raises:
+            TranslationError: if the provider failed
+        """
+        cached = self.memory.get(word)
+        if cached is not None:
+            return cached or None
+
+        if self.redis is not None:
+            try:
+                cached = self.redis.get(self._get_key(word))
+            except RedisError as e:
+                logger.warning("Translation cache read failed: %s", e)
+                cached = None
+            if cached is not None:
+                self.redis_hits += 1
+                self._remember(word, cached, store=False)
+                return cached or None
+
+        with self._lock:
+            flight = self._flights.get(word)
+            leader = flight is None
+            if leader:
+                flight = self._flights[word] = _Flight()
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            self.fetches += 1
+            flight.result = self.fetch(word)
+            self._remember(word, flight.result or NOT_FOUND)
+            return flight.result
+        except Exception as e:
+            self.errors += 1
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[word]
+            flight.done.set()
+
+    def _remember(self, word: str, value: str, store: bool = True) -> None:
+        ttl = self.ttl if value else self.negative_ttl
+        self.memory.set(word, value, ttl=ttl)
+        if store and self.redis is not None:
+            try:
+                self.redis.set(self._get_key(word), value, ex=ttl)
+            except RedisError as e:
+                logger.warning("Translation cache write failed: %s", e)
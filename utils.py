@@ -0,0 +1,69 @@
+import re
+
+from typing import Any, Coroutine, Tuple
+
+
+def escape_markdown(text: str) -> str:
+    """Filters special symbols MarkdownV2."""
+    return re.sub(r'([_*\[\]()~`>#+=|{}.!-])', r'\\\1', text)
+
+
+def validate_word_pair(message: str) -> Tuple[str, str]:
+    """Validate and split message into word pair."""
+    if '-' not in message:
+        raise ValueError("Message must contain '-' symbol")
+
+    parts = [part.strip() for part in message.split('-', 1)]
+    if len(parts) != 2 or not all(parts):
+        raise ValueError("Both words must be non-empty")
+
+    return tuple(parts)
+
+
+def mask_word(word: str, clue_counter: int) -> str:
+    """Open `clue_counter` letters of the word, hiding the rest with '*'."""
+    if clue_counter == 1:
+        return f"{word[0]}{'*' * (len(word) - 1)}"
+
+    first_part = word[:clue_counter - clue_counter // 2]
+    last_part = word[-(clue_counter // 2):]
+    return f'{first_part}{"*" * (len(word) - clue_counter)}{last_part}'
+
+
+class Immediate:
+    """
+    Blocking client behind the awaitable methods of its asyncio twin.
+
+    `await client.method(...)` makes the blocking call and returns its
+    result without ever suspending, so the shared handlers run to the end
+    in run_sync on the worker thread.
+    """
+
+    def __init__(self, target) -> None:
+        self._target = target
+
+    def __getattr__(self, name: str):
+        method = getattr(self._target, name)
+
+        async def call(*args, **kwargs):
+            return method(*args, **kwargs)
+        # Next calls skip __getattr__
+        setattr(self, name, call)
+        return call
+
+
+class ImmediateSession(Immediate):
+    """db_session with the methods of AsyncSession: add() is not awaited."""
+
+    def add(self, instance) -> None:
+        self._target.add(instance)
+
+
+def run_sync(coroutine: Coroutine) -> Any:
+    """Run a handler or a model query over Immediate clients on the calling thread."""
+    try:
+        coroutine.send(None)
+    except StopIteration as stop:
+        return stop.value
+    coroutine.close()
+    raise RuntimeError("Handler awaited a non-blocking client")
@@ -0,0 +1,122 @@
+import hmac
+import json
+import logging
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable
+from telebot.types import Update
+import metrics
+from config import WebhookConfig
+from workers import ChatWorkerPool, get_update_chat_id
+
+
+logger = logging.getLogger(__name__)
+
+SECRET_HEADER = 'X-Telegram-Bot-Api-Secret-Token'
+
+
+def make_server(
+    webhook_config: WebhookConfig,
+    pool: ChatWorkerPool,
+    process_update: Callable[[Update], None]
+) -> ThreadingHTTPServer:
+    """
+    Create HTTP server that accepts Telegram updates.
+
+    Requests are only parsed and queued here: the update is handed to the
+    worker of its chat and the response goes back right away. When the
+    worker queue is full the server answers 503, so Telegram retries the
+    update later.
+
+    Args:
+        webhook_config: webhook settings
+        pool: worker pool processing the updates
+        process_update: called on a worker thread for every update
+    """
+
+    class WebhookHandler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:
+            # Health check for the load balancer
+            self._respond(200 if self.path == '/healthz' else 404)
+
+        def do_POST(self) -> None:
+            if self.path != webhook_config.path:
+                self._respond(404)
+                return
+
+            secret = self.headers.get(SECRET_HEADER, '')
+            if webhook_config.secret_token and not hmac.compare_digest(
+                secret, webhook_config.secret_token
+            ):
+                self._respond(403)
+                return
+
+            try:
+                length = int(self.headers.get('Content-Length', 0))
+                update = Update.de_json(json.loads(self.rfile.read(length)))
+            except (ValueError, KeyError, TypeError):
+                self._respond(400)
+                return
+
+            if update is None:
+                self._respond(400)
+                return
+
+            queued = pool.submit(
+                get_update_chat_id(update), process_update, update
+            )
+            self._respond(200 if queued else 503)
+
+        def _respond(self, status: int) -> None:
+            self.send_response(status)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+
+        def log_message(self, format: str, *args) -> None:
+            logger.debug(format, *args)
+
+    return ThreadingHTTPServer(
+        (webhook_config.host, webhook_config.port), WebhookHandler
+    )
+
+
+def run() -> None:
+    """Run the bot behind a webhook instead of long polling."""
+    from config import config
+    from main import application
+
+    bot = application.bot
+    pool = ChatWorkerPool(config.webhook.workers, config.webhook.queue_size)
+    # Replaces the polling pool gauges registered by main
+    metrics.watch_worker_pool(pool)
+    if config.metrics.enabled:
+        metrics.start_http_server(config.metrics.host, config.metrics.port)
+    server = make_server(
+        config.webhook,
+        pool,
+        # Already on the worker of the chat, bypass the polling pool
+        bot.process_update
+    )
+
+    if config.webhook.url:
+        # Idempotent, so every replica may register the same address
+        bot.set_webhook(
+            url=config.webhook.url,
+            secret_token=config.webhook.secret_token or None
+        )
+
+    application.start()
+    pool.start()
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        pool.shutdown()
+        application.stop()
+
+
+if __name__ == '__main__':
+    try:
+        run()
+    except Exception as e:
+        print(f"Bot stopped due to error: {e}")
@@ -0,0 +1,218 @@
+import asyncio
+import logging
+import queue
+import threading
+import time
+
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Optional
+
+
+logger = logging.getLogger(__name__)
+
+
+def get_update_chat_id(update) -> Optional[int]:
+    """Extract the chat id an update belongs to, if any."""
+    for name in ('message', 'edited_message', 'channel_post',
+                 'edited_channel_post'):
+        message = getattr(update, name, None)
+        if message is not None:
+            return message.chat.id
+
+    callback_query = getattr(update, 'callback_query', None)
+    if callback_query is not None and callback_query.message is not None:
+        return callback_query.message.chat.id
+    return None
+
+
+class AsyncChatDispatcher:
+    """
+    Runs update handlers concurrently across chats and in order within a chat.
+
+    Every submitted handler waits for the previous handler of the same chat,
+    so one chat never has two handlers running at once. Handlers of
+    different chats run concurrently, at most `max_in_flight` at a time.
+    """
+
+    def __init__(self, max_in_flight: int) -> None:
+        self._semaphore = asyncio.Semaphore(max_in_flight)
+        self._tails: dict[int, asyncio.Task] = {}
+        self.in_flight = 0
+
+    def submit(
+        self,
+        chat_id: Optional[int],
+        handler: Callable[[], Awaitable[None]]
+    ) -> asyncio.Task:
+        """Schedule handler after all handlers already queued for the chat."""
+        previous = self._tails.get(chat_id) if chat_id is not None else None
+        task = asyncio.create_task(self._run(previous, handler))
+
+        if chat_id is not None:
+            self._tails[chat_id] = task
+            task.add_done_callback(
+                lambda done: self._release_tail(chat_id, done)
+            )
+        return task
+
+    def pending_chats(self) -> int:
+        """Number of chats with queued or running handlers."""
+        return len(self._tails)
+
+    async def _run(
+        self,
+        previous: Optional[asyncio.Task],
+        handler: Callable[[], Awaitable[None]]
+    ) -> None:
+        if previous is not None:
+            # Errors of the previous handler are already logged by it
+            await asyncio.wait([previous])
+
+        async with self._semaphore:
+            self.in_flight += 1
+            try:
+                await handler()
+            except Exception:
+                logger.exception("Update handler failed")
+            finally:
+                self.in_flight -= 1
+
+    def _release_tail(self, chat_id: int, task: asyncio.Task) -> None:
+        if self._tails.get(chat_id) is task:
+            del self._tails[chat_id]
+
+
+@dataclass
+class PoolStats:
+    """Counters of ChatWorkerPool since start, summed over the workers."""
+    submitted: int
+    rejected: int
+    completed: int
+    failed: int
+    queued: int
+    max_depth: int
+    blocked_seconds: float
+    max_wait_seconds: float
+
+
+class _Shard:
+    """Queue of one worker and its counters."""
+
+    def __init__(self, queue_size: int) -> None:
+        self.queue = queue.Queue(maxsize=queue_size)
+        # Written by producers
+        self.lock = threading.Lock()
+        self.submitted = 0
+        self.rejected = 0
+        self.max_depth = 0
+        self.blocked_seconds = 0.0
+        # Written by the worker only
+        self.completed = 0
+        self.failed = 0
+        self.max_wait_seconds = 0.0
+
+
+class ChatWorkerPool:
+    """
+    Fixed pool of worker threads with bounded queues, sharded by chat id.
+
+    All updates of one chat land on the same worker and are processed in
+    order; different chats are spread over the workers. When a queue is
+    full, submit drops the task or, with `block`, makes the producer wait
+    (backpressure); both are counted in stats().
+    """
+
+    _STOP = object()
+
+    def __init__(self, workers: int, queue_size: int) -> None:
+        self._shards = [_Shard(queue_size) for _ in range(workers)]
+        self._threads = [
+            threading.Thread(
+                target=self._work, args=(shard,),
+                name=f"chat-worker-{index}", daemon=True
+            )
+            for index, shard in enumerate(self._shards)
+        ]
+
+    def start(self) -> None:
+        for thread in self._threads:
+            thread.start()
+
+    def submit(
+        self,
+        chat_id: Optional[int],
+        func: Callable,
+        *args,
+        block: bool = False,
+        timeout: Optional[float] = None
+    ) -> bool:
+        """
+        Queue func(*args) on the worker of the chat.
+
+        Args:
+            block: wait for room in a full queue instead of dropping
+            timeout: longest wait with `block`, None - no limit
+
+        Returns:
+            bool: False if the worker queue is full and the task was dropped
+        """
+        shard = self._shards[(chat_id or 0) % len(self._shards)]
+        started = time.monotonic()
+        try:
+            shard.queue.put((func, args, started), block, timeout)
+        except queue.Full:
+            with shard.lock:
+                shard.rejected += 1
+                if block:
+                    shard.blocked_seconds += time.monotonic() - started
+            return False
+
+        depth = shard.queue.qsize()
+        with shard.lock:
+            shard.submitted += 1
+            shard.max_depth = max(shard.max_depth, depth)
+            if block:
+                shard.blocked_seconds += time.monotonic() - started
+        return True
+
+    def queue_depths(self) -> list[int]:
+        """Approximate number of queued tasks per worker."""
+        return [shard.queue.qsize() for shard in self._shards]
+
+    def stats(self) -> PoolStats:
+        shards = self._shards
+        return PoolStats(
+            submitted=sum(shard.submitted for shard in shards),
+            rejected=sum(shard.rejected for shard in shards),
+            completed=sum(shard.completed for shard in shards),
+            failed=sum(shard.failed for shard in shards),
+            queued=sum(self.queue_depths()),
+            max_depth=max(shard.max_depth for shard in shards),
+            blocked_seconds=sum(shard.blocked_seconds for shard in shards),
+            max_wait_seconds=max(shard.max_wait_seconds for shard in shards)
+        )
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop workers after they drain already queued tasks."""
+        for shard in self._shards:
+            shard.queue.put(self._STOP)
+        if wait:
+            for thread in self._threads:
+                thread.join()
+
+    def _work(self, shard: _Shard) -> None:
+        while True:
+            task = shard.queue.get()
+            if task is self._STOP:
+                return
+            func, args, queued_at = task
+            shard.max_wait_seconds = max(
+                shard.max_wait_seconds, time.monotonic() - queued_at
+            )
+            try:
+                func(*args)
+            except Exception:
+                shard.failed += 1
+                logger.exception("Update handler failed")
+            else:
+                shard.completed += 1